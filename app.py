@@ -1,11 +1,30 @@
-from flask import Flask, request, render_template, redirect, url_for
-from sqlalchemy import create_engine, select, update
+from flask import (
+    Flask,
+    Blueprint,
+    current_app,
+    request,
+    render_template,
+    redirect,
+    url_for,
+    flash,
+    jsonify,
+    stream_template,
+    make_response,
+    session,
+    stream_with_context,
+)
+from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
+import atexit
 import os
 import json
+import hashlib
+from datetime import datetime
+import time
+import click
 from dotenv import load_dotenv
+from flask.cli import with_appcontext
 import logging
-from datetime import datetime
 from flask_login import (
     LoginManager,
     login_required,
@@ -14,13 +33,68 @@ from flask_login import (
 )
 from urllib.parse import urlparse
 
-from utils.db_tools import populate_categories_table, get_categories, get_database_url
-from utils.session import login_and_update_last_login
+from utils.db_tools import (
+    populate_categories_table,
+    get_categories,
+    get_database_url,
+    get_engine_options,
+    configure_engine,
+    categories_last_modified,
+    category_cache,
+)
+from utils.pool import get_pool_options, get_pool_stats
+from utils.bootstrap import WarmUp
+from utils.last_login import LastLoginWriter
+from utils.hashing import PasswordHasher, HashingBusy, PASSWORD_HASH_METHOD
+from utils.metrics import init_metrics, stats_token_required
+from utils.rollup import rebuild_rollup, get_summary
+from utils.fx import load_rates, backfill_adjusted_amounts, BACKFILL_BATCH_SIZE
+from utils import analytics
+from utils.search import search_expenses, SEARCH_LIMIT
+from utils.persons import get_roster, update_roster
+from utils.suggest import load_models, learn_expenses, suggestion_stats
+from utils.assets import build_assets, init_assets
+from utils.compression import compress_response
+from utils.replica import (
+    ReadRouter,
+    read_engine,
+    can_cache,
+    note_write,
+    get_replica_options,
+)
+from utils.page_cache import (
+    bump_data_version,
+    page_cache,
+    page_key,
+    lookup,
+    get_page,
+    stream_page,
+    page_cache_stats,
+)
+from utils.csv_import import import_expenses, IMPORT_CHUNK_SIZE
+from utils.export import build_export_query, stream_batches, csv_chunks, ndjson_chunks
+from utils.expenses import (
+    parse_expense_rows,
+    record_expenses,
+    summarize_results,
+    parse_expense_filters,
+    decode_cursor,
+    fetch_expenses_page,
+    format_amount,
+)
+from utils.session import (
+    login_and_update_last_login,
+    load_account,
+    note_import,
+    invalidate_account as invalidate_account_cache,
+)
 from database.models import db, Account, Person
+from database.schema import upgrade
 from database.tables import (
     expenses_table,
     categories_table,
     CATEGORY_LIST,
+    MONTH_NAMES,
 )
 
 # Load environment variables from .env file
@@ -31,6 +105,7 @@ DB_USERNAME = os.getenv("DB_USERNAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_SERVER = os.getenv("DB_SERVER")
 DB_NAME = os.getenv("DB_NAME")
+DB_BACKEND = os.getenv("DB_BACKEND", "mssql")  # mssql, sqlite or postgresql
 FLASK_ENV = os.getenv("FLASK_ENV")
 
 # Configure logging based on the environment
@@ -40,53 +115,289 @@ if FLASK_ENV == "development":
 else:
     logging.basicConfig(level=logging.WARNING)
 
-DATABASE_URL = get_database_url(DB_USERNAME, DB_PASSWORD, DB_SERVER, DB_NAME)
+# Initialize Flask-Login
+login_manager = LoginManager()
+login_manager.login_view = "main.login"
 
-app = Flask(__name__)
+# All routes are registered on this blueprint, which create_app() attaches
+views = Blueprint("main", __name__)
 
-app.secret_key = os.environ.get(
-    "FLASK_SECRET_KEY"
-)  # Set the secret key to use for Flask sessions
-app.config["SESSION_COOKIE_SAMESITE"] = "Lax"  # Configure session cookies
+# Versioned JSON API used by the entry page's scripts
+api = Blueprint("api", __name__, url_prefix="/api/v1")
 
-# Using the ORM operations of Flask-SQLAlchemy to utilize
-# Flask extensions like Flask-Login
-app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
-db.init_app(app)  # Attach the SQLAlchemy instance to the Flask app
+API_MAX_PAGE_SIZE = 500
 
-# Using SQLAlchemy Core to run lower-level database operations
-engine = create_engine(DATABASE_URL)  # Create an engine for SQLAlchemy Core
 
-# Initialize Flask-Login
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = "login"
+def create_app(config=None):
+    """Build and configure the Flask application.
 
-if FLASK_ENV == "development":
-    print("Database URL: ", DATABASE_URL)
+    No database work happens here: connecting, seeding the categories table
+    and prefilling the pool are deferred to the warm-up, which starts in the
+    background (WARM_UP_ON_START) or on the first request.
+    """
+    started = time.perf_counter()
+    app = Flask(__name__)
+
+    app.secret_key = os.environ.get(
+        "FLASK_SECRET_KEY"
+    )  # Set the secret key to use for Flask sessions
+    app.config["SESSION_COOKIE_SAMESITE"] = "Lax"  # Configure session cookies
+    app.config["EXPENSES_PAGE_SIZE"] = int(os.getenv("EXPENSES_PAGE_SIZE", "50"))
+    app.config["WARM_UP_ON_START"] = os.getenv("WARM_UP_ON_START", "true") == "true"
+    app.config["IMPORT_CHUNK_SIZE"] = int(
+        os.getenv("IMPORT_CHUNK_SIZE", str(IMPORT_CHUNK_SIZE))
+    )
+    # Larger batches of expenses go through /import, one chunk at a time
+    app.config["API_MAX_BATCH_SIZE"] = int(os.getenv("API_MAX_BATCH_SIZE", "500"))
+    app.config["METRICS_ENABLED"] = os.getenv("METRICS_ENABLED", "false") == "true"
+    # Bearer token for /metrics and /stats/*, which are off without one
+    app.config["STATS_TOKEN"] = os.getenv("STATS_TOKEN")
+    app.config["PASSWORD_HASH_WORKERS"] = int(
+        os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+    )
+    app.config["PASSWORD_HASH_QUEUE"] = int(os.getenv("PASSWORD_HASH_QUEUE", "8"))
+    app.config["PASSWORD_HASH_METHOD"] = PASSWORD_HASH_METHOD
+    app.config["LAST_LOGIN_FLUSH_SECONDS"] = float(
+        os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5")
+    )
+    app.config["LAST_LOGIN_MAX_PENDING"] = int(
+        os.getenv("LAST_LOGIN_MAX_PENDING", "500")
+    )
+    app.config["ASSETS_FINGERPRINT"] = (
+        os.getenv("ASSETS_FINGERPRINT", "true") == "true"
+    )
+    app.config["COMPRESS_RESPONSES"] = (
+        os.getenv("COMPRESS_RESPONSES", "true") == "true"
+    )
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+    app.config["COMPRESS_LEVEL"] = int(os.getenv("COMPRESS_LEVEL", "6"))
+    app.config.update(config or {})
+
+    # Using the ORM operations of Flask-SQLAlchemy to utilize
+    # Flask extensions like Flask-Login. A DATABASE_URL overrides DB_BACKEND
+    # and the DB_* settings, and skips ODBC driver probing
+    database_url = app.config.get("SQLALCHEMY_DATABASE_URI") or os.getenv(
+        "DATABASE_URL"
+    )
+    if not database_url:
+        database_url = get_database_url(
+            DB_USERNAME, DB_PASSWORD, DB_SERVER, DB_NAME, backend=DB_BACKEND
+        )
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        {**get_engine_options(database_url), **get_pool_options(database_url)},
+    )
+
+    # An optional read replica, bound as "replica", for reporting queries
+    replica_url = app.config.get("REPLICA_DATABASE_URL") or os.getenv(
+        "REPLICA_DATABASE_URL"
+    )
+    if replica_url:
+        app.config.setdefault("SQLALCHEMY_BINDS", {})["replica"] = {
+            "url": replica_url,
+            **get_engine_options(replica_url),
+            **get_pool_options(replica_url),
+            **get_replica_options(replica_url),
+        }
+
+    # SQLAlchemy Core queries use db.engine as well, so the ORM and Core paths
+    # check out connections from a single pool
+    db.init_app(app)  # Attach the SQLAlchemy instance to the Flask app
+    login_manager.init_app(app)
+    app.register_blueprint(views)
+    app.register_blueprint(api)
+    app.cli.add_command(seed_categories_command)
+    app.cli.add_command(rebuild_rollup_command)
+    app.cli.add_command(upgrade_schema_command)
+    app.cli.add_command(backfill_adjusted_amounts_command)
+    app.cli.add_command(build_assets_command)
+
+    # Static files are served from their fingerprinted copies once the
+    # release step (`python -m utils.assets` or `flask build-assets`) has
+    # built them, and dynamic responses are gzipped
+    init_assets(app)
+    app.after_request(compress_response)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine)  # Per-dialect connection settings
+        # Only installs hooks if METRICS_ENABLED
+        init_metrics(
+            app, {name or "primary": engine for name, engine in db.engines.items()}
+        )
+        app.extensions["read_router"] = ReadRouter(
+            db.engine, db.engines.get("replica")
+        )
+
+        # Last login dates are batched in the background. Tests flush them
+        # explicitly instead, so no thread outlives their databases
+        last_logins = LastLoginWriter(
+            db.engine,
+            flush_interval=app.config["LAST_LOGIN_FLUSH_SECONDS"],
+            max_pending=app.config["LAST_LOGIN_MAX_PENDING"],
+            background=not app.testing,
+        )
+    app.extensions["last_logins"] = last_logins
+    if last_logins.background:
+        atexit.register(last_logins.shutdown)  # Write what's pending on exit
+
+    # Logins and sign-ups hash on a bounded pool and get a 503 when it's full
+    app.extensions["password_hasher"] = PasswordHasher(
+        app.config["PASSWORD_HASH_WORKERS"],
+        app.config["PASSWORD_HASH_QUEUE"],
+        method=app.config["PASSWORD_HASH_METHOD"],
+    )
+
+    warm_up = WarmUp(lambda: db.engine, categories_table, CATEGORY_LIST)
+    app.extensions["warm_up"] = warm_up
+
+    @app.before_request
+    def ensure_warm_up():
+        # Kick off the warm-up if it hasn't started yet. Tests run it inline
+        # so that it never races their database fixtures
+        warm_up.start(app, background=not app.testing)
+
+    if FLASK_ENV == "development":
+        print("Database URL: ", database_url)
+
+    app.config["CREATE_APP_SECONDS"] = time.perf_counter() - started
+    if app.config["WARM_UP_ON_START"] and not app.testing:
+        warm_up.start(app)
+    return app
+
+
+def __getattr__(name):
+    # Build the module-level app on first use, so that importing this module
+    # stays free of configuration and database work
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    with db.session.begin():
-        return db.session.get(Account, int(user_id))
+    # A cached, detached snapshot; write through a freshly loaded Account
+    return load_account(int(user_id))
+
+
+@click.command("seed-categories")
+@with_appcontext
+def seed_categories_command():
+    """Insert any missing default categories."""
+    populate_categories_table(db.engine, categories_table, CATEGORY_LIST)
+    click.echo("Categories seeded.")
+
+
+@click.command("upgrade-schema")
+@click.option("--target", type=int, default=None, help="Stop at this version.")
+@with_appcontext
+def upgrade_schema_command(target):
+    """Create or upgrade the database schema to the latest version."""
+    applied = upgrade(db.engine, target)
+    if applied:
+        click.echo(f"Applied schema versions: {', '.join(map(str, applied))}")
+    else:
+        click.echo("Schema is up to date.")
+
+
+@click.command("rebuild-rollup")
+@click.option("--account-id", type=int, default=None, help="Only this account.")
+@with_appcontext
+def rebuild_rollup_command(account_id):
+    """Recompute the monthly totals rollup from the expenses table."""
+    with db.engine.begin() as conn:
+        count = rebuild_rollup(conn, account_id)
+        bump_data_version(conn, None if account_id is None else [account_id])
+    click.echo(f"Wrote {count} rollup rows.")
+
+
+@click.command("backfill-adjusted-amounts")
+@click.option("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+@click.option("--account-id", type=int, default=None, help="Only this account.")
+@click.option("--recompute", is_flag=True, help="Also redo rows already filled.")
+@with_appcontext
+def backfill_adjusted_amounts_command(batch_size, account_id, recompute):
+    """Convert stored expenses into the base currency's AdjustedAmount."""
+    rates = load_rates()  # Read afresh; an unreadable rate file fails the command
+    updated, missing = backfill_adjusted_amounts(
+        db.engine, rates, batch_size, account_id, recompute
+    )
+    if updated:
+        # The rollup totals converted amounts, so recompute it from them
+        with db.engine.begin() as conn:
+            rebuild_rollup(conn, account_id)
+            bump_data_version(conn, None if account_id is None else [account_id])
+    click.echo(f"Updated {updated} expenses into {rates.base}.")
+    if missing:
+        click.echo(f"{missing} expenses have no rate for their currency and date.")
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress the files in static/ for far-future caching."""
+    _, summary = build_assets(current_app.static_folder)
+    click.echo(
+        f"Built {summary['files']} files ({summary['bytes']} bytes), "
+        f"{summary['gzipped']} gzipped to {summary['gzipped_bytes']} bytes."
+    )
+
+
+@views.route("/ready")
+def ready():
+    warm_up = current_app.extensions["warm_up"]
+    if warm_up.state == "failed":
+        warm_up.reset()  # Retry on the next request
+    status = warm_up.status()
+    status["create_app_seconds"] = current_app.config["CREATE_APP_SECONDS"]
+    return jsonify(status), 200 if warm_up.ready else 503
+
+
+@views.errorhandler(HashingBusy)
+def hashing_busy(e):
+    # Ask the client to back off rather than queueing more slow hashes
+    return (
+        "Too many sign-in attempts right now, please try again shortly.",
+        503,
+        {"Retry-After": str(e.retry_after)},
+    )
 
 
-# metadata.create_all(engine)  # Create the tables if they don't exist
-populate_categories_table(engine, categories_table, CATEGORY_LIST)
+def rehash_password(user, password, hasher):
+    """Upgrade an outdated stored hash while the plain password is known."""
+    try:
+        user.password = hasher.hash(password)
+    except HashingBusy:
+        return  # Not worth failing a login over; try again next time
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(Account)
+            .where(Account.id == user.id)
+            .values(password=user.password)
+        )
 
 
 # Login view
-@app.route("/login", methods=["GET", "POST"])
+@views.route("/login", methods=["GET", "POST"])
 def login():
     error_message = None
     if request.method == "POST":
+        hasher = current_app.extensions["password_hasher"]
+        password = request.form["password"]
         user = Account.query.filter(
             (Account.account_name == request.form["username"])
             | (Account.user_email == request.form["username"])
         ).first()
-        if user and user.check_password(request.form["password"]):
-            login_and_update_last_login(user, engine)
+        # Give the connection back to the pool before the slow hash; close()
+        # detaches `user` without expiring its loaded attributes
+        db.session.close()
+        if user and user.password and hasher.check(user.password, password):
+            if hasher.needs_rehash(user.password):
+                rehash_password(user, password, hasher)
+            login_and_update_last_login(user, current_app.extensions["last_logins"])
 
             # The 'next' URL parameter is a feature of Flask-Login, which is used to handle the redirection of unauthenticated users
             next_page = request.args.get("next")
@@ -94,7 +405,7 @@ def login():
             # If there's no next page specified, or if the next page is for a different site (i.e., it has a network location component),
             # then default to redirecting to the index page
             if not next_page or urlparse(next_page).netloc != "":
-                next_page = url_for("index")
+                next_page = url_for(".index")
 
             # Redirect to the next page (either the specified next page or the default index page)
             return redirect(next_page)
@@ -103,7 +414,7 @@ def login():
     return render_template("login.html", error_message=error_message)
 
 
-@app.route("/create_account", methods=["GET", "POST"])
+@views.route("/create_account", methods=["GET", "POST"])
 def create_account():
     error_message = None
     if request.method == "POST":
@@ -131,8 +442,12 @@ def create_account():
                     currency="USD",  # Default to USD
                 )
 
-                # Set password (this will hash the password)
-                new_user.set_password(password)
+                # Hash the password on the hashing pool, without holding a
+                # pooled connection meanwhile
+                db.session.close()
+                new_user.password = current_app.extensions["password_hasher"].hash(
+                    password
+                )
 
                 # Add new user to database
                 db.session.add(new_user)
@@ -146,48 +461,101 @@ def create_account():
                 db.session.commit()
 
                 # Authenticate and login the new user
-                login_and_update_last_login(new_user, engine)
+                login_and_update_last_login(
+                    new_user, current_app.extensions["last_logins"]
+                )
 
                 # Redirect to the index page
-                return redirect(url_for("index"))
+                return redirect(url_for(".index"))
 
     return render_template("create_account.html", error_message=error_message)
 
 
 # Logout view
-@app.route("/logout")
+@views.route("/logout")
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for("login"))
+    return redirect(url_for(".login"))
 
 
 # Main page view
-@app.route("/", methods=["GET"])
+@views.route("/", methods=["GET"])
 @login_required
 def index():
-    categories = get_categories(engine, categories_table)
+    # Pages carrying flashed messages are one-off, so never let them be cached
+    if session.get("_flashes"):
+        response = make_response(render_template("index.html"))
+        response.cache_control.no_store = True
+        return response
+
+    # The page loads its categories and persons from /api/v1/bootstrap, so it
+    # only depends on the account's data version, which covers the user's
+    # profile, and on the assets. Fingerprint those and skip rendering if the
+    # browser or the page cache has the page
+    key = page_key("index", current_user, current_app.extensions["assets"].version)
+    etag = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(
+            get_page("index", key, lambda: render_template("index.html"))
+        )
+
+    # The ETag is the validator that matters: Last-Modified only reflects the
+    # category list, not per-account edits, so it is informational
+    response.set_etag(etag)
+    last_modified = categories_last_modified()
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # Revalidate on every visit
+    return response
+
+
+@views.route("/stats/cache")
+@stats_token_required
+def cache_stats():
+    return jsonify(
+        {"categories": category_cache.stats(), "pages": page_cache_stats()}
+    )
 
-    # Fetch persons associated with the current user's account
-    persons = Person.query.filter_by(AccountID=current_user.id).all()
 
-    # Also convert to JSON
-    persons_data = [
-        {"PersonID": person.PersonID, "PersonName": person.PersonName}
-        for person in persons
-    ]
-    persons_json = json.dumps(persons_data)
+@views.route("/stats/suggestions")
+@stats_token_required
+def suggestions_stats():
+    return jsonify(suggestion_stats())
 
-    return render_template(
-        "index.html", categories=categories, persons=persons, persons_json=persons_json
-    )
+
+@views.route("/stats/replica")
+@stats_token_required
+def replica_stats():
+    return jsonify(current_app.extensions["read_router"].stats())
+
+
+@views.route("/stats/pool")
+@stats_token_required
+def pool_stats():
+    return jsonify(get_pool_stats(db.engine))
+
+
+@views.route("/stats/last_login")
+@stats_token_required
+def last_login_stats():
+    return jsonify(current_app.extensions["last_logins"].stats())
 
 
-@app.route("/submit", methods=["POST"])
+@views.route("/stats/hashing")
+@stats_token_required
+def hashing_stats():
+    return jsonify(current_app.extensions["password_hasher"].stats())
+
+
+@views.route("/submit", methods=["POST"])
 @login_required
 def submit():
     form_data = request.form
-    current_user_account_id = current_user.id
 
     # Process the form data
     rows = zip(
@@ -200,135 +568,417 @@ def submit():
         form_data.getlist("notes[]"),
     )
 
-    try:
-        with engine.connect() as conn:
-            for scope, day, month, year, amount, category, notes in rows:
-                try:
-                    expense_date = datetime.strptime(
-                        f"{year}-{month}-{day}", "%Y-%B-%d"
-                    ).date()
-
-                    # Determine if the scope is joint or individual
-                    person_id = None if scope == "Joint" else scope
-                    expense_scope = "Joint" if scope == "Joint" else "Individual"
-
-                    conn.execute(
-                        expenses_table.insert().values(
-                            AccountID=current_user_account_id,
-                            ExpenseScope=expense_scope,  # Set to Joint or Individual
-                            PersonID=person_id,  # Set to None if Joint, otherwise set to PersonID
-                            Day=day,
-                            Month=month,
-                            Year=year,
-                            ExpenseDate=expense_date,
-                            Amount=float(
-                                amount.replace(",", "")
-                            ),  # Ensure no commas in submission from thousands separator
-                            ExpenseCategory=category,
-                            AdditionalNotes=notes,
-                            Currency=current_user.currency,
-                        )
-                    )
-
-                except ValueError:
-                    # Handle invalid date
-                    print("Invalid date:", day, month, year)
-                    continue  # TODO: Handle this invalid date. For now, skip it.
-
-            conn.commit()
+    report, status_code = save_expenses(rows)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(report), status_code
+
+    if report["accepted"]:
+        flash(f"Success: saved {report['accepted']} expense(s).")
+    for result in report["rows"]:
+        if result["status"] == "rejected":
+            flash(f"Row {result['row']} rejected: {'; '.join(result['errors'])}")
+
+    return redirect(url_for(".index"))
+
+
+def save_expenses(rows):
+    """Validate form-shaped expense rows and write the accepted ones.
 
+    Returns the per-row report and the HTTP status it should be sent with.
+    """
+    # Validate every row up front, then write the accepted rows in one batch
+    persons = get_roster(db.engine, current_user)
+    accepted, results = parse_expense_rows(
+        rows,
+        account_id=current_user.id,
+        currency=current_user.currency,
+        person_ids=[person.PersonID for person in persons],
+    )
+
+    status_code = 200
+    try:
+        models = load_models(db.engine, accepted)
+        with db.engine.begin() as conn:
+            record_expenses(conn, expenses_table, accepted, models)
+        learn_expenses(accepted)
+        if accepted:
+            invalidate_account_data(current_user.id)
+            note_write()
     except SQLAlchemyError as e:
-        print("Error occurred:", e)
+        logging.getLogger(__name__).error("Error occurred: %s", e)
+        for result in results:
+            if result["status"] == "accepted":
+                result["status"] = "rejected"
+                result["errors"].append("Database error")
+        status_code = 500
+
+    report = summarize_results(results)
+    if status_code == 200 and report["accepted"] == 0:
+        status_code = 400  # Nothing in the submission was valid
+    return report, status_code
+
+
+def invalidate_account_data(account_id):
+    """Drop this process's cached views of an account after writing its data.
 
-    return redirect(url_for("index"))
+    The views are keyed by the account's data version, so reloading the
+    account with its new version is enough.
+    """
+    invalidate_account_cache(account_id)
 
 
-@app.route("/view_expenses")
+@views.route("/view_expenses")
 @login_required
 def view_expenses():
-    # Create a SQL query to select expenses for the current user
-    query = select(
-        expenses_table.c.ExpenseDate,
-        expenses_table.c.Amount,
-        expenses_table.c.ExpenseCategory,
-        expenses_table.c.AdditionalNotes,
-        expenses_table.c.Currency,
-    ).where(expenses_table.c.AccountID == current_user.id)
+    filters = parse_expense_filters(request.args)
+    after = decode_cursor(request.args.get("after"))
+    categories = get_categories(db.engine, categories_table)
+
+    # Serve the page as rendered for the account's current data version, if
+    # it has been
+    key = page_key(
+        "view_expenses",
+        current_user,
+        tuple(sorted(request.args.items(multi=True))),
+        tuple(categories),
+        current_app.extensions["assets"].version,
+    )
+    body = lookup("view_expenses", key)
+    if body is not None:
+        return body
+
+    # Fetch a single page of expenses, starting after the cursor, if any. A
+    # replica that hasn't reached the account's data version isn't cached
+    with read_engine().connect() as connection:
+        store = can_cache(connection, current_user)
+        rows, next_cursor = fetch_expenses_page(
+            connection,
+            expenses_table,
+            current_user.id,
+            current_app.config["EXPENSES_PAGE_SIZE"],
+            after=after,
+            **filters,
+        )
+
+    # Format amounts lazily, as the template renders each row
+    expenses = (
+        {
+            "ExpenseDate": row.ExpenseDate,
+            "Amount": format_amount(row.Amount, row.Currency),
+            "ExpenseCategory": row.ExpenseCategory,
+            "AdditionalNotes": row.AdditionalNotes,
+        }
+        for row in rows
+    )
 
-    # Execute the query using SQLAlchemy Core
-    with engine.connect() as connection:
-        result = connection.execute(query)
-        user_expenses = result.fetchall()
+    # Keep the active filters on the pagination links
+    filter_args = {key: value for key, value in request.args.items() if key != "after"}
 
-    # Convert raw results to a list of dicts
-    expenses = [row._asdict() for row in user_expenses]
+    persons = get_roster(db.engine, current_user)
 
-    # Format the amount in each expense
-    for expense in expenses:
-        if expense["Currency"] == "USD":
-            expense["Amount"] = "${:,.2f}".format(expense["Amount"])
-        elif expense["Currency"] == "EUR":
-            expense["Amount"] = "€{:,.2f}".format(expense["Amount"])
+    # Stream the page to the client while the template renders, and cache it
+    chunks = stream_template(
+        "view_expenses.html",
+        expenses=expenses,
+        next_cursor=next_cursor,
+        is_first_page=after is None,
+        filter_args=filter_args,
+        persons=persons,
+        categories=categories,
+    )
+    return current_app.response_class(stream_page(key, chunks, store))
 
-    return render_template("view_expenses.html", expenses=expenses)
+
+@views.route("/import", methods=["POST"])
+@login_required
+def import_csv():
+    upload = request.files.get("file")
+    if upload is None:
+        return jsonify({"error": "No CSV file uploaded"}), 400
+    start_row = request.form.get("start_row", 1, type=int)
+
+    account_id = current_user.id
+    persons = get_roster(db.engine, current_user)
+    # The response is streamed, so the session can only be marked up front.
+    # Its later requests check the account's DataVersion on the primary, and
+    # read from there, until the import has stopped committing chunks.
+    note_import(current_user)
+    events = import_expenses(
+        db.engine,
+        account_id,
+        current_user.currency,
+        persons,
+        upload.stream,
+        chunk_size=current_app.config["IMPORT_CHUNK_SIZE"],
+        start_row=start_row,
+        on_commit=lambda: invalidate_account_data(account_id),
+    )
+
+    # Report progress as one JSON line per committed chunk
+    lines = (json.dumps(event) + "\n" for event in events)
+    return current_app.response_class(
+        stream_with_context(lines), mimetype="application/x-ndjson"
+    )
+
+
+@views.route("/export.csv")
+@login_required
+def export_csv():
+    return export_response(csv_chunks, "text/csv", "csv")
+
+
+@views.route("/export.ndjson")
+@login_required
+def export_ndjson():
+    return export_response(ndjson_chunks, "application/x-ndjson", "ndjson")
+
+
+def export_response(encoder, mimetype, extension):
+    filters = parse_expense_filters(request.args)
+    query = build_export_query(expenses_table, current_user.id, **filters)
+
+    # Rows flow from a server-side cursor straight into the response, so
+    # memory use doesn't grow with the size of the account's history
+    chunks = encoder(stream_batches(read_engine(), query))
+    return current_app.response_class(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=expenses.{extension}"
+        },
+    )
+
+
+@views.route("/summary")
+@login_required
+def summary():
+    year = request.args.get("year", type=int) or datetime.utcnow().year
+    month = request.args.get("month", type=int)
+    if month is not None and not 1 <= month <= 12:
+        return jsonify({"error": "month must be between 1 and 12"}), 400
+
+    person = parse_expense_filters(request.args).get("person")
+
+    # Totals come from the rollup, so this doesn't scan the account's expenses,
+    # and are cached until the account's data changes
+    key = page_key("summary", current_user, year, month, person)
+    totals = lookup("summary", key)
+    if totals is None:
+        with read_engine().connect() as connection:
+            store = can_cache(connection, current_user)
+            totals = get_summary(connection, current_user.id, year, month, person)
+        if store:
+            page_cache.set(key, totals)
+    return jsonify(totals)
+
+
+@views.route("/analytics")
+@login_required
+def spending_analytics():
+    window = request.args.get("window", 3, type=int)
+    if not 1 <= window <= 24:
+        return jsonify({"error": "window must be between 1 and 24"}), 400
+
+    persons = get_roster(db.engine, current_user)
+    columns = analytics.get_columns(
+        db.engine, current_user, [person.PersonID for person in persons]
+    )
+    return jsonify(
+        analytics.summarize(
+            columns, window=window, category=request.args.get("category") or None
+        )
+    )
 
 
 # -------------------------------- User Management Routes ---------------------
 
 
-@app.route("/profile")
+@views.route("/profile")
 @login_required
 def profile():
-    # Assuming you have a relationship set up to get persons associated with the user
-    persons = Person.query.filter_by(AccountID=current_user.id).all()
-    print(persons)  # Debugging: Check if persons contain data
+    persons = get_roster(db.engine, current_user)
     return render_template("profile.html", current_user=current_user, persons=persons)
 
 
-@app.route("/update_profile", methods=["POST"])
+@views.route("/update_profile", methods=["POST"])
 @login_required
 def update_profile():
     display_name = request.form.get("display_name")
     new_password = request.form.get("new_password")
     new_currency = request.form.get("currency")  # Get the new currency from the form
 
+    # Hash the new password, if provided, before the session checks out a
+    # pooled connection, so that it isn't held for the length of the hash
+    password_hash = None
+    if new_password:
+        password_hash = current_app.extensions["password_hasher"].hash(new_password)
+
+    # current_user is a cached snapshot, so change a session-bound copy
+    account = db.session.get(Account, current_user.id)
+
     # Update display name
     if display_name:
-        current_user.display_name = display_name
+        account.display_name = display_name
 
     # Update password, if provided
-    if new_password:
-        # Hash the new password
-        current_user.set_password(new_password)
+    if password_hash is not None:
+        account.password = password_hash
 
     # Update currency, if different
-    if new_currency and new_currency != current_user.currency:
-        current_user.currency = new_currency
-
-    person_ids = request.form.getlist("person_ids[]")
-    person_names = request.form.getlist("person_names[]")
+    if new_currency and new_currency != account.currency:
+        account.currency = new_currency
 
-    for person_id, person_name in zip(person_ids, person_names):
-        if person_id == "new":
-            new_person = Person(AccountID=current_user.id, PersonName=person_name)
-            db.session.add(new_person)
-        else:
-            person = Person.query.filter_by(
-                PersonID=person_id, AccountID=current_user.id
-            ).first()
-            if person:
-                person.PersonName = person_name
+    submitted = zip(
+        request.form.getlist("person_ids[]"), request.form.getlist("person_names[]")
+    )
+    # Diff the roster with one read and at most one insert and one update,
+    # in the same transaction as the account changes
+    update_roster(db.session.connection(), current_user.id, submitted)
+    bump_data_version(db.session.connection(), [current_user.id])
 
     # Commit changes to the database
     db.session.commit()
+    invalidate_account_cache(current_user.id)
+
+    return redirect(url_for(".profile"))
+
+
+# ---------------------------------- JSON API ----------------------------------
+
+
+@api.before_request
+def require_api_login():
+    # Answer with 401 rather than redirecting scripts to the login page
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Authentication required"}), 401
+
+
+@api.route("/bootstrap")
+def api_bootstrap():
+    """Everything the entry page needs up front, fetched once per visit."""
+    categories = get_categories(db.engine, categories_table)
+
+    def render():
+        persons = get_roster(db.engine, current_user)
+        payload = {
+            "account": {
+                "id": current_user.id,
+                "display_name": current_user.display_name,
+                "currency": current_user.currency,
+            },
+            "categories": list(categories),
+            "persons": [
+                {"PersonID": person.PersonID, "PersonName": person.PersonName}
+                for person in persons
+            ],
+            "months": MONTH_NAMES,
+        }
+        return json.dumps(payload)
+
+    # Persons and the profile are covered by the account's data version, so
+    # the browser revalidates without anything being loaded or serialized
+    key = page_key("bootstrap", current_user, tuple(categories))
+    etag = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(
+            get_page("bootstrap", key, render), mimetype="application/json"
+        )
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@api.route("/expenses", methods=["POST"])
+def api_create_expenses():
+    """Save a batch of expenses: {"expenses": [{"scope": ..., ...}, ...]}."""
+    data = request.get_json(silent=True)
+    items = data.get("expenses") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+        return jsonify({"error": "Expected {\"expenses\": [...]}"}), 400
+    max_batch = current_app.config["API_MAX_BATCH_SIZE"]
+    if len(items) > max_batch:
+        error = f"At most {max_batch} expenses can be saved per request"
+        return jsonify({"error": error}), 413
+
+    rows = (
+        (
+            str(item.get("scope", "")),
+            item.get("day", ""),
+            item.get("month", ""),
+            item.get("year", ""),
+            item.get("amount", ""),
+            item.get("category", ""),
+            item.get("notes", ""),
+        )
+        for item in items
+    )
+    report, status_code = save_expenses(rows)
+    return jsonify(report), 201 if status_code == 200 else status_code
+
+
+@api.route("/expenses", methods=["GET"])
+def api_list_expenses():
+    """One page of expenses, newest first, with the cursor for the next page."""
+    filters = parse_expense_filters(request.args)
+    after = decode_cursor(request.args.get("after"))
+    limit = request.args.get(
+        "limit", current_app.config["EXPENSES_PAGE_SIZE"], type=int
+    )
+    limit = max(1, min(limit, API_MAX_PAGE_SIZE))
+
+    with read_engine().connect() as connection:
+        rows, next_cursor = fetch_expenses_page(
+            connection, expenses_table, current_user.id, limit, after=after, **filters
+        )
+
+    return jsonify(
+        {
+            "expenses": [expense_json(row) for row in rows],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@api.route("/search")
+def api_search_expenses():
+    """Expenses whose notes match ?q=, best match first, with the list filters."""
+    filters = parse_expense_filters(request.args)
+    limit = request.args.get("limit", SEARCH_LIMIT, type=int)
+    limit = max(1, min(limit, API_MAX_PAGE_SIZE))
+
+    with read_engine().connect() as connection:
+        rows = search_expenses(
+            connection,
+            expenses_table,
+            current_user.id,
+            request.args.get("q", ""),
+            limit,
+            **filters,
+        )
+
+    return jsonify(
+        {"expenses": [{**expense_json(row), "Rank": row.Rank} for row in rows]}
+    )
+
 
-    return redirect(url_for("profile"))
+def expense_json(row):
+    return {
+        "ExpenseID": row.ExpenseID,
+        "ExpenseDate": row.ExpenseDate.isoformat(),
+        "Amount": row.Amount,
+        "Currency": row.Currency,
+        "ExpenseCategory": row.ExpenseCategory,
+        "AdditionalNotes": row.AdditionalNotes,
+    }
 
 
 # -------------------------------- Main Execution ------------------------------
 
 if __name__ == "__main__":
     if FLASK_ENV == "development":
-        app.run(debug=True)
+        create_app().run(debug=True)
     else:
-        app.run(debug=False)
+        create_app().run(debug=False)
@@ -0,0 +1,59 @@
+"""Time the NumPy analytics at scale.
+
+Usage: python benchmarks/bench_analytics.py [--rows 1000000] [--persons 4]
+
+Builds a synthetic account's column arrays from Python rows (the same path
+used when loading from the database), then times each computation.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database.tables import CATEGORY_LIST
+from utils import analytics
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:>20}: {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--persons", type=int, default=4)
+    args = parser.parse_args()
+
+    person_ids = list(range(1, args.persons + 1))
+    start_date = date(2000, 1, 1)
+    rows = [
+        (
+            start_date + timedelta(days=random.randrange(9000)),
+            random.uniform(1, 500),
+            random.choice(CATEGORY_LIST),
+            random.choice([None] + person_ids),
+        )
+        for _ in range(args.rows)
+    ]
+
+    columns = timed("build columns", analytics.build_columns, rows, person_ids)
+    print(f"{'column memory':>20}: {columns.nbytes / 1e6:8.1f} MB")
+
+    timed("category totals", analytics.category_totals, columns)
+    _, totals = timed("monthly totals", analytics.monthly_totals, columns)
+    timed("month over month", analytics.month_over_month, totals)
+    timed("rolling average", analytics.rolling_average, totals, 12)
+    timed("person split", analytics.person_split, columns)
+    timed("full summary", analytics.summarize, columns, window=12)
+
+
+if __name__ == "__main__":
+    main()
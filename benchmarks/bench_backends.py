@@ -0,0 +1,123 @@
+"""Run the insert, export and aggregate paths on each database backend.
+
+Usage: python benchmarks/bench_backends.py [--rows 20000] [--batch 50]
+           [--url URL ...]
+
+Without --url, compares SQLite with its default journal settings against
+the tuned settings from configure_engine() (WAL, synchronous=NORMAL). Each
+--url (SQL Server via pyodbc, PostgreSQL via psycopg2, SQLite) is run with
+the same engine options and connection settings as the app would use. The
+database at each URL gets its own account, which is removed afterwards.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from synthetic import expense_rows
+
+from sqlalchemy import create_engine, delete
+
+from database.models import Account
+from database.schema import upgrade
+from database.tables import expenses_table, expense_monthly_totals_table
+from utils.db_tools import get_engine_options, configure_engine
+from utils.export import build_export_query, stream_batches, csv_chunks
+from utils.expenses import record_expenses
+from utils.fx import FXRates
+from utils.rollup import rebuild_rollup, get_summary
+
+
+def run(engine, rows, batch_size):
+    timings = {}
+    with engine.begin() as connection:
+        account_id = connection.execute(
+            Account.__table__.insert().values(AccountName=f"bench-{time.time_ns()}")
+        ).inserted_primary_key[0]
+    for row in rows:
+        row["AccountID"] = account_id
+
+    try:
+        # Submissions arrive as small batches, each in its own transaction
+        started = time.perf_counter()
+        for offset in range(0, len(rows), batch_size):
+            with engine.begin() as connection:
+                record_expenses(
+                    connection, expenses_table, rows[offset : offset + batch_size]
+                )
+        timings["insert_rows_per_second"] = len(rows) / (
+            time.perf_counter() - started
+        )
+
+        started = time.perf_counter()
+        size = sum(
+            len(chunk)
+            for chunk in csv_chunks(
+                stream_batches(engine, build_export_query(expenses_table, account_id))
+            )
+        )
+        timings["export_seconds"] = time.perf_counter() - started
+        timings["export_bytes"] = size
+
+        started = time.perf_counter()
+        with engine.connect() as connection:
+            for year in range(2015, 2025):
+                get_summary(connection, account_id, year)
+        timings["summary_ten_years_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            rebuild_rollup(connection, account_id)
+        timings["rebuild_rollup_seconds"] = time.perf_counter() - started
+    finally:
+        with engine.begin() as connection:
+            for table in (
+                expenses_table,
+                expense_monthly_totals_table,
+                Account.__table__,
+            ):
+                connection.execute(delete(table).where(table.c.AccountID == account_id))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", action="append", default=[])
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    targets = []
+    if args.url:
+        for url in args.url:
+            engine = create_engine(url, **get_engine_options(url))
+            targets.append((url.split("://")[0], configure_engine(engine)))
+    else:
+        for name, tuned in (("sqlite-default", False), ("sqlite-tuned", True)):
+            url = "sqlite:///" + os.path.join(tmpdir.name, f"{name}.db")
+            engine = create_engine(url, **get_engine_options(url))
+            targets.append((name, configure_engine(engine) if tuned else engine))
+
+    results = {}
+    for name, engine in targets:
+        upgrade(engine)
+        rows = expense_rows(
+            random.Random(args.seed), None, [], args.rows, FXRates("USD")
+        )
+        results[name] = run(engine, rows, args.batch)
+        engine.dispose()
+    tmpdir.cleanup()
+
+    print(json.dumps({"rows": args.rows, "batch": args.batch, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
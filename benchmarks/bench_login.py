@@ -0,0 +1,164 @@
+"""Measure login throughput and cheap-page latency during a burst of logins.
+
+Usage: python benchmarks/bench_login.py [--logins 200] [--concurrency 32]
+
+Serves the app from a threaded local server and fires a burst of concurrent
+logins while another thread keeps requesting /ready. Runs once with hashing
+effectively unbounded (like hashing inline on every request thread) and once
+with the bounded hashing pool, and prints both as JSON.
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from database.models import db
+from database.schema import upgrade
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def request(url, data=None):
+    opener = urllib.request.build_opener(NoRedirect)
+    body = urllib.parse.urlencode(data).encode() if data is not None else None
+    try:
+        with opener.open(url, body, timeout=60) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(database_url, workers, queue, logins, concurrency):
+    app = create_app(
+        {
+            "SECRET_KEY": "bench",
+            "SQLALCHEMY_DATABASE_URI": database_url,
+            "WARM_UP_ON_START": False,
+            "PASSWORD_HASH_WORKERS": workers,
+            "PASSWORD_HASH_QUEUE": queue,
+        }
+    )
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    request(base + "/ready")
+
+    stop = threading.Event()
+    page_latencies = []
+
+    def poll_cheap_page():
+        while not stop.is_set():
+            started = time.perf_counter()
+            request(base + "/ready")
+            page_latencies.append(time.perf_counter() - started)
+            time.sleep(0.005)
+
+    # Baseline latency with no logins in flight
+    poller = threading.Thread(target=poll_cheap_page)
+    poller.start()
+    time.sleep(1)
+    stop.set()
+    poller.join()
+    idle = list(page_latencies)
+
+    page_latencies.clear()
+    stop.clear()
+    poller = threading.Thread(target=poll_cheap_page)
+    poller.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        statuses = list(
+            pool.map(
+                lambda _: request(
+                    base + "/login", {"username": "bench", "password": "bench-pw"}
+                ),
+                range(logins),
+            )
+        )
+    seconds = time.perf_counter() - started
+    stop.set()
+    poller.join()
+    server.shutdown()
+    app.extensions["password_hasher"].shutdown()
+    with app.app_context():
+        db.engine.dispose()
+
+    return {
+        "hash_workers": workers,
+        "hash_queue": queue,
+        "statuses": dict(Counter(statuses)),
+        "logins_per_second": statuses.count(302) / seconds,
+        "page_ms_idle_p50": statistics.median(idle) * 1000,
+        "page_ms_burst_p50": statistics.median(page_latencies) * 1000,
+        "page_ms_burst_p95": percentile(page_latencies, 95) * 1000,
+        "page_ms_burst_max": max(page_latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--queue", type=int, default=8)
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database_url = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+        app = create_app(
+            {
+                "SQLALCHEMY_DATABASE_URI": database_url,
+                "SECRET_KEY": "bench",
+                "WARM_UP_ON_START": False,
+            }
+        )
+        with app.app_context():
+            upgrade(db.engine)
+            db.engine.dispose()
+        with app.test_client() as client:
+            client.post(
+                "/create_account",
+                data={
+                    "username": "bench",
+                    "email": "bench@example.com",
+                    "password": "bench-pw",
+                },
+            )
+
+        # A pool as wide as the burst behaves like hashing on request threads
+        unbounded = run(
+            database_url, args.concurrency, args.logins, args.logins, args.concurrency
+        )
+        bounded = run(
+            database_url, args.workers, args.queue, args.logins, args.concurrency
+        )
+    print(json.dumps({"unbounded": unbounded, "bounded": bounded}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
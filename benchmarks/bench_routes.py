@@ -0,0 +1,243 @@
+"""Latency and throughput of the main routes against a synthetic dataset.
+
+Usage: python benchmarks/bench_routes.py [--accounts 1000] [--expenses 10000]
+           [--iterations 200] [--concurrency 8] [--duration 10] [--output FILE]
+
+Generates (or reuses) the dataset from benchmarks/synthetic.py and runs on a
+copy of it, so submitted expenses never leak into the next run. The app
+runs with its production settings, warming up in the background, and is
+only measured once /ready reports it warm. Each iteration logs a random
+account in and loads the index page, submits an expense and views the
+first page of expenses. The sequential scenario runs iterations one at a
+time through the Flask test client; the concurrent one runs them from
+--concurrency threads for --duration seconds. Prints p50/p95/p99 latency
+and throughput per route as JSON, with the git commit, so runs can be
+compared across commits.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from synthetic import ensure_dataset, PASSWORD, DEFAULT_DATA_DIR
+
+from app import create_app
+from database.tables import CATEGORY_LIST, MONTH_NAMES
+from utils.lifecycle import shutdown_worker
+
+ROUTES = ("login", "index", "submit", "view_expenses")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    values = sorted(values)
+    rank = max(1, -(-len(values) * pct // 100))  # Ceiling division
+    return values[int(rank) - 1]
+
+
+class Recorder:
+    """Collects latencies and failures per route from any number of threads."""
+
+    def __init__(self):
+        self.latencies = {route: [] for route in ROUTES}
+        self.errors = {route: 0 for route in ROUTES}
+        self._lock = threading.Lock()
+
+    def timed(self, route, func, expected_status):
+        started = time.perf_counter()
+        response = func()
+        response.get_data()  # Streamed pages render while being read
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[route].append(elapsed)
+            if response.status_code != expected_status:
+                self.errors[route] += 1
+        return response
+
+    def report(self, seconds):
+        routes = {}
+        for route in ROUTES:
+            latencies = self.latencies[route]
+            if not latencies:
+                continue
+            routes[route] = {
+                "count": len(latencies),
+                "errors": self.errors[route],
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "mean_ms": sum(latencies) / len(latencies) * 1000,
+                "throughput_rps": len(latencies) / seconds,
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "seconds": seconds,
+            "requests": total,
+            "throughput_rps": total / seconds,
+            "routes": routes,
+        }
+
+
+def run_iteration(client, recorder, rng, accounts, person_count):
+    account = rng.randint(1, accounts)
+    recorder.timed(
+        "login",
+        lambda: client.post(
+            "/login", data={"username": f"user{account}", "password": PASSWORD}
+        ),
+        302,
+    )
+    recorder.timed("index", lambda: client.get("/"), 200)
+
+    # Person ids were assigned in account order by the generator
+    first_person = (account - 1) * person_count + 1
+    scope = rng.choice(
+        ["Joint"] + [str(first_person + n) for n in range(person_count)]
+    )
+    form = {
+        "scope[]": scope,
+        "day[]": str(rng.randint(1, 28)),
+        "month[]": rng.choice(MONTH_NAMES),
+        "year[]": str(rng.randint(2015, 2024)),
+        "amount[]": f"{rng.uniform(1, 500):.2f}",
+        "category[]": rng.choice(CATEGORY_LIST),
+        "notes[]": "benchmark",
+    }
+    recorder.timed("submit", lambda: client.post("/submit", data=form), 302)
+    recorder.timed("view_expenses", lambda: client.get("/view_expenses"), 200)
+    client.get("/logout")
+
+
+def run_sequential(app, args):
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        run_iteration(client, recorder, rng, args.accounts, args.persons)
+    return recorder.report(time.perf_counter() - started)
+
+
+def run_concurrent(app, args):
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(number):
+        rng = random.Random(args.seed + number)
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            run_iteration(client, recorder, rng, args.accounts, args.persons)
+
+    threads = [
+        threading.Thread(target=worker, args=(number,))
+        for number in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = recorder.report(time.perf_counter() - started)
+    report["concurrency"] = args.concurrency
+    return report
+
+
+def wait_until_ready(app, timeout=60):
+    """Poll /ready, like a load balancer, until the warm-up has finished."""
+    client = app.test_client()
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get("/ready")
+        if response.status_code == 200:
+            return response.get_json()
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"App never became ready: {response.get_json()}")
+        time.sleep(0.1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--expenses", type=int, default=10000)
+    parser.add_argument("--persons", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--output", default=None, help="Also write JSON here.")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    # Keep stdout for the JSON report
+    dataset = ensure_dataset(
+        args.data_dir,
+        args.accounts,
+        args.expenses,
+        args.persons,
+        args.seed,
+        log=lambda message: print(message, file=sys.stderr),
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        working_copy = os.path.join(tmpdir, "bench.db")
+        shutil.copyfile(dataset, working_copy)
+        app = create_app(
+            {
+                "SECRET_KEY": "bench",
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///" + working_copy,
+                "WARM_UP_ON_START": True,
+            }
+        )
+        warm_up = wait_until_ready(app)  # Warm up outside the measurements
+
+        results = {
+            "commit": git_commit(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "dataset": {
+                "accounts": args.accounts,
+                "expenses_per_account": args.expenses,
+                "persons_per_account": args.persons,
+                "seed": args.seed,
+            },
+            "warm_up": warm_up,
+            "sequential": run_sequential(app, args),
+            "concurrent": run_concurrent(app, args),
+        }
+        shutdown_worker(app)  # Writes pending last logins, closes the pool
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Time notes search against a large SQLite database.
+
+Usage: python benchmarks/bench_search.py [--rows 1000000] [--accounts 100]
+           [--queries 200] [--url URL]
+
+Loads --rows expenses spread over --accounts accounts, with notes drawn
+from a small vocabulary so that common terms match many rows, then times
+random one- and two-term searches, with and without filters.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from synthetic import expense_rows
+
+from sqlalchemy import create_engine
+
+from database.models import Account
+from database.schema import upgrade
+from database.tables import expenses_table
+from utils.db_tools import get_engine_options, configure_engine
+from utils.fx import FXRates
+from utils.search import search_expenses
+
+WORDS = (
+    "plumber invoice grocery weekly shop dinner friends birthday gift rent "
+    "electric water internet phone repair garage tyres fuel train ticket hotel "
+    "flight pharmacy dentist gym coffee lunch books school uniform"
+).split()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = "sqlite:///" + os.path.join(tmpdir.name, "search.db")
+    engine = configure_engine(create_engine(url, **get_engine_options(url)))
+    upgrade(engine)
+    rng = random.Random(args.seed)
+
+    with engine.begin() as connection:
+        first_id = connection.execute(
+            Account.__table__.insert().values(AccountName=f"search-{time.time_ns()}")
+        ).inserted_primary_key[0]
+        connection.execute(
+            Account.__table__.insert(),
+            [
+                {"AccountName": f"search-{time.time_ns()}-{n}"}
+                for n in range(1, args.accounts)
+            ],
+        )
+    account_ids = list(range(first_id, first_id + args.accounts))
+
+    started = time.perf_counter()
+    per_account = args.rows // args.accounts
+    for account_id in account_ids:
+        rows = expense_rows(rng, account_id, [], per_account, FXRates("USD"))
+        for row in rows:
+            row["AdditionalNotes"] = " ".join(rng.sample(WORDS, rng.randint(0, 4)))
+        with engine.begin() as connection:
+            connection.execute(expenses_table.insert(), rows)
+    load_seconds = time.perf_counter() - started
+
+    scenarios = {
+        "one_term": lambda: {"text": rng.choice(WORDS)},
+        "two_terms": lambda: {"text": " ".join(rng.sample(WORDS, 2))},
+        "prefix": lambda: {"text": rng.choice(WORDS)[:3]},
+        "with_filters": lambda: {
+            "text": rng.choice(WORDS),
+            "start_date": date(2020, 1, 1),
+            "category": "Groceries",
+        },
+    }
+    results = {"rows": per_account * args.accounts, "load_seconds": load_seconds}
+    with engine.connect() as connection:
+        for name, make_args in scenarios.items():
+            latencies = []
+            for _ in range(args.queries):
+                kwargs = make_args()
+                text = kwargs.pop("text")
+                start = time.perf_counter()
+                search_expenses(
+                    connection,
+                    expenses_table,
+                    rng.choice(account_ids),
+                    text,
+                    **kwargs,
+                )
+                latencies.append(time.perf_counter() - start)
+            results[name] = {
+                "p50_ms": statistics.median(latencies) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "max_ms": max(latencies) * 1000,
+            }
+
+    print(json.dumps(results, indent=2))
+    engine.dispose()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure cold-start time: module import, create_app() and time until ready.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--url URL]
+
+Each run happens in a fresh interpreter. Defaults to a throwaway SQLite file;
+set --url to time the warm-up against a real database.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine
+
+from database.schema import upgrade
+
+# Runs inside the child interpreter and prints its timings as JSON
+CHILD = """
+import json, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+application = app_module.create_app({"WARM_UP_ON_START": True})
+created = time.perf_counter()
+application.extensions["warm_up"].wait()
+ready = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "create_app_seconds": created - imported,
+    "ready_seconds": ready - started,
+    "warm_up": application.extensions["warm_up"].status()["timings"],
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = args.url or "sqlite:///" + os.path.join(
+            tmpdir, "bench.db"
+        )
+        if args.url is None:
+            engine = create_engine(env["DATABASE_URL"])
+            upgrade(engine)
+            engine.dispose()
+
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, "-c", CHILD],
+                cwd=ROOT,
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in ("import_seconds", "create_app_seconds", "ready_seconds"):
+        values = sorted(run[key] for run in runs)
+        print(f"{key:>20}: median {values[len(values) // 2] * 1000:.1f} ms")
+    print(json.dumps(runs[-1]["warm_up"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
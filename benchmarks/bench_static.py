@@ -0,0 +1,152 @@
+"""Bytes and requests per page view, with and without asset fingerprinting.
+
+Usage: python benchmarks/bench_static.py [--expenses 50]
+
+Drives each page through a simulated browser cache: a first visit fetches
+the page and every stylesheet, script and icon it links, and a repeat
+visit revalidates whatever the cache can't reuse outright. The baseline
+serves plain static URLs uncompressed, as before; the optimized run builds
+fingerprinted, precompressed assets into a temporary copy of static/ and
+gzips dynamic responses. Bytes count response bodies as sent.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from database.models import db
+from database.schema import upgrade
+from utils.assets import Assets, build_assets
+
+PAGES = ("/login", "/", "/view_expenses", "/profile")
+ASSET_PATTERN = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+HEADERS = {"Accept-Encoding": "gzip, deflate, br"}
+
+
+class Browser:
+    """Just enough of an HTTP cache to count what a page view costs."""
+
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}  # url -> (validators, fresh forever)
+        self.last_assets = []
+
+    def fetch(self, url, stats):
+        validators, immutable = self.cache.get(url, ({}, False))
+        if immutable:
+            return None
+        response = self.client.get(url, headers={**HEADERS, **validators})
+        body = response.data
+        stats["requests"] += 1
+        stats["bytes"] += len(body)
+        cache_control = response.headers.get("Cache-Control", "")
+        if response.status_code == 200 and "no-store" not in cache_control:
+            validators = {}
+            if response.headers.get("ETag"):
+                validators["If-None-Match"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                validators["If-Modified-Since"] = response.headers["Last-Modified"]
+            self.cache[url] = (validators, "immutable" in cache_control)
+        return response
+
+    def view(self, page):
+        stats = {"requests": 0, "bytes": 0}
+        response = self.fetch(page, stats)
+        if response.status_code == 200:
+            html = response.get_data()
+            if response.headers.get("Content-Encoding") == "gzip":
+                html = gzip.decompress(html)
+            self.last_assets = ASSET_PATTERN.findall(html.decode())
+        for url in dict.fromkeys(self.last_assets):
+            self.fetch(url, stats)
+        return stats
+
+
+def run(app, expenses):
+    client = app.test_client()
+    client.post(
+        "/create_account",
+        data={"username": "bench", "email": "bench@example.com", "password": "pw"},
+    )
+    client.post(
+        "/api/v1/expenses",
+        json={
+            "expenses": [
+                {
+                    "scope": "Joint",
+                    "day": 1 + n % 28,
+                    "month": "March",
+                    "year": 2024,
+                    "amount": "12.50",
+                    "category": "Groceries",
+                    "notes": f"benchmark expense number {n}",
+                }
+                for n in range(expenses)
+            ]
+        },
+    )
+
+    results = {}
+    for page in PAGES:
+        browser = Browser(client)
+        results[page] = {"first": browser.view(page), "repeat": browser.view(page)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--expenses", type=int, default=50)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        static = os.path.join(tmpdir, "static")
+        for name, optimized in (("baseline", False), ("optimized", True)):
+            database = os.path.join(tmpdir, f"{name}.db")
+            app = create_app(
+                {
+                    "TESTING": True,
+                    "SECRET_KEY": "bench",
+                    "SQLALCHEMY_DATABASE_URI": "sqlite:///" + database,
+                    "WARM_UP_ON_START": False,
+                    "ASSETS_FINGERPRINT": optimized,
+                    "COMPRESS_RESPONSES": optimized,
+                }
+            )
+            if optimized:
+                shutil.copytree(
+                    app.static_folder,
+                    static,
+                    ignore=shutil.ignore_patterns("build"),
+                )
+                build_assets(static)
+                app.static_folder = static
+                app.extensions["assets"] = Assets(static)
+            with app.app_context():
+                upgrade(db.engine)
+            results[name] = run(app, args.expenses)
+            app.extensions["password_hasher"].shutdown()
+            with app.app_context():
+                db.engine.dispose()
+
+    for page in PAGES:
+        for visit in ("first", "repeat"):
+            before = results["baseline"][page][visit]
+            after = results["optimized"][page][visit]
+            results.setdefault("savings", {}).setdefault(page, {})[visit] = {
+                "requests": before["requests"] - after["requests"],
+                "bytes": before["bytes"] - after["bytes"],
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
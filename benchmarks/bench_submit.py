@@ -0,0 +1,104 @@
+"""Compare the row-by-row /submit insert loop with the batched insert path.
+
+Usage: python benchmarks/bench_submit.py [--rows 50] [--repeat 20] [--url URL]
+
+Defaults to a throwaway SQLite file so it runs without Azure SQL. Point --url at
+an MSSQL database to measure the effect of fast_executemany.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, delete
+
+from database.models import Account, Person
+from database.schema import upgrade
+from database.tables import expenses_table, CATEGORY_LIST
+from utils.db_tools import get_engine_options
+from utils.expenses import MONTH_NAMES, parse_expense_rows, insert_expenses
+
+
+def make_form_rows(count, person_id):
+    rows = []
+    for _ in range(count):
+        rows.append(
+            (
+                random.choice(["Joint", str(person_id)]),
+                str(random.randint(1, 28)),
+                random.choice(MONTH_NAMES),
+                str(random.randint(2015, 2024)),
+                f"{random.uniform(1, 5000):,.2f}",
+                random.choice(CATEGORY_LIST),
+                "benchmark row",
+            )
+        )
+    return rows
+
+
+def run_loop(engine, rows):
+    # Mirrors the original submit(): one INSERT statement per row
+    with engine.connect() as conn:
+        for row in rows:
+            conn.execute(expenses_table.insert().values(**row))
+        conn.commit()
+
+
+def run_batched(engine, rows):
+    with engine.begin() as conn:
+        insert_expenses(conn, expenses_table, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = "sqlite:///" + os.path.join(tmpdir.name, "bench.db")
+
+    engine = create_engine(url, **get_engine_options(url))
+    upgrade(engine)
+
+    with engine.begin() as conn:
+        account_id = conn.execute(
+            Account.__table__.insert().values(AccountName="bench", Currency="USD")
+        ).lastrowid
+        person_id = conn.execute(
+            Person.__table__.insert().values(AccountID=account_id, PersonName="bench")
+        ).lastrowid
+
+    form_rows = make_form_rows(args.rows, person_id)
+    rows, _ = parse_expense_rows(form_rows, account_id, "USD", person_ids=[person_id])
+
+    results = {}
+    for name, func in (("loop", run_loop), ("batched", run_batched)):
+        elapsed = 0.0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            func(engine, rows)
+            elapsed += time.perf_counter() - start
+            with engine.begin() as conn:
+                conn.execute(delete(expenses_table))
+        results[name] = args.rows * args.repeat / elapsed
+        print(f"{name:>8}: {results[name]:,.0f} rows/sec")
+
+    print(f" speedup: {results['batched'] / results['loop']:.1f}x")
+
+    engine.dispose()
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
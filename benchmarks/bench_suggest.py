@@ -0,0 +1,126 @@
+"""Throughput, accuracy and memory of the category suggestion models.
+
+Usage: python benchmarks/bench_suggest.py [--training 5000] [--models 100]
+           [--batch 1 --batch 50 --batch 500]
+
+Trains models on synthetic expenses whose notes and amounts depend on the
+category, then reports training time, suggestions per second for each
+batch size, accuracy on held-out rows, and memory per model, both as
+reported by the model and as measured by tracemalloc over --models models.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database.tables import CATEGORY_LIST
+from utils.suggest import CategoryModel
+
+COMMON_WORDS = "the for and with at from paid monthly weekly card cash online".split()
+
+
+def make_profiles(rng):
+    """Give each category its own keywords and typical amount."""
+    return {
+        category: (
+            [f"{category.split()[0].lower()}{n}" for n in range(rng.randint(3, 12))],
+            rng.uniform(1, 7),
+        )
+        for category in CATEGORY_LIST
+    }
+
+
+def make_examples(rng, profiles, count):
+    examples = []
+    for _ in range(count):
+        category = rng.choice(CATEGORY_LIST)
+        keywords, log_amount = profiles[category]
+        words = rng.sample(keywords, min(2, len(keywords))) + rng.sample(
+            COMMON_WORDS, rng.randint(0, 3)
+        )
+        if rng.random() < 0.2:
+            words = []  # Plenty of expenses have no notes
+        amount = round(rng.lognormvariate(log_amount, 0.5), 2)
+        examples.append((" ".join(words), amount, category))
+    return examples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--training", type=int, default=5000)
+    parser.add_argument("--test", type=int, default=20000)
+    parser.add_argument("--models", type=int, default=100)
+    parser.add_argument("--batch", type=int, action="append", default=[])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    batch_sizes = args.batch or [1, 50, 500]
+
+    rng = random.Random(args.seed)
+    profiles = make_profiles(rng)
+    training = make_examples(rng, profiles, args.training)
+    test = make_examples(rng, profiles, args.test)
+    notes = [text for text, _, _ in test]
+    amounts = [amount for _, amount, _ in test]
+
+    model = CategoryModel()
+    started = time.perf_counter()
+    model.learn(training)
+    training_seconds = time.perf_counter() - started
+
+    suggestions = model.suggest(notes, amounts)
+    correct = sum(
+        suggestion == category
+        for suggestion, (_, _, category) in zip(suggestions, test)
+    )
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        for offset in range(0, len(test), batch_size):
+            batch = slice(offset, offset + batch_size)
+            model.suggest(notes[batch], amounts[batch])
+        throughput[str(batch_size)] = len(test) / (time.perf_counter() - started)
+
+    # Online updates, one submitted expense at a time
+    started = time.perf_counter()
+    for example in test[:1000]:
+        model.learn([example])
+    learn_seconds = (time.perf_counter() - started) / 1000
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    models = []
+    for _ in range(args.models):
+        cached = CategoryModel()
+        cached.learn(training)
+        cached.suggest(notes[:1], amounts[:1])  # Build the scoring tables too
+        models.append(cached)
+    traced = (tracemalloc.get_traced_memory()[0] - before) / args.models
+    tracemalloc.stop()
+
+    print(
+        json.dumps(
+            {
+                "training_rows": args.training,
+                "test_rows": args.test,
+                "vocabulary": len(model.vocabulary),
+                "training_seconds": training_seconds,
+                "online_learn_ms": learn_seconds * 1000,
+                "accuracy": correct / len(test),
+                "suggestions_per_second": throughput,
+                "model_bytes": models[0].nbytes(),
+                "traced_bytes_per_model": traced,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
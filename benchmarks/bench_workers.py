@@ -0,0 +1,177 @@
+"""Throughput of the gunicorn launcher as worker processes are added.
+
+Usage: python benchmarks/bench_workers.py [--workers 1 --workers 2 ...]
+           [--threads 4] [--clients 16] [--duration 10]
+           [--accounts 100] [--expenses 1000]
+
+Starts `gunicorn --config gunicorn.conf.py wsgi:app` on a copy of the
+synthetic dataset once per --workers value, logs --clients keep-alive
+clients in as random accounts, and has them load the index page, the
+View Expenses page and a page of the expenses API in a loop for
+--duration seconds. Prints requests per second and p50/p95 latency for
+each worker count as JSON. The load generator runs on the same machine,
+so leave it cores to spare.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from synthetic import ensure_dataset, PASSWORD, DEFAULT_DATA_DIR
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PATHS = ("/", "/view_expenses", "/api/v1/expenses?limit=50")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def wait_until_ready(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/ready")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def log_in(port, account):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    body = urllib.parse.urlencode({"username": f"user{account}", "password": PASSWORD})
+    connection.request(
+        "POST",
+        "/login",
+        body,
+        {"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    response = connection.getresponse()
+    response.read()
+    cookie = response.getheader("Set-Cookie", "").split(";", 1)[0]
+    return connection, {"Cookie": cookie}
+
+
+def run_load(port, args, seed):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    start = threading.Barrier(args.clients + 1)
+    state = {}
+
+    def client(number):
+        nonlocal errors
+        rng = random.Random(seed + number)
+        connection, headers = log_in(port, rng.randint(1, args.accounts))
+        start.wait()
+        local = []
+        local_errors = 0
+        while time.monotonic() < state["deadline"]:
+            path = rng.choice(PATHS)
+            began = time.perf_counter()
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            local.append(time.perf_counter() - began)
+            if response.status != 200:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    threads = [
+        threading.Thread(target=client, args=(number,))
+        for number in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    state["deadline"] = time.monotonic() + args.duration
+    start.wait()  # Everyone is logged in; measure from here
+    began = time.monotonic()
+    for thread in threads:
+        thread.join()
+    seconds = time.monotonic() - began
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / seconds,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, action="append", default=[])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--expenses", type=int, default=1000)
+    parser.add_argument("--persons", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    args = parser.parse_args()
+    worker_counts = args.workers or [1, 2, 4]
+
+    dataset = ensure_dataset(
+        args.data_dir,
+        args.accounts,
+        args.expenses,
+        args.persons,
+        args.seed,
+        log=lambda message: print(message, file=sys.stderr),
+    )
+
+    results = {"cpus": os.cpu_count(), "threads": args.threads, "runs": {}}
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            working_copy = os.path.join(tmpdir, "bench.db")
+            shutil.copyfile(dataset, working_copy)
+            env = {
+                **os.environ,
+                "DATABASE_URL": "sqlite:///" + working_copy,
+                "FLASK_SECRET_KEY": "bench",
+                "GUNICORN_BIND": f"127.0.0.1:{args.port}",
+                "GUNICORN_ACCESS_LOG": "",
+                "WEB_CONCURRENCY": str(workers),
+                "WEB_THREADS": str(args.threads),
+            }
+            process = subprocess.Popen(
+                ["gunicorn", "--config", "gunicorn.conf.py", "wsgi:app"],
+                cwd=ROOT,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_until_ready(args.port, process)
+                results["runs"][str(workers)] = run_load(args.port, args, args.seed)
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
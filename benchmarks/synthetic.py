@@ -0,0 +1,166 @@
+"""Generate a synthetic dataset of accounts, persons and expenses.
+
+Usage: python benchmarks/synthetic.py [--accounts 1000] [--expenses 10000]
+           [--persons 2] [--seed 0] [--data-dir DIR]
+
+Writes a SQLite database that stands in for Azure SQL in the benchmarks.
+The same arguments always produce the same data, and an existing file for
+them is reused, so runs on different commits measure the same dataset.
+Every account's password is "bench-pw" and its username is user<N>.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, select
+from werkzeug.security import generate_password_hash
+
+from database.models import Account, Person
+from database.schema import upgrade
+from database.tables import expenses_table, CATEGORY_LIST, MONTH_NAMES
+from utils.fx import apply_adjusted_amounts, FXRates
+from utils.rollup import rebuild_rollup
+
+PASSWORD = "bench-pw"
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+INSERT_BATCH_SIZE = 10000
+FIRST_DATE = date(2015, 1, 1)
+DATE_RANGE_DAYS = 10 * 365
+
+
+def dataset_path(data_dir, accounts, expenses, persons, seed):
+    name = f"synthetic-{accounts}x{expenses}-p{persons}-s{seed}.db"
+    return os.path.join(data_dir, name)
+
+
+def expense_rows(rng, account_id, person_ids, count, rates):
+    rows = []
+    for _ in range(count):
+        expense_date = FIRST_DATE + timedelta(days=rng.randrange(DATE_RANGE_DAYS))
+        person_id = rng.choice([None] + person_ids)
+        rows.append(
+            {
+                "AccountID": account_id,
+                "ExpenseScope": "Joint" if person_id is None else "Individual",
+                "PersonID": person_id,
+                "Day": expense_date.day,
+                "Month": MONTH_NAMES[expense_date.month - 1],
+                "Year": expense_date.year,
+                "ExpenseDate": expense_date,
+                "Amount": round(rng.lognormvariate(3, 1), 2),
+                "ExpenseCategory": rng.choice(CATEGORY_LIST),
+                "AdditionalNotes": rng.choice(["", "", "weekly", "gift", "refund"]),
+                "Currency": "USD",
+            }
+        )
+    return apply_adjusted_amounts(rows, rates)
+
+
+def generate(url, accounts, expenses, persons, seed=0, log=print):
+    """Create the schema at `url` and fill it with synthetic data."""
+    rng = random.Random(seed)
+    engine = create_engine(url)
+    upgrade(engine)
+    rates = FXRates("USD")
+
+    # One hash for everyone: hashing thousands of passwords would dominate
+    # the generation time
+    password_hash = generate_password_hash(PASSWORD)
+    with engine.begin() as connection:
+        connection.execute(
+            Account.__table__.insert(),
+            [
+                {
+                    "AccountName": f"user{number}",
+                    "UserEmail": f"user{number}@example.com",
+                    "AccountDisplayName": f"User {number}",
+                    "Password": password_hash,
+                    "Currency": "USD",
+                }
+                for number in range(1, accounts + 1)
+            ],
+        )
+        account_ids = connection.execute(
+            select(Account.__table__.c.AccountID).order_by(
+                Account.__table__.c.AccountID
+            )
+        ).scalars().all()
+        connection.execute(
+            Person.__table__.insert(),
+            [
+                {"AccountID": account_id, "PersonName": f"Person {number}"}
+                for account_id in account_ids
+                for number in range(1, persons + 1)
+            ],
+        )
+        person_rows = connection.execute(
+            select(Person.__table__.c.AccountID, Person.__table__.c.PersonID)
+        ).all()
+
+    persons_by_account = {}
+    for account_id, person_id in person_rows:
+        persons_by_account.setdefault(account_id, []).append(person_id)
+
+    started = time.perf_counter()
+    batch = []
+    for index, account_id in enumerate(account_ids, start=1):
+        batch.extend(
+            expense_rows(
+                rng, account_id, persons_by_account.get(account_id, []), expenses, rates
+            )
+        )
+        if len(batch) >= INSERT_BATCH_SIZE or index == len(account_ids):
+            with engine.begin() as connection:
+                connection.execute(expenses_table.insert(), batch)
+            batch = []
+            log(f"  {index}/{len(account_ids)} accounts loaded")
+
+    with engine.begin() as connection:
+        rebuild_rollup(connection)
+    engine.dispose()
+    log(f"Generated {accounts * expenses} expenses in {time.perf_counter() - started:.1f}s")
+
+
+def ensure_dataset(data_dir, accounts, expenses, persons, seed=0, log=print):
+    """Return the path of the dataset for these arguments, generating it once."""
+    path = dataset_path(data_dir, accounts, expenses, persons, seed)
+    if os.path.exists(path):
+        engine = create_engine("sqlite:///" + path)
+        upgrade(engine)  # It may have been generated by an older schema
+        engine.dispose()
+        return path
+
+    os.makedirs(data_dir, exist_ok=True)
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    log(f"Generating {path}")
+    generate("sqlite:///" + partial, accounts, expenses, persons, seed, log)
+    os.replace(partial, path)  # Only complete datasets are ever reused
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--expenses", type=int, default=10000)
+    parser.add_argument("--persons", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    args = parser.parse_args()
+
+    print(
+        ensure_dataset(
+            args.data_dir, args.accounts, args.expenses, args.persons, args.seed
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,11 @@ from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
-db = SQLAlchemy()  # Initialize Flask-SQLAlchemy
+from database.tables import metadata
+
+# Initialize Flask-SQLAlchemy on the same MetaData as the Core tables so that
+# foreign keys between ORM models and Core tables resolve
+db = SQLAlchemy(metadata=metadata)
 
 
 class Account(UserMixin, db.Model):
@@ -19,6 +23,10 @@ class Account(UserMixin, db.Model):
     create_date = db.Column("CreateDate", db.Date)
     last_updated = db.Column("LastUpdated", db.Date)
     last_login_date = db.Column("LastLoginDate", db.Date)
+    # Bumped in the same transaction as every change to the account's data
+    data_version = db.Column(
+        "DataVersion", db.Integer, nullable=False, default=0, server_default="0"
+    )
 
     def set_password(self, password):
         self.password = generate_password_hash(password)
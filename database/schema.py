@@ -0,0 +1,282 @@
+# schema.py
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import Table, Column, Integer, String, DateTime, select, inspect
+from sqlalchemy.schema import CreateColumn
+
+from database.models import Account, Person
+from database.tables import (
+    metadata,
+    expenses_table,
+    categories_table,
+    expense_monthly_totals_table,
+    replica_heartbeat_table,
+)
+
+logger = logging.getLogger(__name__)
+
+# Records which migrations have been applied to the database
+schema_version_table = Table(
+    "schema_version",
+    metadata,
+    Column("Version", Integer, primary_key=True),
+    Column("Description", String(255)),
+    Column("AppliedAt", DateTime),
+)
+
+
+def create_tables(*tables):
+    def migrate(connection):
+        for table in tables:
+            table.create(connection, checkfirst=True)
+
+    return migrate
+
+
+def create_indexes(table):
+    def migrate(connection):
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            index.create(connection, checkfirst=True)
+
+    return migrate
+
+
+# Full-text index over expense notes. On SQLite it is a contentless FTS5
+# table kept in step with expenses by triggers; each row also carries an
+# "a<AccountID>" token so a search only walks the account's own postings.
+# PostgreSQL uses a GIN index over the notes' tsvector instead, SQL Server a
+# full-text index in its own catalog, and other databases search without an
+# index.
+NOTES_SEARCH_TABLE = "expense_notes_fts"
+MSSQL_NOTES_SEARCH_CATALOG = "expense_notes_catalog"
+
+SQLITE_NOTES_SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {NOTES_SEARCH_TABLE}
+    USING fts5(AccountKey, AdditionalNotes, content='')""",
+    f"""CREATE TRIGGER IF NOT EXISTS expenses_notes_search_insert
+    AFTER INSERT ON expenses BEGIN
+        INSERT INTO {NOTES_SEARCH_TABLE} (rowid, AccountKey, AdditionalNotes)
+        VALUES (new.ExpenseID, 'a' || new.AccountID, new.AdditionalNotes);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expenses_notes_search_delete
+    AFTER DELETE ON expenses BEGIN
+        INSERT INTO {NOTES_SEARCH_TABLE}
+            ({NOTES_SEARCH_TABLE}, rowid, AccountKey, AdditionalNotes)
+        VALUES ('delete', old.ExpenseID, 'a' || old.AccountID, old.AdditionalNotes);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS expenses_notes_search_update
+    AFTER UPDATE OF AccountID, AdditionalNotes ON expenses BEGIN
+        INSERT INTO {NOTES_SEARCH_TABLE}
+            ({NOTES_SEARCH_TABLE}, rowid, AccountKey, AdditionalNotes)
+        VALUES ('delete', old.ExpenseID, 'a' || old.AccountID, old.AdditionalNotes);
+        INSERT INTO {NOTES_SEARCH_TABLE} (rowid, AccountKey, AdditionalNotes)
+        VALUES (new.ExpenseID, 'a' || new.AccountID, new.AdditionalNotes);
+    END""",
+    # Index the expenses that existed before the table
+    f"""INSERT INTO {NOTES_SEARCH_TABLE} (rowid, AccountKey, AdditionalNotes)
+    SELECT ExpenseID, 'a' || AccountID, AdditionalNotes FROM expenses
+    WHERE ExpenseID NOT IN (SELECT rowid FROM {NOTES_SEARCH_TABLE})""",
+]
+
+POSTGRESQL_NOTES_SEARCH_DDL = [
+    """CREATE INDEX IF NOT EXISTS ix_expenses_notes_search ON expenses
+    USING gin (to_tsvector('simple', coalesce("AdditionalNotes", '')))""",
+]
+
+
+def create_notes_search(connection):
+    statements = {
+        "sqlite": SQLITE_NOTES_SEARCH_DDL,
+        "postgresql": POSTGRESQL_NOTES_SEARCH_DDL,
+    }.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def create_mssql_notes_search(connection):
+    """Create SQL Server's full-text index over expense notes.
+
+    Full-text DDL can't run in a transaction, so it runs on its own
+    autocommit connection. Servers without the full-text feature keep
+    searching without an index. The index is kept up to date in the
+    background, so new notes become searchable a few seconds after they
+    are written.
+    """
+    if connection.dialect.name != "mssql":
+        return
+    installed = connection.exec_driver_sql(
+        "SELECT FULLTEXTSERVICEPROPERTY('IsFullTextInstalled')"
+    ).scalar()
+    if installed != 1:
+        logger.warning("Full-text search isn't installed; notes search will scan")
+        return
+
+    # The full-text key must be a unique, single-column index: the primary key
+    key_index = connection.exec_driver_sql(
+        "SELECT name FROM sys.indexes "
+        "WHERE object_id = OBJECT_ID('expenses') AND is_primary_key = 1"
+    ).scalar()
+    statements = [
+        f"""IF NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs
+            WHERE name = '{MSSQL_NOTES_SEARCH_CATALOG}')
+        CREATE FULLTEXT CATALOG {MSSQL_NOTES_SEARCH_CATALOG}""",
+        f"""IF NOT EXISTS (SELECT 1 FROM sys.fulltext_indexes
+            WHERE object_id = OBJECT_ID('expenses'))
+        CREATE FULLTEXT INDEX ON expenses (AdditionalNotes)
+        KEY INDEX [{key_index}] ON {MSSQL_NOTES_SEARCH_CATALOG}
+        WITH CHANGE_TRACKING AUTO""",
+    ]
+    autocommit = connection.engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    )
+    with autocommit:
+        for statement in statements:
+            autocommit.exec_driver_sql(statement)
+
+
+def create_replica_heartbeat(connection):
+    replica_heartbeat_table.create(connection, checkfirst=True)
+    exists = connection.execute(select(replica_heartbeat_table.c.HeartbeatID)).first()
+    if exists is None:
+        connection.execute(
+            replica_heartbeat_table.insert().values(HeartbeatID=1, BeatAt=0.0)
+        )
+
+
+def add_columns(table, *names):
+    def migrate(connection):
+        columns = inspect(connection).get_columns(table.name)
+        existing = {column["name"] for column in columns}
+        table_name = connection.dialect.identifier_preparer.format_table(table)
+        for name in names:
+            if name not in existing:
+                column = CreateColumn(table.c[name]).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table_name} ADD {column}")
+
+    return migrate
+
+
+# Ordered (version, description, migration) steps. Every step is safe to run
+# against a database whose tables were created by hand, so existing
+# deployments can be brought under version control by upgrading them.
+MIGRATIONS = [
+    (
+        1,
+        "Create base tables",
+        create_tables(
+            Account.__table__, Person.__table__, categories_table, expenses_table
+        ),
+    ),
+    (2, "Create monthly totals rollup", create_tables(expense_monthly_totals_table)),
+    (3, "Add expense access path indexes", create_indexes(expenses_table)),
+    (4, "Add expense notes search index", create_notes_search),
+    (5, "Add replica heartbeat", create_replica_heartbeat),
+    (6, "Add account data versions", add_columns(Account.__table__, "DataVersion")),
+    (7, "Add SQL Server notes search index", create_mssql_notes_search),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(connection):
+    schema_version_table.create(connection, checkfirst=True)
+    query = select(schema_version_table.c.Version).order_by(
+        schema_version_table.c.Version.desc()
+    )
+    return connection.execute(query).scalars().first() or 0
+
+
+# Held while upgrading, so that servers starting together upgrade in turn
+UPGRADE_LOCK_NAME = "expenses_schema_upgrade"
+UPGRADE_LOCK_ID = 7_201_511  # pg_advisory_lock() takes a number
+UPGRADE_LOCK_TIMEOUT_MS = 10 * 60 * 1000
+
+UPGRADE_LOCK_SQL = {
+    "mssql": (
+        f"EXEC sp_getapplock @Resource = '{UPGRADE_LOCK_NAME}', "
+        "@LockMode = 'Exclusive', @LockOwner = 'Session', "
+        f"@LockTimeout = {UPGRADE_LOCK_TIMEOUT_MS}",
+        f"EXEC sp_releaseapplock @Resource = '{UPGRADE_LOCK_NAME}', "
+        "@LockOwner = 'Session'",
+    ),
+    "postgresql": (
+        f"SELECT pg_advisory_lock({UPGRADE_LOCK_ID})",
+        f"SELECT pg_advisory_unlock({UPGRADE_LOCK_ID})",
+    ),
+}
+
+
+@contextmanager
+def upgrade_lock(engine):
+    """Hold a database-wide lock for the duration of an upgrade.
+
+    The lock belongs to its own connection, outside the migrations'
+    transactions. SQLite databases are only ever upgraded from one host,
+    so they go without.
+    """
+    statements = UPGRADE_LOCK_SQL.get(engine.dialect.name)
+    if statements is None:
+        yield
+        return
+    lock, unlock = statements
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql(lock)
+        try:
+            yield
+        finally:
+            connection.exec_driver_sql(unlock)
+
+
+def upgrade(engine, target=None):
+    """Apply pending migrations in order, each in its own transaction.
+
+    Safe to run from several servers at once: they take turns, and the ones
+    that come later find the migrations already applied. Returns the list
+    of versions applied.
+    """
+    target = LATEST_VERSION if target is None else target
+    with upgrade_lock(engine):
+        with engine.begin() as connection:
+            version = get_schema_version(connection)
+
+        applied = []
+        for migration_version, description, migrate in MIGRATIONS:
+            if migration_version <= version or migration_version > target:
+                continue
+            with engine.begin() as connection:
+                migrate(connection)
+                connection.execute(
+                    schema_version_table.insert().values(
+                        Version=migration_version,
+                        Description=description,
+                        AppliedAt=datetime.utcnow(),
+                    )
+                )
+            applied.append(migration_version)
+    return applied
+
+
+def explain(connection, query):
+    """Return the query plan for a statement, as lines of text.
+
+    Supported for SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN).
+    """
+    dialect = connection.dialect.name
+    compiled = query.compile(dialect=connection.dialect)
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+        column = 3  # (id, parent, notused, detail)
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+        column = 0
+    else:
+        raise NotImplementedError(f"Query plans aren't supported for {dialect}")
+
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    rows = connection.exec_driver_sql(prefix + str(compiled), params)
+    return [row[column] for row in rows]
@@ -9,6 +9,7 @@ from sqlalchemy import (
     Float,
     Boolean,
     ForeignKey,
+    Index,
 )
 
 metadata = MetaData()
@@ -50,6 +51,22 @@ CATEGORY_LIST = [
     "Landlord Expenses",
 ]
 
+# Month names as submitted by the entry form (see templates/index.html)
+MONTH_NAMES = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
 # Define the expenses table
 expenses_table = Table(
     "expenses",
@@ -83,6 +100,30 @@ expenses_table = Table(
     implicit_returning=False,
 )
 
+# Indexes for the per-account access paths. The (AccountID, ExpenseDate,
+# ExpenseID) index serves keyset pagination, exports and duplicate checks;
+# on SQL Server and PostgreSQL it also carries the listed columns so that
+# the View Expenses page is answered from the index alone
+Index(
+    "ix_expenses_account_date_id",
+    expenses_table.c.AccountID,
+    expenses_table.c.ExpenseDate,
+    expenses_table.c.ExpenseID,
+    mssql_include=["Amount", "ExpenseCategory", "AdditionalNotes", "Currency"],
+    postgresql_include=["Amount", "ExpenseCategory", "AdditionalNotes", "Currency"],
+)
+Index(
+    "ix_expenses_account_year_month",
+    expenses_table.c.AccountID,
+    expenses_table.c.Year,
+    expenses_table.c.Month,
+)
+Index(
+    "ix_expenses_account_category",
+    expenses_table.c.AccountID,
+    expenses_table.c.ExpenseCategory,
+)
+
 # Define the categories table
 categories_table = Table(
     "categories",
@@ -93,3 +134,32 @@ categories_table = Table(
     Column("LastUpdated", Date),
     extend_existing=False,
 )
+
+# PersonID stored in the rollup for joint expenses, since the key columns
+# can't be NULL
+JOINT_PERSON_ID = 0
+
+# Define the monthly rollup table, maintained incrementally alongside expenses
+expense_monthly_totals_table = Table(
+    "expense_monthly_totals",
+    metadata,
+    Column("AccountID", Integer, ForeignKey("accounts.AccountID"), primary_key=True),
+    Column("Year", Integer, primary_key=True),
+    Column("Month", Integer, primary_key=True),  # 1-12, unlike expenses.Month
+    Column("ExpenseCategory", String(255), primary_key=True),
+    Column("PersonID", Integer, primary_key=True),  # JOINT_PERSON_ID if joint
+    Column("TotalAmount", Float, nullable=False),
+    Column("ExpenseCount", Integer, nullable=False),
+    extend_existing=False,
+)
+
+# Single-row table that the primary stamps with the current time now and
+# then. A read replica's copy of the stamp shows how far behind it is (see
+# utils/replica.py)
+replica_heartbeat_table = Table(
+    "replica_heartbeat",
+    metadata,
+    Column("HeartbeatID", Integer, primary_key=True),
+    Column("BeatAt", Float, nullable=False),  # Unix time
+    extend_existing=False,
+)
@@ -0,0 +1,48 @@
+"""Gunicorn settings: gunicorn --config gunicorn.conf.py wsgi:app
+
+The app is preloaded once in the master process and forked into WEB_CONCURRENCY
+worker processes of WEB_THREADS threads each. Requests mostly wait on the
+database, so a few threads per process cover that, while keeping fewer
+processes keeps the per-process caches warmer. Each worker gets its own
+connection pool, so the database sees up to
+WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+
+On SIGTERM, workers stop accepting connections, finish the requests in
+flight for up to GRACEFUL_TIMEOUT seconds, then write their pending last
+login dates before exiting.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() + 1)))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true") == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None  # Empty disables it
+
+# One pooled connection per request thread, and the hashing threads shared
+# out between the workers instead of multiplied by them. Read when the app
+# is created, which happens after this file is loaded
+os.environ.setdefault("DB_POOL_SIZE", str(threads))
+os.environ.setdefault(
+    "PASSWORD_HASH_WORKERS", str(max(1, multiprocessing.cpu_count() // workers))
+)
+
+
+def post_fork(server, worker):
+    import wsgi
+    from utils.lifecycle import init_worker
+
+    init_worker(wsgi.app, warm_up=wsgi.WARM_UP_ON_START)
+
+
+def worker_exit(server, worker):
+    import wsgi
+    from utils.lifecycle import shutdown_worker
+
+    shutdown_worker(wsgi.app)
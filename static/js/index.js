@@ -2,8 +2,8 @@
 let currency = document.body.getAttribute('user-currency');
 let currencySymbol = currency === 'USD' ? '$' : '€';
 
-// Access list of persons associated with the current user
-let persons_json = JSON.parse(document.body.getAttribute('persons_json') || '[]');
+// Persons associated with the current user, filled in by loadBootstrap()
+let persons_json = [];
 
 // Get all elements with the class 'amount-input-wrapper'
 let elements = document.getElementsByClassName('amount-input-wrapper');
@@ -112,5 +112,146 @@ form.addEventListener('submit', function(event) {
             return;  // Exit the function
         }
     }
+
+    // Save through the JSON API so the page doesn't reload after each save.
+    // Browsers without fetch fall back to the regular form post
+    if (window.fetch) {
+        event.preventDefault();
+        submitExpenses();
+    }
 });
 
+function collectExpenses() {
+    var rows = document.getElementById('inputTable').rows;
+    var expenses = [];
+    for (var i = 1; i < rows.length; i++) { // Skip the header row
+        expenses.push({
+            scope: rows[i].querySelector('[name="scope[]"]').value,
+            day: rows[i].querySelector('[name="day[]"]').value,
+            month: rows[i].querySelector('[name="month[]"]').value,
+            year: rows[i].querySelector('[name="year[]"]').value,
+            amount: rows[i].querySelector('[name="amount[]"]').value,
+            category: rows[i].querySelector('[name="category[]"]').value,
+            notes: rows[i].querySelector('[name="notes[]"]').value
+        });
+    }
+    return expenses;
+}
+
+function showMessages(messages) {
+    var list = document.querySelector('.flash-messages');
+    if (!list) {
+        list = document.createElement('ul');
+        list.className = 'flash-messages';
+        form.parentNode.insertBefore(list, form);
+    }
+    list.innerHTML = '';
+    messages.forEach(function(message) {
+        var item = document.createElement('li');
+        item.textContent = message;
+        list.appendChild(item);
+    });
+}
+
+function clearRow(row) {
+    // Keep scope, month, year and category to speed up the next entry
+    row.querySelector('[name="day[]"]').value = '';
+    row.querySelector('[name="amount[]"]').value = '';
+    row.querySelector('[name="notes[]"]').value = '';
+}
+
+function submitExpenses() {
+    var submitBtn = form.querySelector('button[type="submit"]');
+    submitBtn.disabled = true;
+
+    fetch('/api/v1/expenses', {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: {'Content-Type': 'application/json', 'Accept': 'application/json'},
+        body: JSON.stringify({expenses: collectExpenses()})
+    })
+    .then(function(response) {
+        return response.json();
+    })
+    .then(function(report) {
+        var messages = [];
+        if (report.error) {
+            messages.push(report.error);
+        }
+        if (report.accepted) {
+            messages.push('Success: saved ' + report.accepted + ' expense(s).');
+        }
+
+        // Drop saved rows and keep rejected ones for correction. Walk
+        // backwards so that row numbers stay valid while deleting
+        var table = document.getElementById('inputTable');
+        var results = report.rows || [];
+        for (var i = results.length - 1; i >= 0; i--) {
+            var row = table.rows[results[i].row];
+            if (results[i].status === 'rejected') {
+                row.classList.add('rejected-row');
+            } else if (table.rows.length > 2) {
+                table.deleteRow(results[i].row);
+            } else {
+                row.classList.remove('rejected-row');
+                clearRow(row);
+            }
+        }
+        results.forEach(function(result) {
+            if (result.status === 'rejected') {
+                messages.push('Row ' + result.row + ' rejected: ' + result.errors.join('; '));
+            }
+        });
+        showMessages(messages);
+    })
+    .catch(function() {
+        showMessages(['Could not save expenses, please try again.']);
+    })
+    .finally(function() {
+        submitBtn.disabled = false;
+    });
+}
+
+
+function addOptions(select, options) {
+    options.forEach(function(option) {
+        var element = document.createElement('option');
+        element.value = option.value;
+        element.textContent = option.label;
+        select.appendChild(element);
+    });
+}
+
+// Categories and persons come from the bootstrap API once per visit. The
+// browser revalidates it with its ETag, so a repeat visit transfers nothing
+// until the account's persons or the categories change
+function loadBootstrap() {
+    var submitBtn = form.querySelector('button[type="submit"]');
+    fetch('/api/v1/bootstrap', {
+        credentials: 'same-origin',
+        headers: {'Accept': 'application/json'}
+    })
+    .then(function(response) {
+        if (!response.ok) {
+            throw new Error('Bootstrap failed: ' + response.status);
+        }
+        return response.json();
+    })
+    .then(function(bootstrap) {
+        persons_json = bootstrap.persons;
+        var persons = persons_json.map(function(person) {
+            return {value: person.PersonID, label: person.PersonName};
+        });
+        var categories = bootstrap.categories.map(function(category) {
+            return {value: category, label: category};
+        });
+        addOptions(form.querySelector('select[name="scope[]"]'), persons);
+        addOptions(form.querySelector('select[name="category[]"]'), categories);
+        submitBtn.disabled = false;
+    })
+    .catch(function() {
+        showMessages(['Could not load categories and persons, please reload the page.']);
+    });
+}
+
+loadBootstrap();
@@ -0,0 +1,77 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from app import create_app
+from database.models import db
+from database.schema import upgrade
+from utils import analytics
+from utils.db_tools import category_cache
+from utils.session import account_cache
+from utils.fx import rates_cache
+from utils.persons import roster_cache
+from utils.suggest import model_cache
+from utils.page_cache import page_cache
+
+STATS_TOKEN = "stats-token"
+STATS = {"Authorization": f"Bearer {STATS_TOKEN}"}  # Headers for /stats and /metrics
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # Caches are per process, so clear them between tests' databases
+    yield
+    analytics.column_cache.invalidate()
+    category_cache.invalidate()
+    account_cache.invalidate()
+    rates_cache.invalidate()
+    roster_cache.invalidate()
+    model_cache.invalidate()
+    page_cache.invalidate()
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    apps = []
+
+    def make_app(**config):
+        app = create_app(
+            {
+                "TESTING": True,
+                "SECRET_KEY": "test",
+                "STATS_TOKEN": STATS_TOKEN,
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+                **config,
+            }
+        )
+        with app.app_context():
+            upgrade(db.engine)
+        apps.append(app)
+        return app
+
+    yield make_app
+
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+def log_in(client):
+    client.post(
+        "/create_account",
+        data={"username": "tester", "email": "tester@example.com", "password": "pw"},
+    )
+    return client
+
+
+@pytest.fixture
+def auth_client(app):
+    return log_in(app.test_client())
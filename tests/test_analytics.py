@@ -0,0 +1,87 @@
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from database.models import db
+from database.tables import expenses_table
+from utils import analytics
+from utils.expenses import parse_expense_rows, record_expenses
+from utils.session import account_cache
+
+
+def make_columns():
+    rows = [
+        (date(2024, 1, 5), 10.0, "Groceries", None),
+        (date(2024, 1, 20), 30.0, "Gasoline", 7),
+        (date(2024, 3, 1), 20.0, "Groceries", 7),
+        (date(2024, 3, 2), 5.0, "Custom category", None),
+    ]
+    return analytics.build_columns(rows, person_ids=[7, 8])
+
+
+def test_build_columns_uses_compact_codes():
+    columns = make_columns()
+    assert columns.days.dtype == np.int32
+    assert columns.categories.dtype == np.int16
+    assert columns.days[0] == (date(2024, 1, 5) - date(1970, 1, 1)).days
+    assert columns.category_names[-1] == "Custom category"
+    assert columns.persons.tolist() == [0, 1, 1, 0]
+
+
+def test_summary_statistics():
+    columns = make_columns()
+    summary = analytics.summarize(columns, window=2)
+
+    assert summary["category_totals"]["Groceries"] == 30.0
+    assert summary["months"] == ["2024-01", "2024-02", "2024-03"]
+    assert summary["monthly_totals"] == [40.0, 0.0, 25.0]
+    assert summary["month_over_month_change"] == [None, -40.0, 25.0]
+    assert summary["month_over_month_percent"] == [None, -100.0, None]
+    assert summary["rolling_average"] == [40.0, 20.0, 12.5]
+    assert summary["person_split"] == {"joint": 15.0, "individual": {7: 50.0, 8: 0.0}}
+
+    _, groceries = analytics.monthly_totals(columns, category="Groceries")
+    assert groceries.tolist() == [10.0, 0.0, 20.0]
+
+
+def test_empty_account():
+    summary = analytics.summarize(analytics.build_columns([], person_ids=[]))
+    assert summary["expense_count"] == 0
+    assert summary["monthly_totals"] == []
+
+
+def test_analytics_endpoint_refreshes_after_submit(auth_client):
+    assert auth_client.get("/analytics").json["expense_count"] == 0
+
+    form = {
+        "scope[]": ["Joint"],
+        "day[]": ["1"],
+        "month[]": ["March"],
+        "year[]": ["2024"],
+        "amount[]": ["12.5"],
+        "category[]": ["Groceries"],
+        "notes[]": [""],
+    }
+    auth_client.post("/submit", data=form)
+
+    response = auth_client.get("/analytics?window=6")
+    assert response.json["expense_count"] == 1
+    assert response.json["person_split"]["joint"] == 12.5
+    assert auth_client.get("/analytics?window=0").status_code == 400
+
+
+def test_analytics_follow_writes_made_by_other_workers(app, auth_client):
+    assert auth_client.get("/analytics").json["expense_count"] == 0  # Cached
+
+    # Another worker records an expense, bumping the account's data version
+    rows = [("Joint", "1", "March", "2024", "12.5", "Groceries", "")]
+    accepted, _ = parse_expense_rows(rows, 1, "USD")
+    with app.app_context(), db.engine.begin() as connection:
+        record_expenses(connection, expenses_table, accepted)
+
+    account_cache.invalidate()  # This worker's account snapshot expires
+    assert auth_client.get("/analytics").json["expense_count"] == 1
@@ -0,0 +1,97 @@
+from conftest import log_in
+
+
+def expense(**overrides):
+    return {
+        "scope": "Joint",
+        "day": 5,
+        "month": "March",
+        "year": 2024,
+        "amount": "12.50",
+        "category": "Groceries",
+        "notes": "",
+        **overrides,
+    }
+
+
+def test_api_requires_login(app):
+    response = app.test_client().get("/api/v1/bootstrap")
+    assert response.status_code == 401
+    assert response.get_json() == {"error": "Authentication required"}
+
+
+def test_bootstrap_returns_categories_and_persons(auth_client):
+    response = auth_client.get("/api/v1/bootstrap")
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert data["account"]["currency"] == "USD"
+    assert "Groceries" in data["categories"]
+    assert [person["PersonName"] for person in data["persons"]] == ["tester"]
+
+    cached = auth_client.get(
+        "/api/v1/bootstrap", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert cached.status_code == 304
+
+
+def test_post_expenses_saves_batch_and_reports_rows(auth_client):
+    response = auth_client.post(
+        "/api/v1/expenses",
+        json={"expenses": [expense(), expense(day=31, month="February")]},
+    )
+    report = response.get_json()
+
+    assert response.status_code == 201
+    assert report["accepted"] == 1
+    assert report["rows"][1]["status"] == "rejected"
+
+
+def test_post_expenses_rejects_malformed_body(auth_client):
+    assert auth_client.post("/api/v1/expenses", json=[expense()]).status_code == 400
+    response = auth_client.post(
+        "/api/v1/expenses", json={"expenses": [expense(amount="x")]}
+    )
+    assert response.status_code == 400
+    assert response.get_json()["rejected"] == 1
+
+
+def test_post_expenses_rejects_batches_over_the_limit(make_app):
+    client = log_in(make_app(API_MAX_BATCH_SIZE=2).test_client())
+    response = client.post("/api/v1/expenses", json={"expenses": [expense()] * 3})
+    assert response.status_code == 413
+    assert response.get_json() == {
+        "error": "At most 2 expenses can be saved per request"
+    }
+    assert client.get("/api/v1/expenses").get_json()["expenses"] == []
+
+    response = client.post("/api/v1/expenses", json={"expenses": [expense()] * 2})
+    assert response.status_code == 201
+
+
+def test_post_expenses_rejects_fields_of_the_wrong_type(auth_client):
+    response = auth_client.post(
+        "/api/v1/expenses",
+        json={"expenses": [expense(notes=5), expense(category=["Groceries"])]},
+    )
+    assert response.status_code == 400
+    rows = response.get_json()["rows"]
+    assert rows[0]["errors"] == ["Invalid notes: 5"]
+    assert rows[1]["errors"] == ["Unknown category: ['Groceries']"]
+
+
+def test_get_expenses_pages_with_cursor(auth_client):
+    auth_client.post(
+        "/api/v1/expenses",
+        json={"expenses": [expense(day=day, notes=str(day)) for day in (1, 2, 3)]},
+    )
+
+    first = auth_client.get("/api/v1/expenses?limit=2").get_json()
+    assert [row["AdditionalNotes"] for row in first["expenses"]] == ["3", "2"]
+    assert first["expenses"][0]["ExpenseDate"] == "2024-03-03"
+
+    second = auth_client.get(
+        f"/api/v1/expenses?limit=2&after={first['next_cursor']}"
+    ).get_json()
+    assert [row["AdditionalNotes"] for row in second["expenses"]] == ["1"]
+    assert second["next_cursor"] is None
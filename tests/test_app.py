@@ -0,0 +1,66 @@
+import sys
+import os
+import subprocess
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.db_tools import get_categories
+from database.tables import categories_table, CATEGORY_LIST
+from database.models import db
+
+
+def test_import_does_no_database_work():
+    # Importing the module must not probe ODBC drivers or touch the database
+    code = "import sys, app; assert 'pyodbc' not in sys.modules; assert 'app' not in vars(app)"
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.join(os.path.dirname(__file__), ".."),
+        check=True,
+    )
+
+
+def test_ready_reports_warm_up(app):
+    client = app.test_client()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json["status"] == "ready"
+    assert set(response.json["timings"]) >= {
+        "seed_categories",
+        "prefill_pool",
+        "load_categories",
+    }
+
+    # The warm-up seeded the categories table exactly once
+    with app.app_context():
+        assert sorted(get_categories(db.engine, categories_table)) == sorted(
+            CATEGORY_LIST
+        )
+    assert client.get("/ready").status_code == 200
+
+
+def test_login_required_redirects(app):
+    response = app.test_client().get("/")
+    assert response.status_code == 302
+    assert "/login" in response.headers["Location"]
+
+
+def test_submit_and_view_expenses(auth_client):
+    form = {
+        "scope[]": ["Joint", "Joint"],
+        "day[]": ["1", "31"],
+        "month[]": ["March", "February"],
+        "year[]": ["2024", "2024"],
+        "amount[]": ["1,200", "5"],
+        "category[]": ["Groceries", "Groceries"],
+        "notes[]": ["first", "bad date"],
+    }
+    response = auth_client.post(
+        "/submit", data=form, headers={"Accept": "application/json"}
+    )
+    assert response.status_code == 200
+    assert response.json["accepted"] == 1
+    assert response.json["rows"][1]["status"] == "rejected"
+
+    page = auth_client.get("/view_expenses").get_data(as_text=True)
+    assert "$1,200.00" in page
+    assert "bad date" not in page
@@ -0,0 +1,83 @@
+import sys
+import os
+import gzip
+import shutil
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.assets import Assets, build_assets, load_manifest
+from conftest import STATS
+
+GZIP = {"Accept-Encoding": "gzip, deflate"}
+
+
+def build_static_copy(app, tmp_path):
+    static = tmp_path / "static"
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns("build"))
+    manifest, summary = build_assets(str(static))
+    app.static_folder = str(static)
+    app.extensions["assets"] = Assets(app.static_folder)
+    return static, manifest, summary
+
+
+def test_build_fingerprints_and_precompresses(app, tmp_path):
+    static, manifest, summary = build_static_copy(app, tmp_path)
+
+    hashed = manifest["css/main.css"]
+    assert hashed.startswith("css/main.") and hashed.endswith(".css")
+    built = static / "build" / hashed
+    assert built.read_bytes() == (static / "css" / "main.css").read_bytes()
+    assert gzip.decompress((static / "build" / (hashed + ".gz")).read_bytes()) == (
+        built.read_bytes()
+    )
+    png = manifest["img/favicon/favicon-16x16.png"]
+    assert not (static / "build" / (png + ".gz")).exists()  # Already compressed
+    assert summary["files"] == len(manifest)
+    assert load_manifest(str(static)) == manifest
+
+    # Rebuilding unchanged files gives the same names, swapped in whole
+    assert build_assets(str(static))[0] == manifest
+    assert load_manifest(str(static)) == manifest
+    assert [path.name for path in static.glob("build*")] == ["build"]
+
+
+def test_pages_link_fingerprinted_assets_served_immutable(app, auth_client, tmp_path):
+    _, manifest, _ = build_static_copy(app, tmp_path)
+    page = auth_client.get("/").get_data(as_text=True)
+    url = f"/static/build/{manifest['js/index.js']}"
+    assert url in page
+
+    response = auth_client.get(url, headers=GZIP)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.mimetype == "text/javascript"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+    assert "Accept-Encoding" in response.headers["Vary"]
+    plain = auth_client.get(url)
+    assert "Content-Encoding" not in plain.headers
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_unbuilt_assets_keep_plain_urls(auth_client):
+    page = auth_client.get("/").get_data(as_text=True)
+    assert "/static/js/index.js" in page
+
+
+def test_dynamic_responses_are_gzipped_when_accepted(auth_client):
+    for path in ("/", "/view_expenses"):  # Rendered and streamed pages
+        response = auth_client.get(path, headers=GZIP)
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert "</html>" in gzip.decompress(response.data).decode()
+        assert auth_client.get(path).headers.get("Content-Encoding") is None
+
+    # The weakened ETag still revalidates
+    response = auth_client.get("/", headers=GZIP)
+    assert response.headers["ETag"].startswith("W/")
+    cached = auth_client.get(
+        "/", headers={**GZIP, "If-None-Match": response.headers["ETag"]}
+    )
+    assert cached.status_code == 304
+
+    # Too small to be worth it
+    response = auth_client.get("/stats/cache", headers={**GZIP, **STATS})
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,64 @@
+import sys
+import os
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.cache import TTLCache
+
+
+def test_cache_hits_until_invalidated():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get("key", loader) == 1
+    assert cache.get("key", loader) == 1
+    cache.invalidate("key")
+    assert cache.get("key", loader) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_expires_and_evicts():
+    cache = TTLCache(ttl=0.01, maxsize=2)
+    cache.get("a", lambda: "a")
+    time.sleep(0.02)
+    assert cache.get("a", lambda: "reloaded") == "reloaded"
+
+    cache.get("b", lambda: "b")
+    cache.get("c", lambda: "c")  # Evicts the least recently used key, "a"
+    assert cache.loaded_at("a") is None
+    assert cache.stats()["size"] == 2
+
+
+def test_cache_drops_values_invalidated_while_loading():
+    cache = TTLCache(ttl=60)
+
+    def racing_loader():
+        cache.invalidate("key")  # The data changes while it's being read
+        return "old"
+
+    assert cache.get("key", racing_loader) == "old"
+    assert cache.loaded_at("key") is None
+    assert cache.get("key", lambda: "new") == "new"
+
+    def clearing_loader():
+        cache.invalidate()
+        return "old"
+
+    assert cache.get("other", clearing_loader) == "old"
+    assert cache.loaded_at("other") is None
+
+    def failing_loader():
+        raise RuntimeError("database is down")
+
+    with pytest.raises(RuntimeError):
+        cache.get("key", failing_loader)
+    assert cache.get("key", lambda: "loaded") == "loaded"
+    assert cache._loading == {}
@@ -0,0 +1,108 @@
+import sys
+import os
+import io
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import select, func
+
+from database.models import db
+from database.tables import expenses_table
+from utils import session as session_module
+from utils.session import account_cache, IMPORT_KEY
+from conftest import log_in
+
+CSV_TEXT = """Date,Amount,Category,Notes,Person
+2024-01-05,12.50,Groceries,weekly shop,Joint
+01/06/2024,"1,200.00",Rent,,tester
+2024-01-07,3.00,Groceries,coffee,
+2024-01-07,3.00,Groceries,coffee,
+2024-02-30,1.00,Groceries,bad date,
+2024-01-08,abc,Groceries,bad amount,
+2024-01-09,5.00,Not a category,,
+"""
+
+
+def upload(client, text, **form):
+    content = text.encode() if isinstance(text, str) else text
+    data = {"file": (io.BytesIO(content), "history.csv"), **form}
+    response = client.post("/import", data=data, content_type="multipart/form-data")
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def expense_count(app):
+    with app.app_context(), db.engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(expenses_table)).scalar()
+
+
+def test_import_in_chunks_with_validation(make_app):
+    app = make_app(IMPORT_CHUNK_SIZE=3)
+    client = log_in(app.test_client())
+    events = upload(client, CSV_TEXT)
+
+    assert [event["event"] for event in events] == ["chunk", "chunk", "chunk", "done"]
+    done = events[-1]
+    assert done["inserted"] == 4  # Both identical coffees are kept
+    assert done["rejected"] == 3
+    rejected_rows = [r["row"] for event in events[:-1] for r in event["rejected"]]
+    assert rejected_rows == [5, 6, 7]
+    assert expense_count(app) == 4
+
+    # Importing the same file again inserts nothing
+    events = upload(client, CSV_TEXT)
+    assert events[-1]["inserted"] == 0
+    assert events[-1]["duplicates"] == 4
+    assert expense_count(app) == 4
+
+
+def test_import_resumes_from_row(app, auth_client):
+    events = upload(auth_client, CSV_TEXT, start_row="3")
+    assert events[-1]["inserted"] == 2  # Only the two coffees
+    assert expense_count(app) == 2
+
+    # A full import afterwards only adds the rows that were skipped
+    events = upload(auth_client, CSV_TEXT)
+    assert events[-1]["inserted"] == 2
+    assert expense_count(app) == 4
+
+
+def test_requests_after_an_import_check_the_account_version(
+    app, auth_client, monkeypatch
+):
+    assert auth_client.get("/summary?year=2024").get_json()["by_category"] == {}
+    (before,) = account_cache.values()
+    upload(auth_client, CSV_TEXT)
+
+    # Another worker still holds the snapshot from before the import, which
+    # the streamed response's cookie could not tell it about
+    account_cache.set(before.id, before)
+    summary = auth_client.get("/summary?year=2024").get_json()
+    assert summary["by_category"]["Groceries"] == 18.5
+    assert account_cache.peek(before.id).data_version > before.data_version
+
+    # Once the version stops changing, the session goes back to the cache
+    monkeypatch.setattr(session_module, "IMPORT_SETTLE_SECONDS", 0)
+    auth_client.get("/profile")
+    with auth_client.session_transaction() as session:
+        assert IMPORT_KEY not in session
+
+
+def test_import_requires_file(auth_client):
+    assert auth_client.post("/import").status_code == 400
+
+
+def test_undecodable_file_ends_the_stream_with_a_failed_event(make_app):
+    app = make_app(IMPORT_CHUNK_SIZE=100)
+    client = log_in(app.test_client())
+    lines = [f"2024-01-05,1.00,Groceries,row {n}," for n in range(1, 401)]
+    data = ("Date,Amount,Category,Notes,Person\n" + "\n".join(lines)).encode()
+    data += "\n2024-01-06,2.00,Groceries,café,\n".encode("latin-1")
+
+    events = upload(client, data)
+    assert events[-1]["event"] == "failed"
+    assert events[-1]["error"] == "UnicodeDecodeError"
+    committed = sum(event["inserted"] for event in events[:-1])
+    assert committed == expense_count(app) > 0
+    assert events[-1]["resume_from_row"] == committed + 1
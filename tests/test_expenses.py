@@ -0,0 +1,122 @@
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, select, func
+
+from database.models import Account, Person  # noqa: F401 (registers the tables)
+from database.tables import metadata, expenses_table
+from utils.expenses import (
+    parse_expense_rows,
+    insert_expenses,
+    summarize_results,
+    fetch_expenses_page,
+    decode_cursor,
+)
+
+
+def test_parse_expense_rows_accepts_and_normalizes():
+    rows = [
+        ("Joint", "5", "january", "2024", "1,234.50", "Groceries", " weekly shop "),
+        ("7", "29", "February", "2024", "10", "Gasoline", ""),
+    ]
+    accepted, results = parse_expense_rows(rows, 1, "USD", person_ids=[7])
+
+    assert [result["status"] for result in results] == ["accepted", "accepted"]
+    assert accepted[0]["ExpenseDate"] == date(2024, 1, 5)
+    assert accepted[0]["Month"] == "January"
+    assert accepted[0]["Amount"] == 1234.5
+    assert accepted[0]["PersonID"] is None
+    assert accepted[0]["AdditionalNotes"] == "weekly shop"
+    assert accepted[1]["ExpenseScope"] == "Individual"
+    assert accepted[1]["PersonID"] == 7
+
+
+def test_parse_expense_rows_reports_rejections_per_row():
+    rows = [
+        ("Joint", "31", "February", "2024", "10", "Groceries", ""),  # Invalid date
+        ("Joint", "1", "March", "2024", "one hundred", "Groceries", ""),
+        ("99", "1", "March", "2024", "10", "Groceries", ""),  # Not on the account
+        ("Joint", "1", "March", "2024", "10", "Not a category", ""),
+        ("Joint", "1", "March", "2024", "10", "Groceries", ""),
+    ]
+    accepted, results = parse_expense_rows(rows, 1, "USD", person_ids=[7])
+    report = summarize_results(results)
+
+    assert len(accepted) == 1
+    assert report["accepted"] == 1
+    assert report["rejected"] == 4
+    assert [result["row"] for result in results if result["status"] == "rejected"] == [
+        1,
+        2,
+        3,
+        4,
+    ]
+    assert "Invalid date" in results[0]["errors"][0]
+
+
+def test_parse_expense_rows_accepts_refunds_but_not_non_numbers():
+    rows = [
+        ("Joint", "1", "March", "2024", amount, "Groceries", "")
+        for amount in ("-12.50", "nan", "inf")
+    ]
+    accepted, results = parse_expense_rows(rows, 1, "USD")
+
+    assert [row["Amount"] for row in accepted] == [-12.5]
+    assert results[1]["errors"] == ["Invalid amount: 'nan'"]
+    assert results[2]["errors"] == ["Invalid amount: 'inf'"]
+
+
+def test_insert_expenses_writes_batch(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'expenses.db'}")
+    metadata.create_all(engine)
+
+    rows = [("Joint", str(day), "May", "2023", "5", "Groceries", "") for day in range(1, 21)]
+    accepted, _ = parse_expense_rows(rows, 1, "USD")
+
+    with engine.begin() as conn:
+        assert insert_expenses(conn, expenses_table, accepted) == 20
+        assert insert_expenses(conn, expenses_table, []) == 0
+
+    with engine.connect() as conn:
+        count = conn.execute(select(func.count()).select_from(expenses_table)).scalar()
+    assert count == 20
+
+
+def test_fetch_expenses_page_walks_keyset_pages(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'expenses.db'}")
+    metadata.create_all(engine)
+
+    rows = [("Joint", "1", "May", "2023", "5", "Groceries", "")] * 3
+    rows += [("Joint", str(day), "June", "2023", "5", "Gasoline", "") for day in range(1, 5)]
+    accepted, _ = parse_expense_rows(rows, 1, "USD")
+    with engine.begin() as conn:
+        insert_expenses(conn, expenses_table, accepted)
+
+    seen = []
+    after = None
+    with engine.connect() as conn:
+        while True:
+            page, next_cursor = fetch_expenses_page(
+                conn, expenses_table, 1, 3, after=after
+            )
+            seen.extend(page)
+            if next_cursor is None:
+                break
+            after = decode_cursor(next_cursor)
+
+        gasoline, _ = fetch_expenses_page(
+            conn,
+            expenses_table,
+            1,
+            10,
+            category="Gasoline",
+            start_date=date(2023, 6, 2),
+        )
+
+    keys = [(row.ExpenseDate, row.ExpenseID) for row in seen]
+    assert len(keys) == 7
+    assert keys == sorted(keys, reverse=True)  # Newest first, no duplicates
+    assert [row.ExpenseDate.day for row in gasoline] == [4, 3, 2]
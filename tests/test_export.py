@@ -0,0 +1,78 @@
+import sys
+import os
+import json
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from database.models import db, Account
+from database.tables import expenses_table
+from utils.expenses import insert_expenses
+
+EXPENSE_COUNT = 100_000
+
+
+def add_expenses(app, count):
+    start = date(2000, 1, 1)
+    with app.app_context():
+        account_id = Account.query.filter_by(account_name="tester").one().id
+        rows = [
+            {
+                "AccountID": account_id,
+                "ExpenseScope": "Joint",
+                "PersonID": None,
+                "Day": (start + timedelta(days=i % 9000)).day,
+                "Month": "January",
+                "Year": (start + timedelta(days=i % 9000)).year,
+                "ExpenseDate": start + timedelta(days=i % 9000),
+                "Amount": float(i),
+                "ExpenseCategory": "Groceries",
+                "AdditionalNotes": f"synthetic expense number {i}",
+                "Currency": "USD",
+            }
+            for i in range(count)
+        ]
+        with db.engine.begin() as conn:
+            insert_expenses(conn, expenses_table, rows)
+
+
+def test_export_filters_by_date(app, auth_client):
+    add_expenses(app, 50)
+    response = auth_client.get("/export.ndjson?start_date=2000-01-10&end_date=2000-01-12")
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["ExpenseDate"] for row in rows] == [
+        "2000-01-10",
+        "2000-01-11",
+        "2000-01-12",
+    ]
+
+    response = auth_client.get("/export.csv")
+    assert response.mimetype == "text/csv"
+    assert "attachment" in response.headers["Content-Disposition"]
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith("ExpenseID,ExpenseDate,Amount")
+    assert len(lines) == 51
+
+
+def test_large_export_streams_under_memory_ceiling(app, auth_client):
+    add_expenses(app, EXPENSE_COUNT)
+
+    tracemalloc.start()
+    try:
+        response = auth_client.get("/export.csv", buffered=False)
+        assert response.is_streamed
+        total_bytes = 0
+        line_count = 0
+        for chunk in response.response:
+            total_bytes += len(chunk)
+            line_count += chunk.count(b"\n")
+        response.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert line_count == EXPENSE_COUNT + 1
+    # The export is several MB, but only one batch is ever held in memory
+    assert total_bytes > 5_000_000
+    assert peak < 3_000_000
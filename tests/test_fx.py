@@ -0,0 +1,114 @@
+import sys
+import os
+import io
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, select
+
+from database.models import Account, Person  # noqa: F401 (registers the tables)
+from database.tables import metadata, expenses_table
+from utils import fx
+from utils.expenses import parse_expense_rows, insert_expenses, record_expenses
+
+RATES_CSV = """Date,Currency,Rate
+2024-03-01,EUR,1.10
+2024-03-04,EUR,1.20
+2024-03-04,GBP,not-a-number
+"""
+
+
+def adjusted_amounts(conn):
+    query = select(expenses_table.c.AdjustedAmount).order_by(
+        expenses_table.c.ExpenseID
+    )
+    return list(conn.execute(query).scalars())
+
+
+def test_rate_uses_latest_rate_on_or_before_date():
+    rates = fx.read_rates(io.StringIO(RATES_CSV), "USD")
+
+    assert rates.rate("USD", date(2000, 1, 1)) == 1.0
+    assert rates.rate("EUR", date(2024, 2, 29)) is None  # Before the first rate
+    assert rates.rate("EUR", date(2024, 3, 2)) == 1.10  # Weekend: Friday's rate
+    assert rates.rate("EUR", date(2024, 3, 4)) == 1.20
+    assert rates.rate("GBP", date(2024, 3, 4)) is None  # Invalid line skipped
+    assert rates.convert(10, "EUR", date(2024, 3, 5)) == 12.0
+
+
+def test_record_expenses_fills_adjusted_amount(tmp_path, monkeypatch):
+    path = tmp_path / "rates.csv"
+    path.write_text(RATES_CSV)
+    monkeypatch.setattr(fx, "FX_RATES_FILE", str(path))
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'fx.db'}")
+    metadata.create_all(engine)
+    rows = [("Joint", "5", "March", "2024", "10", "Groceries", "")]
+    with engine.begin() as conn:
+        for currency in ("USD", "EUR", "CHF"):
+            accepted, _ = parse_expense_rows(rows, 1, currency)
+            record_expenses(conn, expenses_table, accepted)
+        assert adjusted_amounts(conn) == [10.0, 12.0, None]
+
+
+def test_unreadable_rate_file_leaves_amounts_for_the_backfill(tmp_path, monkeypatch):
+    monkeypatch.setattr(fx, "FX_RATES_FILE", str(tmp_path / "missing.csv"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'fx.db'}")
+    metadata.create_all(engine)
+    rows = [("Joint", "5", "March", "2024", "10", "Groceries", "")]
+    with engine.begin() as conn:
+        for currency in ("USD", "EUR"):
+            accepted, _ = parse_expense_rows(rows, 1, currency)
+            record_expenses(conn, expenses_table, accepted)
+        assert adjusted_amounts(conn) == [10.0, None]
+
+    # The file is tried again once it exists
+    (tmp_path / "missing.csv").write_text(RATES_CSV)
+    assert fx.get_rates().rate("EUR", date(2024, 3, 5)) == 1.20
+
+
+def test_backfill_converts_stored_rows_in_batches(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fx.db'}")
+    metadata.create_all(engine)
+    rows = [
+        ("Joint", str(day), "March", "2024", "10", "Groceries", "")
+        for day in (1, 4, 5)
+    ]
+    with engine.begin() as conn:
+        for currency in ("EUR", "CHF"):
+            accepted, _ = parse_expense_rows(rows, 1, currency)
+            insert_expenses(conn, expenses_table, accepted)  # Bypasses conversion
+
+    rates = fx.read_rates(io.StringIO(RATES_CSV), "USD")
+    assert fx.backfill_adjusted_amounts(engine, rates, batch_size=2) == (3, 3)
+    with engine.connect() as conn:
+        assert adjusted_amounts(conn) == [11.0, 12.0, 12.0, None, None, None]
+
+    # Already converted rows are left alone unless recomputing
+    assert fx.backfill_adjusted_amounts(engine, rates) == (0, 3)
+    assert fx.backfill_adjusted_amounts(engine, rates, recompute=True) == (3, 3)
+
+
+def test_summary_and_analytics_total_converted_amounts(
+    auth_client, tmp_path, monkeypatch
+):
+    path = tmp_path / "rates.csv"
+    path.write_text("Date,Currency,Rate\n2024-03-01,EUR,2.0\n")
+    monkeypatch.setattr(fx, "FX_RATES_FILE", str(path))
+    auth_client.post("/update_profile", data={"currency": "EUR"})
+    expense = {
+        "scope": "Joint",
+        "day": 5,
+        "month": "March",
+        "year": 2024,
+        "amount": "10",
+        "category": "Groceries",
+        "notes": "",
+    }
+    auth_client.post("/api/v1/expenses", json={"expenses": [expense]})
+
+    summary = auth_client.get("/summary?year=2024").get_json()
+    analytics = auth_client.get("/analytics").get_json()
+    assert summary["by_category"]["Groceries"] == 20.0
+    assert analytics["category_totals"]["Groceries"] == 20.0
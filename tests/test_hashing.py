@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from conftest import log_in
+from database.models import db, Account
+from utils.hashing import PasswordHasher, HashingBusy, needs_rehash, method_prefix
+
+
+def test_needs_rehash_compares_method_and_parameters():
+    current = generate_password_hash("pw")
+    assert not needs_rehash(current)
+    assert needs_rehash(generate_password_hash("pw", method="pbkdf2:sha256:1000"))
+    assert method_prefix("pbkdf2:sha256:1000") == "pbkdf2:sha256:1000"
+
+
+def test_hasher_rejects_when_workers_and_queue_are_full():
+    hasher = PasswordHasher(max_workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+
+    thread = threading.Thread(target=hasher._run, args=(slow,))
+    thread.start()
+    started.wait()
+    try:
+        with pytest.raises(HashingBusy):
+            hasher.hash("pw")
+    finally:
+        release.set()
+        thread.join()
+
+    assert hasher.check(hasher.hash("pw"), "pw")
+    assert hasher.stats()["rejected"] == 1
+    hasher.shutdown()
+
+
+def test_login_returns_503_when_hashing_pool_is_full(make_app):
+    app = make_app(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    log_in(app.test_client())
+    hasher = app.extensions["password_hasher"]
+    hasher._slots.acquire()  # Occupy the only slot
+    try:
+        response = app.test_client().post(
+            "/login", data={"username": "tester", "password": "pw"}
+        )
+    finally:
+        hasher._slots.release()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_rehashes_outdated_password_hash(app):
+    log_in(app.test_client())
+    with app.app_context():
+        account = db.session.execute(db.select(Account)).scalar_one()
+        account.password = generate_password_hash("pw", method="pbkdf2:sha256:1000")
+        db.session.commit()
+
+    response = app.test_client().post(
+        "/login", data={"username": "tester", "password": "pw"}
+    )
+    assert response.status_code == 302
+
+    with app.app_context():
+        account = db.session.execute(db.select(Account)).scalar_one()
+        assert not needs_rehash(account.password)
+        assert account.check_password("pw")
+
+
+def test_profile_update_hashes_without_holding_a_connection(app, auth_client):
+    hasher = app.extensions["password_hasher"]
+    with app.app_context():
+        pool = db.engine.pool
+    checked_out = []
+    hash_password = hasher.hash
+
+    def hash_and_count(password):
+        checked_out.append(pool.checkedout())
+        return hash_password(password)
+
+    hasher.hash = hash_and_count
+    response = auth_client.post("/update_profile", data={"new_password": "new"})
+    assert response.status_code == 302
+    assert checked_out == [0]
+
+    with app.app_context():
+        account = db.session.execute(db.select(Account)).scalar_one()
+        assert account.check_password("new")
@@ -0,0 +1,91 @@
+import sys
+import os
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, select
+
+from database.models import db, Account
+from database.tables import metadata
+from utils.last_login import LastLoginWriter
+
+accounts = Account.__table__
+
+
+def make_engine(tmp_path, account_count=2):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logins.db'}")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            accounts.insert(),
+            [{"AccountName": f"user{n}"} for n in range(1, account_count + 1)],
+        )
+    return engine
+
+
+def last_logins(engine):
+    query = select(accounts.c.LastLoginDate).order_by(accounts.c.AccountID)
+    with engine.connect() as connection:
+        return list(connection.execute(query).scalars())
+
+
+def test_flush_coalesces_logins_per_account(tmp_path):
+    engine = make_engine(tmp_path)
+    writer = LastLoginWriter(engine, background=False)
+    writer.record(1, date(2024, 1, 2))
+    writer.record(1, date(2024, 1, 1))  # Older than what's pending
+    writer.record(2, date(2024, 1, 3))
+    assert last_logins(engine) == [None, None]
+
+    assert writer.flush() == 2
+    assert last_logins(engine) == [date(2024, 1, 2), date(2024, 1, 3)]
+    stats = writer.stats()
+    assert (stats["recorded"], stats["coalesced"], stats["queue_depth"]) == (3, 1, 0)
+    assert writer.flush() == 0
+
+
+def test_failed_flush_keeps_entries_for_retry(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")  # No tables
+    writer = LastLoginWriter(engine, background=False)
+    writer.record(1, date(2024, 1, 1))
+
+    assert writer.flush() == 0
+    assert writer.stats()["failures"] == 1
+    assert writer.stats()["queue_depth"] == 1
+
+
+def test_background_flush_when_queue_is_full(tmp_path):
+    engine = make_engine(tmp_path)
+    writer = LastLoginWriter(engine, flush_interval=60, max_pending=2)
+    writer.record(1, date(2024, 1, 1))
+    writer.record(2, date(2024, 1, 1))
+
+    deadline = time.time() + 5
+    while writer.stats()["flushed_rows"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert last_logins(engine) == [date(2024, 1, 1)] * 2
+
+    writer.record(1, date(2024, 2, 1))
+    writer.shutdown()  # Writes what's still pending
+    assert last_logins(engine)[0] == date(2024, 2, 1)
+
+
+def test_login_defers_the_last_login_update(app):
+    client = app.test_client()
+    client.post(
+        "/create_account",
+        data={"username": "tester", "email": "tester@example.com", "password": "pw"},
+    )
+    client.get("/logout")
+    client.post("/login", data={"username": "tester", "password": "pw"})
+
+    writer = app.extensions["last_logins"]
+    assert writer.stats()["recorded"] == 2
+    assert writer.stats()["queue_depth"] == 1
+
+    writer.flush()
+    with app.app_context():
+        account = db.session.execute(db.select(Account)).scalar_one()
+        assert account.last_login_date is not None
@@ -0,0 +1,65 @@
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from sqlalchemy import select, text
+
+from app import create_app
+from database.models import db, Account
+from database.schema import get_schema_version, LATEST_VERSION
+from utils.lifecycle import upgrade_schema, init_worker, shutdown_worker
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Needs os.fork()")
+def test_forked_worker_opens_its_own_connections(app):
+    with app.app_context():
+        engine = db.engine
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        assert engine.pool.checkedin() == 1
+
+        pid = os.fork()
+        if pid == 0:  # The worker
+            ok = False
+            try:
+                init_worker(app, warm_up=False)
+                ok = engine.pool.checkedin() == 0
+                with engine.connect() as connection:
+                    ok = ok and connection.execute(text("SELECT 1")).scalar() == 1
+            finally:
+                os._exit(0 if ok else 1)
+
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        # The parent's pooled connection was left open
+        assert engine.pool.checkedin() == 1
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_worker_shutdown_writes_pending_last_logins(app, auth_client):
+    last_logins = app.extensions["last_logins"]
+    assert last_logins.stats()["queue_depth"] == 1  # From signing up
+
+    shutdown_worker(app)
+    query = select(Account.__table__.c.LastLoginDate)
+    with app.app_context(), db.engine.connect() as connection:
+        assert connection.execute(query).scalar() == date.today()
+
+
+def test_launcher_upgrades_a_new_database(tmp_path):
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'new.db'}",
+        }
+    )
+    upgrade_schema(app)
+    with app.app_context():
+        assert db.engine.pool.checkedin() == 0  # Nothing for workers to inherit
+        with db.engine.connect() as connection:
+            assert get_schema_version(connection) == LATEST_VERSION
+        db.engine.dispose()
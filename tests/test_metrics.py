@@ -0,0 +1,74 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from sqlalchemy import exc, text
+
+from database.models import db
+from database.schema import upgrade
+from conftest import STATS, log_in
+
+
+def test_metrics_disabled_by_default(app):
+    assert "metrics" not in app.extensions
+    assert app.test_client().get("/metrics").status_code == 404
+
+
+def test_monitoring_endpoints_need_the_stats_token(make_app):
+    app = make_app(METRICS_ENABLED=True)
+    client = log_in(app.test_client())
+    for path in ("/metrics", "/stats/pool", "/stats/cache"):
+        assert client.get(path).status_code == 401
+        wrong = {"Authorization": "Bearer guess"}
+        assert client.get(path, headers=wrong).status_code == 401
+        assert client.get(path, headers=STATS).status_code == 200
+
+    # Without a configured token they aren't served at all
+    app = make_app(METRICS_ENABLED=True, STATS_TOKEN=None)
+    for path in ("/metrics", "/stats/pool"):
+        assert app.test_client().get(path, headers=STATS).status_code == 404
+
+
+def test_metrics_record_latency_and_sql(make_app):
+    app = make_app(METRICS_ENABLED=True)
+    client = log_in(app.test_client())
+    client.get("/view_expenses")
+    client.get("/view_expenses")
+
+    response = client.get("/metrics", headers=STATS)
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    text = response.get_data(as_text=True)
+
+    labels = 'endpoint="main.view_expenses",method="GET"'
+    assert f"expenses_request_duration_seconds_count{{{labels}}} 2" in text
+    assert f'expenses_request_sql_statements_bucket{{{labels},le="0"}} 0' in text
+    assert "# TYPE expenses_db_pool_wait_seconds_total counter" in text
+    assert "expenses_category_cache_hits_total" in text
+
+
+def test_metrics_cover_the_replica_and_failed_statements(make_app, tmp_path):
+    app = make_app(
+        METRICS_ENABLED=True,
+        REPLICA_DATABASE_URL=f"sqlite:///{tmp_path / 'replica.db'}",
+    )
+    with app.app_context():
+        primary, replica = db.engines[None], db.engines["replica"]
+        upgrade(replica)
+        # Each pool reports its waits to its own listeners
+        assert primary.pool.wait_listeners is not replica.pool.wait_listeners
+        assert len(replica.pool.wait_listeners) == 1
+
+        with replica.connect() as conn:
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+            assert conn.info["metrics_started"] == []
+
+        replica.dispose()  # Swaps in a new pool
+        assert len(replica.pool.wait_listeners) == 1
+
+    page = app.test_client().get("/metrics", headers=STATS).get_data(as_text=True)
+    assert 'expenses_db_pool_checkouts_total{engine="primary"}' in page
+    assert 'expenses_db_pool_checkouts_total{engine="replica"}' in page
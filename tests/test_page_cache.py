@@ -0,0 +1,113 @@
+import sys
+import os
+import io
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import event, select
+
+from database.models import db, Account
+from utils.page_cache import page_cache_stats
+from conftest import STATS
+
+EXPENSE = {
+    "scope": "Joint",
+    "day": 5,
+    "month": "March",
+    "year": 2024,
+    "amount": "12.50",
+    "category": "Groceries",
+    "notes": "first",
+}
+
+
+def count_statements(app):
+    statements = []
+    with app.app_context():
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+    return statements
+
+
+def data_version(app):
+    with app.app_context(), db.engine.connect() as conn:
+        return conn.execute(select(Account.__table__.c.DataVersion)).scalar()
+
+
+def page_counts(page):
+    counts = page_cache_stats()["pages"].get(page, {"hits": 0, "misses": 0})
+    return counts["hits"], counts["misses"]
+
+
+def test_unchanged_pages_are_served_without_queries(app, auth_client):
+    auth_client.post("/api/v1/expenses", json={"expenses": [EXPENSE]})
+    for path in ("/", "/view_expenses", "/summary?year=2024"):
+        first = auth_client.get(path).get_data()  # Loads and caches the page
+
+        statements = count_statements(app)
+        second = auth_client.get(path)
+        assert second.status_code == 200
+        assert second.get_data() == first
+        assert statements == []
+
+    stats = auth_client.get("/stats/cache", headers=STATS).get_json()["pages"]
+    assert stats["size"] == 3
+    assert stats["pages"]["view_expenses"]["hits"] >= 1
+    assert 0 < stats["hit_rate"] < 1
+
+
+def test_writes_bump_the_data_version(app, auth_client):
+    hits, misses = page_counts("view_expenses")
+    assert data_version(app) == 0
+    assert "first" not in auth_client.get("/view_expenses").get_data(as_text=True)
+    summary = auth_client.get("/summary?year=2024").get_json()
+
+    auth_client.post("/api/v1/expenses", json={"expenses": [EXPENSE]})
+    assert data_version(app) == 1
+    assert "first" in auth_client.get("/view_expenses").get_data(as_text=True)
+    assert auth_client.get("/summary?year=2024").get_json() != summary
+
+    # Rejected submissions write nothing, so cached pages stay valid
+    auth_client.post("/api/v1/expenses", json={"expenses": [{**EXPENSE, "day": 99}]})
+    assert data_version(app) == 1
+
+    csv_text = "Date,Amount,Category,Notes,Person\n2024-03-06,4,Groceries,from history,"
+    auth_client.post(
+        "/import",
+        data={"file": (io.BytesIO(csv_text.encode()), "history.csv")},
+        content_type="multipart/form-data",
+    ).get_data()
+    assert data_version(app) == 2
+    assert "from history" in auth_client.get("/view_expenses").get_data(as_text=True)
+    assert page_counts("view_expenses") == (hits, misses + 3)
+
+
+def test_profile_changes_refresh_the_entry_page(app, auth_client):
+    first = auth_client.get("/")
+    assert auth_client.get(
+        "/", headers={"If-None-Match": first.headers["ETag"]}
+    ).status_code == 304
+    bootstrap = auth_client.get("/api/v1/bootstrap")
+
+    auth_client.post(
+        "/update_profile",
+        data={
+            "display_name": "Renamed",
+            "person_ids[]": "new",
+            "person_names[]": "Kim",
+        },
+    )
+    assert data_version(app) == 1
+
+    response = auth_client.get("/", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 200
+    assert "Renamed" in response.get_data(as_text=True)
+
+    response = auth_client.get(
+        "/api/v1/bootstrap", headers={"If-None-Match": bootstrap.headers["ETag"]}
+    )
+    assert response.status_code == 200
+    assert "Kim" in [person["PersonName"] for person in response.get_json()["persons"]]
@@ -0,0 +1,91 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, event, insert
+
+from database.models import db, Account, Person
+from database.tables import metadata
+from utils.page_cache import bump_data_version
+from utils.session import account_cache
+from utils.persons import (
+    RosterPerson,
+    diff_roster,
+    load_roster,
+    update_roster,
+    get_roster,
+)
+
+
+def test_diff_roster_finds_inserts_and_renames():
+    current = (RosterPerson(1, "Ann"), RosterPerson(2, "Bob"))
+    submitted = [
+        ("1", "Ann"),  # Unchanged
+        ("2", "Robert"),
+        ("99", "Mallory"),  # Not on the account
+        ("new", "Cat"),
+        ("new", "  "),
+    ]
+    assert diff_roster(current, submitted) == (["Cat"], [(2, "Robert")])
+
+
+def test_update_roster_statement_count_is_constant(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'persons.db'}")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Account.__table__.insert().values(AccountName="a"))
+
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+
+    def apply(submitted):
+        statements.clear()
+        with engine.begin() as connection:
+            update_roster(connection, 1, submitted)
+        return len(statements)
+
+    # One read plus one insert, however many persons are added
+    assert apply([("new", "Person 0")]) == 2
+    assert apply([("new", f"Person {n}") for n in range(1, 21)]) == 2
+
+    # One read, one insert and one update for any mix of changes
+    with engine.connect() as connection:
+        roster = load_roster(connection, 1)
+    assert apply([(str(p.PersonID), p.PersonName + "!") for p in roster[:1]]) == 2
+    renames = [(str(p.PersonID), p.PersonName + "?") for p in roster]
+    assert apply(renames + [("new", "Person 21")]) == 3
+    assert len(get_roster(engine, Account(id=1, data_version=0))) == 22
+
+
+def test_profile_update_refreshes_cached_roster(app, auth_client):
+    assert b"tester" in auth_client.get("/").data
+
+    def roster():
+        with app.app_context():
+            return get_roster(db.engine, db.session.get(Account, 1))
+
+    auth_client.post(
+        "/update_profile",
+        data={
+            "person_ids[]": [str(roster()[0].PersonID), "new"],
+            "person_names[]": ["Renamed", "Partner"],
+        },
+    )
+    assert [person.PersonName for person in roster()] == ["Renamed", "Partner"]
+
+
+def test_roster_changes_reach_other_workers_with_the_data_version(app, auth_client):
+    assert b"Partner" not in auth_client.get("/profile").data  # Caches the roster
+
+    # Another worker adds a person, which bumps the account's data version
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(
+            insert(Person.__table__).values(AccountID=1, PersonName="Partner")
+        )
+        bump_data_version(connection, [1])
+
+    account_cache.invalidate()  # This worker's account snapshot expires
+    assert b"Partner" in auth_client.get("/profile").data
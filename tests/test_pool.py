@@ -0,0 +1,35 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine
+
+from utils.pool import get_pool_options, get_pool_stats
+
+
+def test_pool_options_skip_in_memory_sqlite():
+    assert get_pool_options("sqlite://") == {}
+    assert get_pool_options("sqlite:///:memory:") == {}
+    assert get_pool_options("sqlite:///expenses.db")["pool_pre_ping"] is True
+
+
+def test_pool_stats_track_checkouts_and_overflow(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "1")
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **get_pool_options(url))
+
+    first = engine.connect()
+    second = engine.connect()  # Needs an overflow connection
+    stats = get_pool_stats(engine)
+    assert stats["checked_out"] == 2
+    assert stats["overflow"] == 1
+    assert stats["checkouts"] == 2
+
+    first.close()
+    second.close()
+    stats = get_pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["wait_seconds_max"] >= stats["wait_seconds_avg"] >= 0
+    engine.dispose()
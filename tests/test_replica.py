@@ -0,0 +1,138 @@
+import sys
+import os
+import sqlite3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from sqlalchemy import exc
+
+from database.models import db
+from database.schema import upgrade
+from utils.replica import get_replica_options
+from conftest import STATS, log_in
+
+EXPENSE = {
+    "scope": "Joint",
+    "day": 5,
+    "month": "March",
+    "year": 2024,
+    "amount": "12.50",
+    "category": "Groceries",
+    "notes": "replicated",
+}
+
+
+@pytest.fixture
+def replica_app(make_app, tmp_path):
+    app = make_app(REPLICA_DATABASE_URL=f"sqlite:///{tmp_path / 'replica.db'}")
+    with app.app_context():
+        upgrade(db.engines["replica"])
+    app.extensions["read_router"].check_interval = 0  # Check on every read
+    app.extensions["read_router"].clock_skew = 0  # One host, one clock
+    return app
+
+
+def replicate(app, tmp_path):
+    """Bring the replica file up to date with the primary."""
+    with app.app_context():
+        db.engines["replica"].dispose()
+    source = sqlite3.connect(tmp_path / "test.db")
+    target = sqlite3.connect(tmp_path / "replica.db")
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def listed_notes(client):
+    response = client.get("/api/v1/expenses")
+    assert response.status_code == 200
+    return [expense["AdditionalNotes"] for expense in response.get_json()["expenses"]]
+
+
+def test_reads_move_to_replica_once_it_has_the_write(replica_app, tmp_path):
+    replica_app.extensions["read_router"].check()
+    replicate(replica_app, tmp_path)  # Caught up, as of before the write
+    client = log_in(replica_app.test_client())
+    client.post("/api/v1/expenses", json={"expenses": [EXPENSE]})
+
+    # The replica doesn't have the expense yet, so the writer reads the primary
+    assert listed_notes(client) == ["replicated"]
+    replicate(replica_app, tmp_path)
+    assert listed_notes(client) == ["replicated"]
+
+    stats = client.get("/stats/replica", headers=STATS).get_json()
+    assert stats["reads"] == {"primary_read_your_writes": 1, "replica": 1}
+    assert stats["lag_seconds"] == 0
+    assert stats["statements"]["replica"] > 0
+
+
+def test_pages_read_from_a_stale_replica_are_not_cached(replica_app, tmp_path):
+    replica_app.extensions["read_router"].check()
+    replicate(replica_app, tmp_path)
+    reader = log_in(replica_app.test_client())
+    reader.get("/summary?year=2024")
+    replicate(replica_app, tmp_path)  # Has the reader's login, but no expense
+
+    # Another session's write bumps the account's data version on the primary
+    writer = replica_app.test_client()
+    writer.post("/login", data={"username": "tester", "password": "pw"})
+    writer.post("/api/v1/expenses", json={"expenses": [EXPENSE]})
+
+    # The reader is served the replica's totals, but they aren't cached under
+    # the new version, so it sees the expense once the replica has it
+    assert reader.get("/summary?year=2024").get_json()["by_category"] == {}
+    replicate(replica_app, tmp_path)
+    summary = reader.get("/summary?year=2024").get_json()
+    assert summary["by_category"] == {"Groceries": 12.5}
+    assert b"replicated" in reader.get("/view_expenses").data
+
+
+def test_lagging_replica_falls_back_to_primary(replica_app):
+    client = log_in(replica_app.test_client())
+    assert listed_notes(client) == []  # The replica never got a heartbeat
+
+    stats = client.get("/stats/replica", headers=STATS).get_json()
+    assert stats["reads"] == {"primary_replica_lagging": 1}
+
+
+def test_unreachable_replica_falls_back_to_primary(make_app, tmp_path):
+    app = make_app(
+        REPLICA_DATABASE_URL=f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    )
+    client = log_in(app.test_client())
+    client.post("/api/v1/expenses", json={"expenses": [EXPENSE]})
+    assert client.get("/api/v1/search?q=replicated").status_code == 200
+    assert listed_notes(client) == ["replicated"]
+
+    stats = client.get("/stats/replica", headers=STATS).get_json()
+    assert stats["healthy"] is False
+    assert stats["reads"] == {"primary_replica_down": 2}
+
+
+def test_replica_pool_timeout_falls_back_to_primary(replica_app, monkeypatch):
+    def timed_out():
+        raise exc.TimeoutError("QueuePool limit reached")
+
+    router = replica_app.extensions["read_router"]
+    monkeypatch.setattr(router.replica, "connect", timed_out)
+    client = log_in(replica_app.test_client())
+    assert listed_notes(client) == []
+    assert client.get("/stats/replica", headers=STATS).get_json()["healthy"] is False
+
+
+def test_replica_connections_time_out_quickly():
+    assert get_replica_options("sqlite:///replica.db") == {}
+    options = get_replica_options("postgresql+psycopg2://u:p@replica/expenses")
+    assert options["connect_args"] == {"connect_timeout": 2}
+    assert options["pool_timeout"] == 2
+    options = get_replica_options("mssql+pyodbc://u:p@replica/expenses")
+    assert options["connect_args"] == {"timeout": 2}
+
+
+def test_without_replica_everything_reads_the_primary(auth_client):
+    assert listed_notes(auth_client) == []
+    stats = auth_client.get("/stats/replica", headers=STATS).get_json()
+    assert stats["replica_configured"] is False
+    assert stats["reads"] == {}
+    assert stats["statements"] == {}
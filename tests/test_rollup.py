@@ -0,0 +1,140 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from database.models import Account, Person  # noqa: F401 (registers the tables)
+from database.tables import (
+    metadata,
+    expenses_table,
+    expense_monthly_totals_table,
+    JOINT_PERSON_ID,
+)
+from utils import rollup
+from utils.expenses import parse_expense_rows, insert_expenses, record_expenses
+from utils.fx import FXRates, apply_adjusted_amounts
+from utils.rollup import rebuild_rollup, get_summary, compute_deltas, apply_deltas
+
+
+def rollup_rows(conn):
+    table = expense_monthly_totals_table
+    query = select(table).order_by(*table.primary_key.columns)
+    return [tuple(row) for row in conn.execute(query)]
+
+
+def test_incremental_rollup_matches_rebuild(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+    metadata.create_all(engine)
+
+    first = [
+        ("Joint", "1", "May", "2023", "10", "Groceries", ""),
+        ("Joint", "2", "May", "2023", "5.5", "Groceries", ""),
+        ("3", "2", "May", "2023", "7", "Groceries", ""),
+    ]
+    second = [
+        ("Joint", "9", "May", "2023", "4.5", "Groceries", ""),
+        ("Joint", "1", "June", "2023", "20", "Gasoline", ""),
+    ]
+    with engine.begin() as conn:
+        for rows in (first, second):
+            accepted, _ = parse_expense_rows(rows, 1, "USD")
+            record_expenses(conn, expenses_table, accepted)
+        incremental = rollup_rows(conn)
+
+        rebuild_rollup(conn)
+        assert rollup_rows(conn) == incremental
+
+        summary = get_summary(conn, 1, 2023)
+        joint_may = get_summary(conn, 1, 2023, month=5, person="Joint")
+
+    assert summary["by_month"] == {5: 27.0, 6: 20.0}
+    assert summary["by_category"] == {"Groceries": 27.0, "Gasoline": 20.0}
+    assert joint_may["cells"] == [
+        {"month": 5, "category": "Groceries", "total": 20.0, "count": 3}
+    ]
+
+
+def test_negative_deltas_remove_rows_from_summary(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+    metadata.create_all(engine)
+
+    accepted, _ = parse_expense_rows(
+        [("Joint", "1", "May", "2023", "10", "Groceries", "")], 1, "USD"
+    )
+    with engine.begin() as conn:
+        insert_expenses(conn, expenses_table, accepted)
+        apply_deltas(conn, compute_deltas(accepted))
+        apply_deltas(conn, compute_deltas(accepted, sign=-1))
+        assert get_summary(conn, 1, 2023)["cells"] == []
+
+
+def test_summary_endpoint(auth_client):
+    form = {
+        "scope[]": ["Joint"],
+        "day[]": ["1"],
+        "month[]": ["March"],
+        "year[]": ["2024"],
+        "amount[]": ["12.5"],
+        "category[]": ["Groceries"],
+        "notes[]": [""],
+    }
+    auth_client.post("/submit", data=form)
+
+    response = auth_client.get("/summary?year=2024")
+    assert response.status_code == 200
+    assert response.json["total"] == 12.5
+    assert response.json["by_category"] == {"Groceries": 12.5}
+    assert auth_client.get("/summary?year=2024&month=13").status_code == 400
+
+
+@pytest.mark.parametrize("upsert", [True, False])
+def test_concurrent_writers_adding_the_same_key(tmp_path, monkeypatch, upsert):
+    if not upsert:
+        monkeypatch.setattr(rollup, "UPSERT_INSERTS", {})
+    # Both writers first read the rollup before either had committed its key
+    stale_reads = []
+    read_existing_keys = rollup.existing_keys
+
+    def existing_keys(connection, deltas):
+        if stale_reads:
+            return stale_reads.pop()
+        return read_existing_keys(connection, deltas)
+
+    monkeypatch.setattr(rollup, "existing_keys", existing_keys)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+    metadata.create_all(engine)
+    key = (1, 2023, 5, "Groceries", JOINT_PERSON_ID)
+    for amount in (10.0, 2.5):
+        stale_reads.append(set())
+        with engine.begin() as conn:
+            apply_deltas(conn, {key: [amount, 1]})
+
+    with engine.connect() as conn:
+        assert rollup_rows(conn) == [(*key, 12.5, 2)]
+
+
+def test_rollup_totals_adjusted_amounts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollup.db'}")
+    metadata.create_all(engine)
+    rates = FXRates("USD", {"EUR": [(date(2023, 1, 1), 1.5)]})
+
+    accepted, _ = parse_expense_rows(
+        [("Joint", "1", "May", "2023", "10", "Groceries", "")], 1, "EUR"
+    )
+    accepted += parse_expense_rows(
+        [("Joint", "2", "May", "2023", "10", "Groceries", "")], 1, "USD"
+    )[0]
+    apply_adjusted_amounts(accepted, rates)
+    with engine.begin() as conn:
+        insert_expenses(conn, expenses_table, accepted)
+        apply_deltas(conn, compute_deltas(accepted))
+        incremental = rollup_rows(conn)
+        rebuild_rollup(conn)
+        assert rollup_rows(conn) == incremental
+        assert get_summary(conn, 1, 2023)["total"] == 25.0
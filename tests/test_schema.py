@@ -0,0 +1,105 @@
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.schema import CreateTable
+
+from database.schema import upgrade, get_schema_version, explain, LATEST_VERSION
+from database.models import Account, Person
+from database.tables import metadata, expenses_table
+from utils.expenses import build_expenses_query
+from utils.export import build_export_query
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_is_versioned_and_idempotent(engine):
+    with engine.connect() as conn:
+        assert get_schema_version(conn) == LATEST_VERSION
+    assert upgrade(engine) == []
+
+    index_names = {index["name"] for index in inspect(engine).get_indexes("expenses")}
+    assert index_names >= {
+        "ix_expenses_account_date_id",
+        "ix_expenses_account_year_month",
+        "ix_expenses_account_category",
+    }
+
+
+def test_upgrade_adopts_hand_made_tables(tmp_path):
+    # Tables created by hand, as in the existing Azure database: no indexes
+    # and no schema_version table
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    metadata.create_all(engine, tables=[Account.__table__, Person.__table__])
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            str(CreateTable(expenses_table).compile(dialect=engine.dialect))
+        )
+    assert inspect(engine).get_indexes("expenses") == []
+
+    assert upgrade(engine) == list(range(1, LATEST_VERSION + 1))
+    assert len(inspect(engine).get_indexes("expenses")) == 3
+
+
+def test_upgrade_adds_data_version_to_existing_accounts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    upgrade(engine, target=5)
+    with engine.begin() as conn:
+        conn.exec_driver_sql('ALTER TABLE accounts DROP COLUMN "DataVersion"')
+        conn.exec_driver_sql("INSERT INTO accounts (AccountName) VALUES ('old')")
+
+    assert upgrade(engine) == [6, 7]
+    with engine.connect() as conn:
+        versions = conn.exec_driver_sql('SELECT "DataVersion" FROM accounts')
+        assert versions.scalars().all() == [0]
+
+
+# Main route queries and the index each one must use. A plan that scans the
+# expenses table or sorts in a temporary B-tree means an index regression.
+ROUTE_QUERIES = {
+    "view_expenses first page": (
+        lambda: build_expenses_query(expenses_table, 1, limit=51),
+        "ix_expenses_account_date_id",
+    ),
+    "view_expenses next page": (
+        lambda: build_expenses_query(
+            expenses_table, 1, after=(date(2024, 1, 1), 100), limit=51
+        ),
+        "ix_expenses_account_date_id",
+    ),
+    "view_expenses date range": (
+        lambda: build_expenses_query(
+            expenses_table,
+            1,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 3, 1),
+            limit=51,
+        ),
+        "ix_expenses_account_date_id",
+    ),
+    "export": (
+        lambda: build_export_query(expenses_table, 1),
+        "ix_expenses_account_date_id",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(ROUTE_QUERIES))
+def test_route_query_plans_use_indexes(engine, name):
+    build_query, index_name = ROUTE_QUERIES[name]
+    with engine.connect() as conn:
+        plan = explain(conn, build_query())
+
+    assert any(index_name in line for line in plan), plan
+    assert not any(line.startswith("SCAN expenses") for line in plan), plan
+    assert not any("TEMP B-TREE" in line for line in plan), plan
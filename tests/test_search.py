@@ -0,0 +1,136 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mssql
+
+from database.models import Account
+from database.schema import upgrade
+from database.tables import metadata, expenses_table
+from utils.expenses import parse_expense_rows, record_expenses
+from utils.search import parse_terms, search_expenses, build_search_query
+
+ROWS = [
+    ("Joint", "1", "March", "2024", "120", "Home Services", "Plumber invoice #42"),
+    ("Joint", "2", "March", "2024", "30", "Household Goods", "plumbing tape"),
+    ("Joint", "3", "April", "2024", "15", "Groceries", "weekly shop"),
+]
+
+
+def make_engine(tmp_path, migrate=True):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    if migrate:
+        upgrade(engine)
+    else:
+        metadata.create_all(engine)
+    with engine.begin() as connection:
+        for name in ("a", "b"):
+            connection.execute(Account.__table__.insert().values(AccountName=name))
+    return engine
+
+
+def add_expenses(engine, account_id, rows=ROWS):
+    with engine.begin() as connection:
+        accepted, _ = parse_expense_rows(rows, account_id, "USD")
+        record_expenses(connection, expenses_table, accepted)
+
+
+def notes(rows):
+    return [row.AdditionalNotes for row in rows]
+
+
+def test_parse_terms():
+    assert parse_terms("  Plumber, invoice!! #42 ") == ["plumber", "invoice", "42"]
+    assert parse_terms("") == []
+
+
+def test_search_matches_prefixes_within_the_account(tmp_path):
+    engine = make_engine(tmp_path)
+    add_expenses(engine, 1)
+    add_expenses(engine, 2, ROWS[:1])
+
+    with engine.connect() as connection:
+        rows = search_expenses(connection, expenses_table, 1, "plumb")
+        assert sorted(notes(rows)) == ["Plumber invoice #42", "plumbing tape"]
+        assert all(row.Rank is not None for row in rows)
+
+        def search(account_id, text, **filters):
+            return search_expenses(
+                connection, expenses_table, account_id, text, **filters
+            )
+
+        assert notes(search(1, "plumb invoice")) == ["Plumber invoice #42"]
+        assert notes(search(1, "plumb", category="Household Goods")) == [
+            "plumbing tape"
+        ]
+        assert len(search(2, "plumb")) == 1
+        assert search(1, "?!") == []
+
+
+def test_search_index_covers_expenses_from_before_the_migration(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    upgrade(engine, target=3)
+    with engine.begin() as connection:
+        connection.execute(Account.__table__.insert().values(AccountName="a"))
+    add_expenses(engine, 1)
+
+    upgrade(engine)
+    with engine.connect() as connection:
+        assert len(search_expenses(connection, expenses_table, 1, "plumb")) == 2
+
+
+def test_search_without_index_falls_back_to_scanning(tmp_path):
+    engine = make_engine(tmp_path, migrate=False)
+    add_expenses(engine, 1)
+    with engine.connect() as connection:
+        rows = search_expenses(connection, expenses_table, 1, "PLUMB")
+    assert sorted(notes(rows)) == ["Plumber invoice #42", "plumbing tape"]
+
+
+def test_scanning_search_escapes_like_wildcards(tmp_path):
+    engine = make_engine(tmp_path, migrate=False)
+    add_expenses(
+        engine,
+        1,
+        [
+            ("Joint", "1", "May", "2024", "5", "Groceries", "ref_42"),
+            ("Joint", "2", "May", "2024", "5", "Groceries", "refX42"),
+        ],
+    )
+    with engine.connect() as connection:
+        rows = search_expenses(connection, expenses_table, 1, "ref_42")
+    assert notes(rows) == ["ref_42"]
+
+
+def test_sql_server_search_uses_the_full_text_index():
+    query = build_search_query(mssql.dialect().name, expenses_table, 1, ["plumb"], 10)
+    compiled = query.compile(
+        dialect=mssql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    assert "CONTAINSTABLE(expenses, AdditionalNotes, '\"plumb*\"')" in str(compiled)
+    assert "LIKE" not in str(compiled)
+
+
+def test_search_endpoint(auth_client):
+    auth_client.post(
+        "/api/v1/expenses",
+        json={
+            "expenses": [
+                {
+                    "scope": "Joint",
+                    "day": 1,
+                    "month": "May",
+                    "year": 2024,
+                    "amount": "80",
+                    "category": "Home Services",
+                    "notes": "plumber visit",
+                }
+            ]
+        },
+    )
+    response = auth_client.get("/api/v1/search?q=plumber&start_date=2024-01-01")
+    data = response.get_json()
+    assert [row["AdditionalNotes"] for row in data["expenses"]] == ["plumber visit"]
+    assert "Rank" in data["expenses"][0]
@@ -0,0 +1,61 @@
+from sqlalchemy import event
+
+from database.models import db, Account
+from utils.session import account_cache
+
+
+def count_statements(app, client, path):
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_execute)
+    assert response.status_code == 200
+    return [s for s in statements if "FROM accounts" in s]
+
+
+def test_repeat_requests_use_cached_account(app, auth_client):
+    auth_client.get("/profile")
+    assert count_statements(app, auth_client, "/profile") == []
+    assert account_cache.stats()["hits"] >= 1
+
+
+def test_cache_expiry_reloads_account(app, auth_client):
+    auth_client.get("/profile")
+    account_cache.invalidate()
+    assert len(count_statements(app, auth_client, "/profile")) == 1
+
+
+def test_profile_update_is_visible_immediately(app, auth_client):
+    auth_client.get("/profile")
+    response = auth_client.post(
+        "/update_profile", data={"display_name": "Renamed", "currency": "EUR"}
+    )
+    assert response.status_code == 302
+
+    with app.app_context():
+        account = db.session.execute(db.select(Account)).scalar_one()
+        assert (account.display_name, account.currency) == ("Renamed", "EUR")
+    assert b"Renamed" in auth_client.get("/profile").data
+
+
+def test_other_worker_snapshot_is_refreshed_by_session_stamp(app, auth_client):
+    auth_client.get("/profile")
+    with app.app_context():
+        account = db.session.execute(db.select(Account)).scalar_one()
+        account_id = account.id
+        account.display_name = "Elsewhere"
+        db.session.commit()
+
+    # Simulate the change having been made by another worker: this
+    # process's snapshot is stale, but the session stamp is newer
+    with auth_client.session_transaction() as session:
+        session["account_stamp"] = account_cache.loaded_at(account_id) + 1
+    assert b"Elsewhere" in auth_client.get("/profile").data
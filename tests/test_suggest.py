@@ -0,0 +1,136 @@
+import sys
+import os
+import io
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import select
+
+from database.models import db
+from database.tables import expenses_table
+from utils import suggest
+from utils.suggest import CategoryModel, MAX_VOCABULARY, amount_buckets
+from conftest import STATS
+
+
+def test_model_scores_batch_by_notes_and_amount():
+    model = CategoryModel()
+    assert model.suggest(["coffee"], [3.0]) == [None]
+
+    model.learn(
+        [
+            ("coffee with sam", 3.5, "Restaurant and Takeout (Social)"),
+            ("weekly shop", 80.0, "Groceries"),
+            ("weekly shop market", 95.0, "Groceries"),
+            ("rent", 1200.0, "Rent"),
+            (None, 1150.0, "Rent"),
+        ]
+    )
+    suggestions = model.suggest(
+        ["Coffee!", "shop", "", "unknown words"], [4.0, 70.0, 1200.0, float("nan")]
+    )
+    assert suggestions == [
+        "Restaurant and Takeout (Social)",
+        "Groceries",
+        "Rent",  # Amount alone
+        "Groceries",  # Prior alone
+    ]
+
+
+def test_model_grows_and_caps_vocabulary():
+    model = CategoryModel()
+    model.learn(
+        [(f"word{n}", 1.0, "Miscellaneous") for n in range(MAX_VOCABULARY + 10)]
+    )
+    assert len(model.vocabulary) == MAX_VOCABULARY
+    assert model.token_counts.sum() == MAX_VOCABULARY
+    assert model.nbytes() > 0
+
+
+def test_amount_buckets_handle_unknown_and_huge_amounts():
+    assert list(amount_buckets([0.0, 1.0, float("nan"), 1e12])) == [0, 2, -1, 31]
+
+
+def stored_suggestions(app):
+    query = select(
+        expenses_table.c.AdditionalNotes,
+        expenses_table.c.ExpenseCategory,
+        expenses_table.c.SuggestedCategory,
+        expenses_table.c.CategoryConfirmed,
+    ).order_by(expenses_table.c.ExpenseID)
+    with app.app_context(), db.engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(query)]
+
+
+def expense(notes, category):
+    return {
+        "scope": "Joint",
+        "day": 5,
+        "month": "March",
+        "year": 2024,
+        "amount": "4.00",
+        "category": category,
+        "notes": notes,
+    }
+
+
+def test_submissions_are_suggested_and_learned_online(app, auth_client):
+    for _ in range(2):
+        response = auth_client.post(
+            "/api/v1/expenses", json={"expenses": [expense("coffee", "Alcohol")]}
+        )
+        assert response.status_code == 201
+
+    assert stored_suggestions(app) == [
+        ("coffee", "Alcohol", None, True),  # Nothing learned yet
+        ("coffee", "Alcohol", "Alcohol", True),
+    ]
+    stats = auth_client.get("/stats/suggestions", headers=STATS).get_json()
+    assert stats["size"] == 1
+    assert stats["trained_rows"] == 2
+
+
+def test_models_are_trained_outside_the_write_transaction(auth_client, monkeypatch):
+    in_transaction = []
+    load_model = suggest.load_model
+
+    def recording_load_model(connection, account_id):
+        in_transaction.append(connection.in_transaction())
+        return load_model(connection, account_id)
+
+    monkeypatch.setattr(suggest, "load_model", recording_load_model)
+    expense = {
+        "scope": "Joint",
+        "day": 5,
+        "month": "March",
+        "year": 2024,
+        "amount": "12.50",
+        "category": "Groceries",
+        "notes": "weekly shop",
+    }
+    auth_client.post("/api/v1/expenses", json={"expenses": [expense]})
+    assert in_transaction == [False]
+
+
+def test_import_fills_blank_categories_as_unconfirmed(app, auth_client):
+    auth_client.post(
+        "/api/v1/expenses", json={"expenses": [expense("plumber", "Home Services")]}
+    )
+    text = "Date,Amount,Category,Notes\n2024-01-05,90.00,,plumber visit\n"
+    data = {"file": (io.BytesIO(text.encode()), "history.csv")}
+    response = auth_client.post(
+        "/import", data=data, content_type="multipart/form-data"
+    )
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[-1]["inserted"] == 1
+
+    assert stored_suggestions(app)[-1] == (
+        "plumber visit",
+        "Home Services",
+        "Home Services",
+        False,
+    )
+    # Unconfirmed suggestions aren't learned from
+    stats = auth_client.get("/stats/suggestions", headers=STATS).get_json()
+    assert stats["trained_rows"] == 1
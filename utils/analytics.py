@@ -0,0 +1,197 @@
+import os
+from datetime import date
+
+import numpy as np
+from sqlalchemy import select
+
+from database.tables import expenses_table, CATEGORY_LIST
+from utils.cache import TTLCache
+from utils.rollup import ROLLUP_AMOUNT
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+JOINT_CODE = 0  # Person code used for joint expenses
+
+# Column arrays are cached per account and data version, which every write
+# to the account's expenses bumps, so all workers reload after a change
+column_cache = TTLCache(
+    ttl=int(os.getenv("ANALYTICS_CACHE_TTL", "600")),
+    maxsize=int(os.getenv("ANALYTICS_CACHE_SIZE", "64")),
+)
+
+
+class ExpenseColumns:
+    """An account's expenses as compact column arrays.
+
+    `days` holds dates as int32 days since 1970-01-01 and `months` as int32
+    months since January 1970, `amounts` is float64, and `categories` and
+    `persons` are small-int codes into the `category_names` and `person_ids`
+    lists. Person code 0 is a joint expense.
+    """
+
+    def __init__(
+        self, days, months, amounts, categories, persons, category_names, person_ids
+    ):
+        self.days = days
+        self.months = months
+        self.amounts = amounts
+        self.categories = categories
+        self.persons = persons
+        self.category_names = category_names
+        self.person_ids = person_ids
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def nbytes(self):
+        return sum(
+            array.nbytes
+            for array in (
+                self.days,
+                self.months,
+                self.amounts,
+                self.categories,
+                self.persons,
+            )
+        )
+
+
+def build_columns(rows, person_ids):
+    """Build ExpenseColumns from (date, amount, category, person id) rows."""
+    category_names = list(CATEGORY_LIST)
+    category_codes = {name: code for code, name in enumerate(category_names)}
+    person_ids = [None] + list(person_ids)  # Code 0 is joint
+    person_codes = {person_id: code for code, person_id in enumerate(person_ids)}
+
+    days = []
+    months = []
+    amounts = []
+    categories = []
+    persons = []
+    for expense_date, amount, category, person_id in rows:
+        days.append(expense_date.toordinal())
+        months.append((expense_date.year - 1970) * 12 + expense_date.month - 1)
+        amounts.append(amount)
+
+        code = category_codes.get(category)
+        if code is None:  # A category outside the default list
+            code = category_codes[category] = len(category_names)
+            category_names.append(category)
+        categories.append(code)
+
+        code = person_codes.get(person_id)
+        if code is None:
+            code = person_codes[person_id] = len(person_ids)
+            person_ids.append(person_id)
+        persons.append(code)
+
+    return ExpenseColumns(
+        days=(np.array(days, dtype=np.int64) - EPOCH_ORDINAL).astype(np.int32),
+        months=np.array(months, dtype=np.int32),
+        amounts=np.array(amounts, dtype=np.float64),
+        categories=np.array(categories, dtype=np.int16),
+        persons=np.array(persons, dtype=np.int16),
+        category_names=category_names,
+        person_ids=person_ids,
+    )
+
+
+def load_columns(connection, account_id, person_ids):
+    # Amounts in the base currency where converted, as the rollup totals them
+    query = select(
+        expenses_table.c.ExpenseDate,
+        ROLLUP_AMOUNT,
+        expenses_table.c.ExpenseCategory,
+        expenses_table.c.PersonID,
+    ).where(expenses_table.c.AccountID == account_id)
+    result = connection.execution_options(yield_per=10000).execute(query)
+    return build_columns(result, person_ids)
+
+
+def get_columns(engine, account, person_ids):
+    def loader():
+        with engine.connect() as connection:
+            return load_columns(connection, account.id, person_ids)
+
+    return column_cache.get((account.id, account.data_version), loader)
+
+
+def category_totals(columns):
+    totals = np.bincount(
+        columns.categories,
+        weights=columns.amounts,
+        minlength=len(columns.category_names),
+    )
+    return dict(zip(columns.category_names, totals.tolist()))
+
+
+def monthly_totals(columns, category=None):
+    """Return (month labels, totals) for every month from first to last expense."""
+    if len(columns) == 0:
+        return [], np.zeros(0)
+
+    months = columns.months
+    weights = columns.amounts
+    if category is not None:
+        if category not in columns.category_names:
+            weights = np.zeros_like(weights)
+        else:
+            code = columns.category_names.index(category)
+            weights = np.where(columns.categories == code, weights, 0.0)
+
+    first = months.min()
+    totals = np.bincount(months - first, weights=weights)
+    labels = np.arange(first, first + len(totals)).astype("datetime64[M]")
+    return [str(label) for label in labels], totals
+
+
+def month_over_month(totals):
+    """Absolute and relative change of each month against the previous one."""
+    change = np.diff(totals, prepend=np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        previous = np.concatenate(([np.nan], totals[:-1]))[: len(totals)]
+        percent = np.where(previous != 0, change / previous * 100, np.nan)
+    return change, percent
+
+
+def rolling_average(totals, window):
+    """Trailing mean over `window` months; shorter at the start of the series."""
+    cumulative = np.cumsum(np.concatenate(([0.0], totals)))
+    counts = np.minimum(np.arange(1, len(totals) + 1), window)
+    upper = np.arange(1, len(totals) + 1)
+    return (cumulative[upper] - cumulative[upper - counts]) / counts
+
+
+def person_split(columns):
+    """Totals for joint expenses and for each individual's expenses."""
+    totals = np.bincount(
+        columns.persons, weights=columns.amounts, minlength=len(columns.person_ids)
+    )
+    return {
+        "joint": float(totals[JOINT_CODE]),
+        "individual": {
+            person_id: float(total)
+            for person_id, total in zip(columns.person_ids[1:], totals[1:])
+        },
+    }
+
+
+def to_json_list(array):
+    # NaN isn't valid JSON, so report missing values as null
+    return [None if np.isnan(value) else float(value) for value in array]
+
+
+def summarize(columns, window=3, category=None):
+    labels, totals = monthly_totals(columns, category)
+    change, percent = month_over_month(totals)
+    return {
+        "expense_count": len(columns),
+        "category_totals": category_totals(columns),
+        "months": labels,
+        "monthly_totals": to_json_list(totals),
+        "month_over_month_change": to_json_list(change),
+        "month_over_month_percent": to_json_list(percent),
+        "rolling_average": to_json_list(rolling_average(totals, window)),
+        "rolling_window": window,
+        "person_split": person_split(columns),
+    }
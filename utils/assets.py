@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import shutil
+import sys
+import tempfile
+
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+BUILD_DIR = "build"  # Fingerprinted copies, under the static folder
+MANIFEST_NAME = "manifest.json"
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Files worth gzipping; images and fonts are compressed already
+GZIP_EXTENSIONS = {".css", ".js", ".svg", ".ico", ".json", ".txt", ".map"}
+
+
+def fingerprinted_name(filename, data):
+    """css/main.css -> css/main.<first 12 hex digits of its SHA-256>.css"""
+    stem, extension = posixpath.splitext(filename)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+
+
+def build_assets(static_folder):
+    """Write fingerprinted, gzipped copies of the static files and a manifest.
+
+    Every file under `static_folder` is copied to build/ with a hash of its
+    content in its name, and text files also get a `.gz` sibling when that
+    is smaller. The new build is written next to the previous one and then
+    swapped into its place. Returns the manifest, which maps each filename
+    to its copy, and a summary of the bytes written.
+    """
+    build_root = os.path.join(static_folder, BUILD_DIR)
+    staging = tempfile.mkdtemp(prefix=BUILD_DIR + ".", dir=static_folder)
+    os.chmod(staging, 0o755)
+
+    manifest = {}
+    summary = {"files": 0, "bytes": 0, "gzipped": 0, "gzipped_bytes": 0}
+    for directory, subdirectories, filenames in os.walk(static_folder):
+        if directory == static_folder:
+            subdirectories[:] = [
+                name
+                for name in subdirectories
+                if name != BUILD_DIR and not name.startswith(BUILD_DIR + ".")
+            ]
+        subdirectories.sort()
+        for name in sorted(filenames):
+            source = os.path.join(directory, name)
+            filename = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+
+            hashed = fingerprinted_name(filename, data)
+            target = os.path.join(staging, *hashed.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+            manifest[filename] = hashed
+            summary["files"] += 1
+            summary["bytes"] += len(data)
+
+            if posixpath.splitext(filename)[1].lower() in GZIP_EXTENSIONS:
+                # mtime=0 keeps the output identical between builds
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) < len(data):
+                    with open(target + ".gz", "wb") as f:
+                        f.write(compressed)
+                    summary["gzipped"] += 1
+                    summary["gzipped_bytes"] += len(compressed)
+
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    previous = None
+    if os.path.exists(build_root):
+        previous = f"{build_root}.old-{os.getpid()}"
+        os.replace(build_root, previous)
+    os.replace(staging, build_root)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+    return manifest, summary
+
+
+def load_manifest(static_folder):
+    """Return the manifest from the last build_assets(), or {} if none."""
+    try:
+        with open(os.path.join(static_folder, BUILD_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class Assets:
+    """Resolves static filenames to their fingerprinted URLs.
+
+    Without a build, or when disabled, files keep their plain URLs and are
+    served with Flask's default revalidation.
+    """
+
+    def __init__(self, static_folder, enabled=True):
+        self.manifest = load_manifest(static_folder) if enabled else {}
+        # Part of page ETags, so cached pages are refetched after a deploy
+        self.version = hashlib.sha256(
+            json.dumps(self.manifest, sort_keys=True).encode()
+        ).hexdigest()[:12]
+
+    def url(self, filename):
+        hashed = self.manifest.get(filename)
+        if hashed is None:
+            return url_for("static", filename=filename)
+        return url_for("static", filename=f"{BUILD_DIR}/{hashed}")
+
+
+def asset_url(filename):
+    """Template helper: the URL to use for a file in static/."""
+    return current_app.extensions["assets"].url(filename)
+
+
+def accepts_gzip():
+    return request.accept_encodings["gzip"] > 0
+
+
+def send_static(filename):
+    """Serve static files, with far-future caching for fingerprinted ones.
+
+    A fingerprinted file's name changes whenever its content does, so it can
+    be cached for a year without revalidation; its precompressed copy is
+    sent to clients that accept gzip.
+    """
+    if not filename.startswith(BUILD_DIR + "/"):
+        return current_app.send_static_file(filename)
+
+    static_folder = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    compressed = filename + ".gz"
+    has_gzip = os.path.isfile(safe_join(static_folder, compressed) or "")
+    gzipped = has_gzip and accepts_gzip()
+    response = send_from_directory(
+        static_folder,
+        compressed if gzipped else filename,
+        mimetype=mimetype,
+        max_age=ASSET_MAX_AGE,
+    )
+    if gzipped:
+        response.headers["Content-Encoding"] = "gzip"
+    if has_gzip:
+        response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    app.extensions["assets"] = Assets(
+        app.static_folder, enabled=app.config["ASSETS_FINGERPRINT"]
+    )
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.view_functions["static"] = send_static
+
+
+if __name__ == "__main__":
+    # The release step, run from the project root once the code is in
+    # place: python -m utils.assets [static folder]
+    _, summary = build_assets(sys.argv[1] if len(sys.argv) > 1 else "static")
+    print(f"Built {summary['files']} files ({summary['bytes']} bytes).")
@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+from utils.db_tools import populate_categories_table, get_categories
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """One-time application warm-up, run off the import path.
+
+    Seeds the categories table, prefills the connection pool and loads the
+    category cache. Runs at most once per process; status() reports progress
+    and per-step timings for the readiness endpoint.
+    """
+
+    def __init__(self, engine_getter, categories_table, category_list):
+        self.engine_getter = engine_getter
+        self.categories_table = categories_table
+        self.category_list = category_list
+        self.state = "pending"
+        self.error = None
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, app, background=True):
+        """Start the warm-up unless it has already been started."""
+        if self.state != "pending":
+            return  # Cheap check for the common case, on every request
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.state = "running"
+
+        if background:
+            self._thread = threading.Thread(
+                target=self.run, args=(app,), name="warm-up", daemon=True
+            )
+            self._thread.start()
+        else:
+            self.run(app)
+
+    def run(self, app):
+        started = time.perf_counter()
+        try:
+            with app.app_context():
+                engine = self.engine_getter()
+                self._timed(
+                    "seed_categories",
+                    populate_categories_table,
+                    engine,
+                    self.categories_table,
+                    self.category_list,
+                )
+                self._timed("prefill_pool", prefill_pool, engine)
+                self._timed(
+                    "load_categories", get_categories, engine, self.categories_table
+                )
+        except Exception as e:
+            logger.exception("Warm-up failed")
+            self.error = str(e)
+            self.state = "failed"
+        else:
+            self.state = "ready"
+        self.timings["total"] = time.perf_counter() - started
+
+    def reset(self):
+        """Allow a failed warm-up to be retried."""
+        with self._lock:
+            if self.state == "failed":
+                self.state = "pending"
+                self.error = None
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        return {
+            "status": self.state,
+            "error": self.error,
+            "timings": dict(self.timings),
+        }
+
+    def _timed(self, name, func, *args):
+        started = time.perf_counter()
+        func(*args)
+        self.timings[name] = time.perf_counter() - started
+
+
+def prefill_pool(engine):
+    """Open the pool's steady-state connections ahead of the first requests."""
+    size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()  # Returns the connection to the pool
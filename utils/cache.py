@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-process cache with a time-to-live and LRU eviction.
+
+    Values are loaded on a miss by the loader passed to get(), and dropped
+    either when they expire, when the cache is full, or when invalidate() is
+    called. A value whose key was invalidated while it was loading is
+    returned but not kept, since it may predate the change. Hit and miss
+    counts are kept for monitoring.
+    """
+
+    def __init__(self, ttl, maxsize=128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, loaded_at)
+        # Keys being loaded -> [loaders, invalidations since they started]
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            loading = self._loading.setdefault(key, [0, 0])
+            loading[0] += 1
+            invalidations = loading[1]
+
+        # Load outside the lock so a slow query doesn't block other keys
+        try:
+            value = loader()
+        except BaseException:
+            with self._lock:
+                self._finish_loading(key, loading)
+            raise
+        with self._lock:
+            self._finish_loading(key, loading)
+            if loading[1] == invalidations:
+                self._store(key, value, now)
+        return value
+
+    def set(self, key, value, loaded_at=None):
+        """Store a value that was loaded outside of get()."""
+        if loaded_at is None:
+            loaded_at = time.time()
+        with self._lock:
+            self._store(key, value, loaded_at)
+
+    def _finish_loading(self, key, loading):
+        loading[0] -= 1
+        if loading[0] == 0:
+            del self._loading[key]
+
+    def _store(self, key, value, loaded_at):
+        self._entries[key] = (value, loaded_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def peek(self, key):
+        """Return the cached value for `key` if it's fresh, without loading it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] < self.ttl:
+                return entry[0]
+            return None
+
+    def values(self):
+        with self._lock:
+            return [value for value, _ in self._entries.values()]
+
+    def loaded_at(self, key):
+        """Return when the cached value for `key` was loaded, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def invalidate(self, key=None):
+        """Drop one key, or every key if none is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                loading = self._loading.values()
+            else:
+                self._entries.pop(key, None)
+                loading = [self._loading[key]] if key in self._loading else []
+            for pending in loading:
+                pending[1] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
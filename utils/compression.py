@@ -0,0 +1,89 @@
+import gzip
+import zlib
+
+from flask import current_app, request
+
+# Responses worth compressing. Import progress (application/x-ndjson) is
+# left alone so that each chunk's event reaches the client as it happens
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/csv",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+}
+
+STREAM_FLUSH_BYTES = 16 * 1024
+
+
+def gzip_stream(chunks, level):
+    """Gzip a streamed body without buffering all of it.
+
+    The first chunk (the top of a page, with its stylesheet links) is
+    flushed immediately; after that, compressed output is flushed about
+    every STREAM_FLUSH_BYTES of input so that the ratio stays close to
+    compressing the whole body at once.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    first = True
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            output = compressor.compress(chunk)
+            pending += len(chunk)
+            if first or pending >= STREAM_FLUSH_BYTES:
+                output += compressor.flush(zlib.Z_SYNC_FLUSH)
+                pending = 0
+                first = False
+            if output:
+                yield output
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """Gzip dynamic responses for clients that accept it, when it's worth it.
+
+    Bodies under COMPRESS_MIN_SIZE aren't, since gzip's overhead eats the
+    saving. Files sent by send_file() are skipped: static assets are
+    precompressed at build time instead.
+    """
+    config = current_app.config
+    if (
+        not config["COMPRESS_RESPONSES"]
+        or response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if request.accept_encodings["gzip"] <= 0:
+        return response
+
+    level = config["COMPRESS_LEVEL"]
+    if response.is_streamed:
+        response.response = gzip_stream(response.response, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.set_data(gzip.compress(data, compresslevel=level))
+    response.headers["Content-Encoding"] = "gzip"
+
+    # The compressed bytes differ from the identity ones, so a strong
+    # validator no longer applies; If-None-Match compares weakly anyway
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,298 @@
+import csv
+import hashlib
+import io
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.tables import expenses_table, MONTH_NAMES
+from utils.expenses import parse_expense_rows, record_expenses
+from utils.suggest import get_model, load_models, learn_expenses, parse_amount
+
+IMPORT_CHUNK_SIZE = 500
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y")
+
+# Accepted header names (lowercased, without spaces) for each input column
+COLUMN_ALIASES = {
+    "date": "date",
+    "expensedate": "date",
+    "amount": "amount",
+    "category": "category",
+    "expensecategory": "category",
+    "notes": "notes",
+    "additionalnotes": "notes",
+    "description": "notes",
+    "scope": "scope",
+    "person": "scope",
+    "expensescope": "scope",
+}
+
+
+def read_csv_records(stream):
+    """Lazily yield (row number, record) pairs from an uploaded CSV stream.
+
+    Header names are mapped through COLUMN_ALIASES; row numbers count data
+    rows from 1, not including the header.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [
+        COLUMN_ALIASES.get(name.strip().lower().replace(" ", "")) for name in header
+    ]
+
+    for row_number, values in enumerate(reader, start=1):
+        if not any(value.strip() for value in values):
+            continue  # Skip blank lines
+        yield row_number, {
+            column: value.strip()
+            for column, value in zip(columns, values)
+            if column is not None
+        }
+
+
+def to_form_row(record, persons_by_name):
+    """Map a CSV record onto the (scope, day, month, year, ...) form row shape."""
+    raw_date = record.get("date", "")
+    day, month, year = raw_date, "", ""
+    for date_format in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(raw_date, date_format).date()
+        except ValueError:
+            continue
+        day, month, year = parsed.day, MONTH_NAMES[parsed.month - 1], parsed.year
+        break
+
+    # The scope column holds "Joint", a person's name, or a PersonID
+    scope = record.get("scope") or "Joint"
+    if scope.lower() == "joint":
+        scope = "Joint"
+    else:
+        scope = persons_by_name.get(scope.lower(), scope)
+
+    return (
+        str(scope),
+        str(day),
+        month,
+        str(year),
+        record.get("amount", ""),
+        record.get("category", ""),
+        record.get("notes", ""),
+    )
+
+
+def fill_categories(engine, account_id, form_rows):
+    """Give rows without a category the account model's suggestion.
+
+    Scores all of the blank rows in one batch. Returns the indexes of the
+    rows that were filled in.
+    """
+    blank = [index for index, row in enumerate(form_rows) if not row[5]]
+    if not blank:
+        return set()
+    with engine.connect() as connection:
+        model = get_model(connection, account_id)
+    suggestions = model.suggest(
+        [form_rows[index][6] for index in blank],
+        [parse_amount(form_rows[index][4]) for index in blank],
+    )
+    filled = set()
+    for index, suggestion in zip(blank, suggestions):
+        if suggestion is not None:
+            row = form_rows[index]
+            form_rows[index] = row[:5] + (suggestion,) + row[6:]
+            filled.add(index)
+    return filled
+
+
+def fingerprint(expense_date, amount, category, notes, person_id):
+    """Hash the fields that identify an expense, for deduplication."""
+    key = "\x1f".join(
+        [
+            expense_date.isoformat(),
+            f"{amount:.2f}",
+            category,
+            notes or "",
+            str(person_id or ""),
+        ]
+    )
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+def existing_keys(connection, account_id, dates):
+    """Dedupe keys of the account's stored expenses on the given dates.
+
+    A key is (fingerprint, n) for the n-th identical expense, so that
+    legitimately repeated expenses (two identical coffees on one day) are
+    kept while re-imported ones are not.
+    """
+    query = (
+        select(
+            expenses_table.c.ExpenseDate,
+            expenses_table.c.Amount,
+            expenses_table.c.ExpenseCategory,
+            expenses_table.c.AdditionalNotes,
+            expenses_table.c.PersonID,
+        )
+        .where(
+            expenses_table.c.AccountID == account_id,
+            expenses_table.c.ExpenseDate.in_(dates),
+        )
+        .order_by(expenses_table.c.ExpenseID)
+    )
+    counts = Counter()
+    keys = set()
+    for row in connection.execute(query):
+        digest = fingerprint(*row)
+        counts[digest] += 1
+        keys.add((digest, counts[digest]))
+    return keys
+
+
+def import_expenses(
+    engine,
+    account_id,
+    currency,
+    persons,
+    stream,
+    chunk_size=IMPORT_CHUNK_SIZE,
+    start_row=1,
+    on_commit=None,
+):
+    """Import expenses from a CSV stream in fixed-size transactional chunks.
+
+    Yields a progress event per chunk and a final summary event. Each chunk
+    is validated, deduplicated against stored expenses and written in its
+    own transaction; if one fails, or the file can't be decoded or parsed,
+    the import stops with a "failed" event that reports the row to resume
+    from. Rows before `start_row` are only read to keep duplicate
+    counting consistent, so resuming with the same file is safe. Rows
+    without a category get the one suggested by the account's model, and
+    are stored as unconfirmed. `on_commit` is called after each chunk is
+    committed.
+    """
+    persons_by_name = {person.PersonName.lower(): person.PersonID for person in persons}
+    person_ids = [person.PersonID for person in persons]
+
+    file_counts = Counter()  # Occurrences of each fingerprint in the file so far
+    totals = {"inserted": 0, "duplicates": 0, "rejected": 0}
+    started = time.perf_counter()
+    chunk_number = 0
+
+    def failed(resume_from_row, error):
+        return {
+            "event": "failed",
+            "chunk": chunk_number,
+            "resume_from_row": max(resume_from_row, start_row),
+            "error": type(error).__name__,
+            **totals,
+        }
+
+    records = read_csv_records(stream)
+    last_row = 0  # The last row of the last chunk that was read
+    while True:
+        chunk = []
+        try:
+            for row_number, record in records:
+                chunk.append((row_number, record))
+                if len(chunk) >= chunk_size:
+                    break
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Not UTF-8 or not CSV. The response is already streaming, so
+            # report it in-band; nothing from this chunk has been written
+            chunk_number += 1
+            yield failed(chunk[0][0] if chunk else last_row + 1, e)
+            return
+        if not chunk:
+            break
+        chunk_number += 1
+        chunk_started = time.perf_counter()
+        last_row = chunk[-1][0]
+
+        form_rows = [to_form_row(record, persons_by_name) for _, record in chunk]
+        try:
+            filled = fill_categories(engine, account_id, form_rows)
+        except SQLAlchemyError as e:
+            yield failed(chunk[0][0], e)
+            return
+        accepted, results = parse_expense_rows(
+            form_rows, account_id, currency, person_ids=person_ids
+        )
+
+        # Pair each accepted row with its file row number and dedupe key
+        row_positions = iter(
+            (index, row_number)
+            for index, ((row_number, _), result) in enumerate(zip(chunk, results))
+            if result["status"] == "accepted"
+        )
+        candidates = []
+        for row in accepted:
+            index, row_number = next(row_positions)
+            if index in filled:
+                row["CategoryConfirmed"] = False
+            digest = fingerprint(
+                row["ExpenseDate"],
+                row["Amount"],
+                row["ExpenseCategory"],
+                row["AdditionalNotes"],
+                row["PersonID"],
+            )
+            file_counts[digest] += 1
+            if row_number >= start_row:
+                candidates.append((row, (digest, file_counts[digest])))
+
+        rejected = [
+            {"row": row_number, "errors": result["errors"]}
+            for (row_number, _), result in zip(chunk, results)
+            if result["status"] == "rejected" and row_number >= start_row
+        ]
+        if chunk[-1][0] < start_row:
+            continue  # Entirely before the resume point
+
+        try:
+            models = load_models(engine, [row for row, _ in candidates])
+            with engine.begin() as connection:
+                dates = {row["ExpenseDate"] for row, _ in candidates}
+                stored = existing_keys(connection, account_id, dates) if dates else set()
+                new_rows = [row for row, key in candidates if key not in stored]
+                record_expenses(connection, expenses_table, new_rows, models)
+        except SQLAlchemyError as e:
+            yield failed(chunk[0][0], e)
+            return
+
+        learn_expenses(new_rows)
+        if on_commit is not None:
+            on_commit()
+
+        duplicates = len(candidates) - len(new_rows)
+        totals["inserted"] += len(new_rows)
+        totals["duplicates"] += duplicates
+        totals["rejected"] += len(rejected)
+        seconds = time.perf_counter() - chunk_started
+        yield {
+            "event": "chunk",
+            "chunk": chunk_number,
+            "first_row": chunk[0][0],
+            "last_row": chunk[-1][0],
+            "inserted": len(new_rows),
+            "duplicates": duplicates,
+            "rejected": rejected,
+            "seconds": seconds,
+            "rows_per_second": len(chunk) / seconds if seconds else None,
+        }
+
+    seconds = time.perf_counter() - started
+    processed = totals["inserted"] + totals["duplicates"] + totals["rejected"]
+    yield {
+        "event": "done",
+        "chunks": chunk_number,
+        **totals,
+        "seconds": seconds,
+        "rows_per_second": processed / seconds if seconds else None,
+    }
@@ -1,8 +1,43 @@
-from sqlalchemy import select
-import pyodbc
+from sqlalchemy import select, event
+from sqlalchemy.engine import make_url
+from urllib.parse import quote_plus
+import os
 
+from utils.cache import TTLCache
+
+# The category list only changes when populate_categories_table() adds to it,
+# so it is cached for the life of the process unless explicitly invalidated
+CATEGORY_CACHE_KEY = "categories"
+category_cache = TTLCache(ttl=int(os.getenv("CATEGORY_CACHE_TTL", "3600")), maxsize=1)
+
+# Connection settings applied to every SQLite connection by configure_engine()
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+
+BACKENDS = ("mssql", "sqlite", "postgresql")
+
+
+def get_database_url(db_username, db_password, db_server, db_name, backend="mssql"):
+    """Build the database URL for a DB_BACKEND from the DB_* settings.
+
+    For SQLite, `db_name` is the database file path.
+    """
+    if backend == "sqlite":
+        return f"sqlite:///{db_name or 'expenses.db'}"
+    if backend == "postgresql":
+        # Needs psycopg2, which is only installed for PostgreSQL deployments
+        return (
+            f"postgresql+psycopg2://{quote_plus(db_username or '')}:"
+            f"{quote_plus(db_password or '')}@{db_server}/{db_name}"
+        )
+    if backend != "mssql":
+        raise ValueError(f"Unknown DB_BACKEND {backend!r}, expected one of {BACKENDS}")
+
+    # Imported here so that pyodbc (and the ODBC driver manager it loads) is
+    # only needed when connecting to SQL Server
+    import pyodbc
 
-def get_database_url(db_username, db_password, db_server, db_name):
     drivers = [driver for driver in pyodbc.drivers()]
     driver = None
 
@@ -17,6 +52,44 @@ def get_database_url(db_username, db_password, db_server, db_name):
     return f"mssql+pyodbc://{db_username}:{db_password}@{db_server}/{db_name}?driver={driver}"
 
 
+def get_engine_options(database_url):
+    """Per-dialect create_engine() options for the bulk write paths."""
+    url = make_url(database_url)
+    # pyodbc sends executemany() parameter sets one round trip at a time unless
+    # fast_executemany is enabled; sqlite3 already batches executemany() natively
+    if url.drivername == "mssql+pyodbc":
+        return {"fast_executemany": True}
+    if url.drivername in ("postgresql", "postgresql+psycopg2"):
+        # INSERTs already go out as multi-row VALUES ("insertmanyvalues");
+        # this also pages executemany() UPDATEs, such as the rollup's, with
+        # execute_batch instead of one round trip per row
+        return {
+            "executemany_mode": "values_plus_batch",
+            "insertmanyvalues_page_size": int(
+                os.getenv("DB_INSERT_PAGE_SIZE", "1000")
+            ),
+        }
+    return {}
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the writer, and synchronous=NORMAL only
+    # syncs at checkpoints, which is still safe against corruption in WAL mode
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.close()
+
+
+def configure_engine(engine):
+    """Install per-dialect connection settings that aren't engine options."""
+    if engine.dialect.name == "sqlite" and not event.contains(
+        engine, "connect", set_sqlite_pragmas
+    ):
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
 def populate_categories_table(engine, categories_table, category_list):
     with engine.connect() as connection:
         # Get existing categories in one query
@@ -38,11 +111,28 @@ def populate_categories_table(engine, categories_table, category_list):
             )
             connection.execute(insert_query)
             connection.commit()  # Commit the transaction after insertions
+            invalidate_categories()
 
 
-def get_categories(engine, categories_table):
+def load_categories(engine, categories_table):
     query = select(categories_table.c.CategoryName)
     with engine.connect() as connection:
         result = connection.execute(query)
         categories = [row.CategoryName for row in result]
         return categories  # Access the column as an attribute
+
+
+def get_categories(engine, categories_table):
+    # Returns a tuple so callers can't mutate the shared cached list
+    return category_cache.get(
+        CATEGORY_CACHE_KEY, lambda: tuple(load_categories(engine, categories_table))
+    )
+
+
+def invalidate_categories():
+    category_cache.invalidate(CATEGORY_CACHE_KEY)
+
+
+def categories_last_modified():
+    """Return when the cached category list was loaded, or None."""
+    return category_cache.loaded_at(CATEGORY_CACHE_KEY)
@@ -0,0 +1,288 @@
+import math
+from datetime import datetime
+
+from sqlalchemy import select, and_, or_
+
+from database.tables import CATEGORY_LIST, MONTH_NAMES
+from utils.fx import apply_adjusted_amounts, get_rates
+from utils.rollup import compute_deltas, apply_deltas
+from utils.suggest import apply_suggestions
+from utils.page_cache import bump_data_version
+
+MAX_NOTES_LENGTH = 255  # Matches the AdditionalNotes column size
+
+
+def parse_expense_rows(rows, account_id, currency, person_ids=None, categories=None):
+    """Validate and normalize raw expense rows ahead of a batched insert.
+
+    `rows` is an iterable of (scope, day, month, year, amount, category, notes)
+    tuples as posted by the entry form, or as decoded from JSON, so fields of
+    the wrong type are rejected like invalid values. Returns a tuple of
+    (accepted, results): `accepted` holds one dict per valid row, keyed by
+    expenses_table column names, and `results` holds one accept/reject entry
+    per submitted row.
+    """
+    if categories is None:
+        categories = CATEGORY_LIST
+    categories = set(categories)
+    if person_ids is not None:
+        person_ids = {int(person_id) for person_id in person_ids}
+
+    accepted = []
+    results = []
+
+    for index, (scope, day, month, year, amount, category, notes) in enumerate(
+        rows, start=1
+    ):
+        errors = []
+
+        # Scope is either "Joint" or the PersonID of an individual on the account
+        person_id = None
+        if scope == "Joint":
+            expense_scope = "Joint"
+        else:
+            expense_scope = "Individual"
+            try:
+                person_id = int(scope)
+            except (TypeError, ValueError):
+                errors.append(f"Invalid expense scope: {scope!r}")
+            else:
+                if person_ids is not None and person_id not in person_ids:
+                    errors.append(f"Unknown person: {scope!r}")
+
+        # The month is submitted by name, so normalize its capitalization
+        month_name = str(month).strip().capitalize()
+        expense_date = None
+        try:
+            expense_date = datetime.strptime(
+                f"{str(year).strip()}-{month_name}-{str(day).strip()}", "%Y-%B-%d"
+            ).date()
+        except ValueError:
+            errors.append(f"Invalid date: {day} {month} {year}")
+
+        # Amounts may contain commas from the thousands separator. Negative
+        # amounts are refunds; "nan" and "inf" parse but aren't amounts
+        amount_value = None
+        try:
+            amount_value = float(str(amount).replace(",", ""))
+        except ValueError:
+            errors.append(f"Invalid amount: {amount!r}")
+        else:
+            if not math.isfinite(amount_value):
+                errors.append(f"Invalid amount: {amount!r}")
+
+        if not isinstance(category, str) or category not in categories:
+            errors.append(f"Unknown category: {category!r}")
+
+        if notes is None:
+            notes = ""
+        if not isinstance(notes, str):
+            errors.append(f"Invalid notes: {notes!r}")
+            notes = ""
+        notes = notes.strip()
+        if len(notes) > MAX_NOTES_LENGTH:
+            errors.append(f"Notes exceed {MAX_NOTES_LENGTH} characters")
+
+        if errors:
+            results.append({"row": index, "status": "rejected", "errors": errors})
+            continue
+
+        accepted.append(
+            {
+                "AccountID": account_id,
+                "ExpenseScope": expense_scope,  # Set to Joint or Individual
+                "PersonID": person_id,  # None if Joint, otherwise the PersonID
+                "Day": expense_date.day,
+                "Month": MONTH_NAMES[expense_date.month - 1],
+                "Year": expense_date.year,
+                "ExpenseDate": expense_date,
+                "Amount": amount_value,
+                "ExpenseCategory": category,
+                "AdditionalNotes": notes,
+                "Currency": currency,
+            }
+        )
+        results.append({"row": index, "status": "accepted", "errors": []})
+
+    return accepted, results
+
+
+def insert_expenses(connection, expenses_table, rows):
+    """Insert already-validated expense rows in a single executemany call.
+
+    Runs on the caller's connection so that the insert can share a transaction
+    with other writes. Returns the number of rows inserted.
+    """
+    if not rows:
+        return 0
+
+    # Passing a list of parameter sets makes SQLAlchemy use the DBAPI's
+    # executemany(), which pyodbc turns into one round trip when the engine is
+    # created with fast_executemany=True
+    connection.execute(expenses_table.insert(), rows)
+    return len(rows)
+
+
+def summarize_results(results):
+    accepted = sum(1 for result in results if result["status"] == "accepted")
+    return {
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "rows": results,
+    }
+
+
+def encode_cursor(expense_date, expense_id):
+    return f"{expense_date.isoformat()}_{expense_id}"
+
+
+def decode_cursor(cursor):
+    """Parse a cursor produced by encode_cursor(), or return None if invalid."""
+    try:
+        date_part, id_part = cursor.split("_", 1)
+        return datetime.strptime(date_part, "%Y-%m-%d").date(), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
+
+def apply_expense_filters(
+    query, expenses_table, start_date=None, end_date=None, category=None, person=None
+):
+    """Narrow an expenses query by date range, category and person.
+
+    `person` is either "Joint" or a PersonID.
+    """
+    if start_date is not None:
+        query = query.where(expenses_table.c.ExpenseDate >= start_date)
+    if end_date is not None:
+        query = query.where(expenses_table.c.ExpenseDate <= end_date)
+    if category:
+        query = query.where(expenses_table.c.ExpenseCategory == category)
+    if person == "Joint":
+        query = query.where(expenses_table.c.ExpenseScope == "Joint")
+    elif person is not None:
+        query = query.where(expenses_table.c.PersonID == person)
+    return query
+
+
+def build_expenses_query(
+    expenses_table,
+    account_id,
+    start_date=None,
+    end_date=None,
+    category=None,
+    person=None,
+    after=None,
+    limit=None,
+):
+    """Build a keyset-paginated query over an account's expenses.
+
+    Rows are ordered newest first on (ExpenseDate, ExpenseID). `after` is a
+    (date, id) pair from decode_cursor(): only rows strictly after it in that
+    order are returned, so a page costs the same regardless of its offset.
+    """
+    query = select(
+        expenses_table.c.ExpenseID,
+        expenses_table.c.ExpenseDate,
+        expenses_table.c.Amount,
+        expenses_table.c.ExpenseCategory,
+        expenses_table.c.AdditionalNotes,
+        expenses_table.c.Currency,
+    ).where(expenses_table.c.AccountID == account_id)
+    query = apply_expense_filters(
+        query, expenses_table, start_date, end_date, category, person
+    )
+
+    if after is not None:
+        after_date, after_id = after
+        # Row-value comparisons aren't supported by SQL Server, so spell out
+        # (ExpenseDate, ExpenseID) < (after_date, after_id)
+        query = query.where(
+            or_(
+                expenses_table.c.ExpenseDate < after_date,
+                and_(
+                    expenses_table.c.ExpenseDate == after_date,
+                    expenses_table.c.ExpenseID < after_id,
+                ),
+            )
+        )
+
+    query = query.order_by(
+        expenses_table.c.ExpenseDate.desc(), expenses_table.c.ExpenseID.desc()
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def fetch_expenses_page(connection, expenses_table, account_id, page_size, **filters):
+    """Fetch one page of expenses and the cursor for the page after it.
+
+    Reads one row past the page size to find out whether another page exists,
+    instead of counting the account's rows. Returns (rows, next_cursor).
+    """
+    query = build_expenses_query(
+        expenses_table, account_id, limit=page_size + 1, **filters
+    )
+    rows = connection.execute(query).fetchall()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].ExpenseDate, rows[-1].ExpenseID)
+    return rows, next_cursor
+
+
+def format_amount(amount, currency):
+    if currency == "USD":
+        return "${:,.2f}".format(amount)
+    elif currency == "EUR":
+        return "€{:,.2f}".format(amount)
+    return "{:,.2f}".format(amount)
+
+
+def parse_expense_filters(args):
+    """Read the date range, category and person filters from request args.
+
+    Invalid values are ignored rather than rejected, so a stale bookmark still
+    renders a page.
+    """
+    filters = {}
+    for name in ("start_date", "end_date"):
+        try:
+            filters[name] = datetime.strptime(args.get(name, ""), "%Y-%m-%d").date()
+        except ValueError:
+            pass
+
+    if args.get("category"):
+        filters["category"] = args["category"]
+
+    person = args.get("person")
+    if person == "Joint":
+        filters["person"] = "Joint"
+    elif person:
+        try:
+            filters["person"] = int(person)
+        except ValueError:
+            pass
+
+    return filters
+
+
+def record_expenses(connection, expenses_table, rows, models=None):
+    """Insert validated expense rows and update everything derived from them.
+
+    This is the write path for new expenses: AdjustedAmount is converted into
+    the base currency, SuggestedCategory is filled in by the account's model,
+    and the rows, the monthly rollup and the accounts' data versions are
+    written on the caller's connection, in the same transaction. Pass the
+    `models` from load_models(), called before the transaction began, to
+    keep model training out of it. Call learn_expenses() with the rows once
+    they are committed.
+    """
+    apply_adjusted_amounts(rows, get_rates())
+    apply_suggestions(connection, rows, models)
+    count = insert_expenses(connection, expenses_table, rows)
+    apply_deltas(connection, compute_deltas(rows))
+    bump_data_version(connection, {row["AccountID"] for row in rows})
+    return count
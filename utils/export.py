@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from utils.expenses import apply_expense_filters
+
+EXPORT_COLUMNS = (
+    "ExpenseID",
+    "ExpenseDate",
+    "Amount",
+    "Currency",
+    "ExpenseCategory",
+    "ExpenseScope",
+    "PersonID",
+    "AdditionalNotes",
+)
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def build_export_query(expenses_table, account_id, **filters):
+    query = select(*(expenses_table.c[name] for name in EXPORT_COLUMNS)).where(
+        expenses_table.c.AccountID == account_id
+    )
+    query = apply_expense_filters(query, expenses_table, **filters)
+    return query.order_by(expenses_table.c.ExpenseDate, expenses_table.c.ExpenseID)
+
+
+def stream_batches(engine, query, batch_size=EXPORT_BATCH_SIZE):
+    """Yield lists of rows from a server-side cursor, `batch_size` at a time.
+
+    The connection stays checked out until the generator is exhausted or
+    closed, and at most one batch is held in memory.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=batch_size
+        ).execute(query)
+        for batch in result.partitions():
+            yield batch
+
+
+def csv_chunks(batches):
+    """Encode batches of rows as CSV text, one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(batches):
+    """Encode batches of rows as newline-delimited JSON, one chunk per batch."""
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n"
+            for row in batch
+        )
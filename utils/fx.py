@@ -0,0 +1,165 @@
+import csv
+import logging
+import os
+from bisect import bisect_right
+from datetime import datetime
+
+from sqlalchemy import select, update, bindparam
+
+from database.tables import expenses_table
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# AdjustedAmount holds each expense converted into this currency
+FX_BASE_CURRENCY = os.getenv("FX_BASE_CURRENCY", "USD")
+
+# CSV of daily rates with Date (YYYY-MM-DD), Currency and Rate columns, where
+# Rate is the amount of base currency that one unit of Currency buys
+FX_RATES_FILE = os.getenv("FX_RATES_FILE")
+
+BACKFILL_BATCH_SIZE = 1000
+
+# The parsed rate file, reloaded now and then so that a refreshed file is
+# picked up without a restart
+rates_cache = TTLCache(ttl=int(os.getenv("FX_RATES_CACHE_TTL", "3600")), maxsize=4)
+
+
+class FXRates:
+    """Daily exchange rates into a single base currency.
+
+    A conversion uses the latest rate on or before the expense date, so
+    weekends and holidays fall back to the previous business day.
+    """
+
+    def __init__(self, base, rates=None):
+        self.base = base
+        self._dates = {}  # currency -> sorted date ordinals
+        self._rates = {}  # currency -> rates, parallel to _dates
+        for currency, dated_rates in (rates or {}).items():
+            dated_rates = sorted(dated_rates)
+            self._dates[currency] = [day.toordinal() for day, _ in dated_rates]
+            self._rates[currency] = [rate for _, rate in dated_rates]
+
+    def rate(self, currency, on_date):
+        """Return the rate for `currency` on `on_date`, or None if unknown."""
+        if currency == self.base:
+            return 1.0
+        dates = self._dates.get(currency)
+        if not dates:
+            return None
+        index = bisect_right(dates, on_date.toordinal()) - 1
+        if index < 0:
+            return None  # Before the first known rate
+        return self._rates[currency][index]
+
+    def convert(self, amount, currency, on_date):
+        rate = self.rate(currency, on_date)
+        return None if rate is None else round(amount * rate, 2)
+
+
+def read_rates(stream, base):
+    """Parse a rate CSV (Date, Currency, Rate) into FXRates."""
+    rates = {}
+    for line_number, record in enumerate(csv.DictReader(stream), start=2):
+        try:
+            day = datetime.strptime(record["Date"].strip(), "%Y-%m-%d").date()
+            rate = float(record["Rate"])
+            currency = record["Currency"].strip().upper()
+        except (KeyError, AttributeError, ValueError):
+            logger.warning("Skipping invalid FX rate on line %d", line_number)
+            continue
+        rates.setdefault(currency, []).append((day, rate))
+    return FXRates(base, rates)
+
+
+def load_rates(path=None, base=None):
+    """Load the rate file, or return base-currency-only rates without one."""
+    path = path or FX_RATES_FILE
+    base = base or FX_BASE_CURRENCY
+    if not path:
+        return FXRates(base)
+    with open(path, newline="", encoding="utf-8") as stream:
+        return read_rates(stream, base)
+
+
+def get_rates():
+    """Return the cached rates for the write path.
+
+    A missing or unreadable rate file mustn't block writes: until it can be
+    read, only base-currency expenses are converted and the rest are stored
+    without an AdjustedAmount, for the backfill to fill in. Failures aren't
+    cached, so the file is tried again on the next write.
+    """
+    try:
+        return rates_cache.get((FX_RATES_FILE, FX_BASE_CURRENCY), load_rates)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        logger.exception("Can't read FX rates from %s", FX_RATES_FILE)
+        return FXRates(FX_BASE_CURRENCY)
+
+
+def apply_adjusted_amounts(rows, rates):
+    """Set AdjustedAmount on validated expense rows, in place.
+
+    Rows in a currency without a known rate get None, to be filled by the
+    backfill once rates for it are available.
+    """
+    for row in rows:
+        row["AdjustedAmount"] = rates.convert(
+            row["Amount"], row["Currency"], row["ExpenseDate"]
+        )
+    return rows
+
+
+def backfill_adjusted_amounts(
+    engine, rates, batch_size=BACKFILL_BATCH_SIZE, account_id=None, recompute=False
+):
+    """Fill AdjustedAmount for stored expenses, one transaction per batch.
+
+    Only rows without an AdjustedAmount are touched unless `recompute` is
+    set, e.g. after the rate file has been corrected. Walks the table by
+    ExpenseID so every batch is an index range read. Returns the number of
+    rows updated and the number left without a rate.
+    """
+    table = expenses_table
+    query = select(
+        table.c.ExpenseID, table.c.ExpenseDate, table.c.Amount, table.c.Currency
+    )
+    if account_id is not None:
+        query = query.where(table.c.AccountID == account_id)
+    if not recompute:
+        query = query.where(table.c.AdjustedAmount.is_(None))
+    query = query.order_by(table.c.ExpenseID).limit(batch_size)
+
+    update_query = (
+        update(table)
+        .where(table.c.ExpenseID == bindparam("expense_id"))
+        .values(AdjustedAmount=bindparam("adjusted_amount"))
+    )
+
+    updated = 0
+    missing = 0
+    last_id = None
+    while True:
+        with engine.begin() as connection:
+            batch_query = query
+            if last_id is not None:
+                batch_query = query.where(table.c.ExpenseID > last_id)
+            rows = connection.execute(batch_query).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1].ExpenseID
+
+            params = []
+            for row in rows:
+                adjusted = rates.convert(row.Amount, row.Currency, row.ExpenseDate)
+                if adjusted is None:
+                    missing += 1
+                else:
+                    params.append(
+                        {"expense_id": row.ExpenseID, "adjusted_amount": adjusted}
+                    )
+            if params:
+                connection.execute(update_query, params)
+                updated += len(params)
+    return updated, missing
@@ -0,0 +1,100 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import lru_cache
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# None uses Werkzeug's default method and parameters
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD") or None
+
+
+class HashingBusy(Exception):
+    """The password hashing pool is full; the client should retry later."""
+
+    retry_after = 1  # Seconds, sent as the Retry-After header
+
+
+@lru_cache(maxsize=None)
+def method_prefix(method):
+    """The "method:params" prefix that `method` currently produces.
+
+    Computed from a real hash so that it follows Werkzeug's defaults.
+    """
+    kwargs = {"method": method} if method else {}
+    return generate_password_hash("", **kwargs).split("$", 1)[0]
+
+
+def needs_rehash(password_hash, method=None):
+    """Whether a stored hash was made with another method or parameters."""
+    return password_hash.split("$", 1)[0] != method_prefix(method)
+
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    Hashing is deliberately slow and memory hungry, so at most `max_workers`
+    hashes run at once, at most `max_queue` more wait for a worker, and
+    anything beyond that raises HashingBusy straight away instead of tying
+    up a request thread. hashlib releases the GIL while hashing, so other
+    requests keep being served meanwhile.
+    """
+
+    def __init__(self, max_workers, max_queue, method=None, timeout=10):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.method = method
+        self.timeout = timeout
+        self.completed = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+        self._lock = threading.Lock()
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy()
+
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy()
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def hash(self, password):
+        kwargs = {"method": self.method} if self.method else {}
+        return self._run(lambda: generate_password_hash(password, **kwargs))
+
+    def check(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return needs_rehash(password_hash, self.method)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
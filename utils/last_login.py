@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import update, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.models import Account
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginWriter:
+    """Write-behind queue for accounts' last login dates.
+
+    Logins only record the date in memory; a background thread writes the
+    pending dates every `flush_interval` seconds, or sooner once
+    `max_pending` accounts are waiting, with one batched UPDATE. Repeated
+    logins by the same account are coalesced into a single row. A failed
+    flush puts its entries back to be retried by the next one.
+    """
+
+    def __init__(self, engine, flush_interval=5.0, max_pending=500, background=True):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.background = background
+        self.recorded = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failures = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._pending = {}  # AccountID -> last login date
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def record(self, account_id, when):
+        with self._lock:
+            previous = self._pending.get(account_id)
+            if previous is not None:
+                self.coalesced += 1
+            if previous is None or when > previous:
+                self._pending[account_id] = when
+            self.recorded += 1
+            full = len(self._pending) >= self.max_pending
+
+        if not self.background:
+            return
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stopped:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="last-login-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every pending date now. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            started = time.perf_counter()
+            statement = (
+                update(Account.__table__)
+                .where(Account.__table__.c.AccountID == bindparam("account_id"))
+                .values(LastLoginDate=bindparam("last_login"))
+            )
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(
+                        statement,
+                        [
+                            {"account_id": account_id, "last_login": when}
+                            for account_id, when in pending.items()
+                        ],
+                    )
+            except SQLAlchemyError:
+                logger.exception("Failed to write %d last login dates", len(pending))
+                with self._lock:
+                    self.failures += 1
+                    # Keep anything newer that was recorded in the meantime
+                    for account_id, when in pending.items():
+                        current = self._pending.get(account_id)
+                        if current is None or when > current:
+                            self._pending[account_id] = when
+                return 0
+
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self.flushes += 1
+                self.flushed_rows += len(pending)
+                self.last_flush_seconds = seconds
+                self.max_flush_seconds = max(self.max_flush_seconds, seconds)
+            return len(pending)
+
+    def shutdown(self):
+        """Stop the background thread and write whatever is still pending."""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "recorded": self.recorded,
+                "coalesced": self.coalesced,
+                "flushes": self.flushes,
+                "flushed_rows": self.flushed_rows,
+                "failures": self.failures,
+                "last_flush_seconds": self.last_flush_seconds,
+                "max_flush_seconds": self.max_flush_seconds,
+            }
@@ -0,0 +1,47 @@
+import logging
+
+from database.models import db
+from database.schema import upgrade
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_schema(app):
+    """Bring the database schema up to date before serving.
+
+    Runs once per launcher process, before any worker is forked, and
+    closes its connections so that none are inherited by the workers.
+    """
+    with app.app_context():
+        applied = upgrade(db.engine)
+        db.engine.dispose()
+    if applied:
+        logger.warning("Applied schema versions %s", applied)
+
+
+def init_worker(app, warm_up=True):
+    """Prepare a freshly forked server worker to serve requests.
+
+    Pooled connections inherited from the parent are dropped without being
+    closed, since the parent still owns their sockets, so that the worker
+    opens its own on first use. Then the warm-up starts in the background.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if warm_up:
+        app.extensions["warm_up"].start(app)
+
+
+def shutdown_worker(app):
+    """Finish a worker's background work once it has stopped serving.
+
+    Writes the pending last login dates, waits for running password hashes
+    and closes the pooled connections.
+    """
+    app.extensions["last_logins"].shutdown()
+    app.extensions["password_hasher"].shutdown()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    logger.info("Worker shut down")
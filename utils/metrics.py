@@ -0,0 +1,263 @@
+import bisect
+import hmac
+import threading
+import time
+from functools import wraps
+
+from flask import g, request, has_request_context, current_app, abort, jsonify
+from sqlalchemy import event
+
+from utils.pool import TimedQueuePool, get_pool_stats
+from utils.db_tools import category_cache
+from utils.page_cache import page_cache_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series_items = sorted(self._series.items())
+            series_items = [(labels, list(values)) for labels, values in series_items]
+
+        for labels, values in series_items:
+            label_text = ",".join(
+                f'{name}="{escape_label(value)}"'
+                for name, value in zip(self.label_names, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {values[-1]}")
+        return lines
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestMetrics:
+    """Per-endpoint request latency, SQL count, DB time and pool wait time."""
+
+    def __init__(self):
+        labels = ("endpoint", "method")
+        self.latency = Histogram(
+            "expenses_request_duration_seconds",
+            "Request latency by endpoint.",
+            labels,
+            LATENCY_BUCKETS,
+        )
+        self.sql_count = Histogram(
+            "expenses_request_sql_statements",
+            "SQL statements executed per request.",
+            labels,
+            COUNT_BUCKETS,
+        )
+        self.db_time = Histogram(
+            "expenses_request_db_seconds",
+            "Cumulative time spent executing SQL per request.",
+            labels,
+            LATENCY_BUCKETS,
+        )
+        self.pool_wait = Histogram(
+            "expenses_request_pool_wait_seconds",
+            "Time spent waiting for pooled connections per request.",
+            labels,
+            LATENCY_BUCKETS,
+        )
+
+    def histograms(self):
+        return (self.latency, self.sql_count, self.db_time, self.pool_wait)
+
+
+def stats_token_required(view):
+    """Only serve a monitoring endpoint to callers that present STATS_TOKEN.
+
+    The token goes in an `Authorization: Bearer <token>` header. Without a
+    configured token the endpoint isn't served at all.
+    """
+
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        token = current_app.config.get("STATS_TOKEN")
+        if not token:
+            abort(404)
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            return jsonify({"error": "Authentication required"}), 401
+        return view(*args, **kwargs)
+
+    return guarded
+
+
+def init_metrics(app, engines):
+    """Install request and engine hooks and the /metrics endpoint.
+
+    `engines` maps a name for each engine to instrument to the engine; their
+    statements and pool waits count towards the request's. Does nothing
+    unless METRICS_ENABLED is set, so an unscraped deployment pays no
+    per-request or per-statement cost. Scrapers authenticate with
+    STATS_TOKEN.
+    """
+    if not app.config.get("METRICS_ENABLED"):
+        return None
+
+    metrics = RequestMetrics()
+    metrics.engines = dict(engines)
+    app.extensions["metrics"] = metrics
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = [0, 0.0, 0.0]  # statements, db seconds, pool wait seconds
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("metrics_started", None)
+        sql = g.pop("metrics_sql", None)
+        if started is None or sql is None:
+            return response
+
+        labels = (request.endpoint or "unmatched", request.method)
+        metrics.latency.observe(labels, time.perf_counter() - started)
+        metrics.sql_count.observe(labels, sql[0])
+        metrics.db_time.observe(labels, sql[1])
+        metrics.pool_wait.observe(labels, sql[2])
+        return response
+
+    for engine in metrics.engines.values():
+        instrument_engine(engine)
+
+    app.add_url_rule("/metrics", "metrics", stats_token_required(render_metrics))
+    return metrics
+
+
+def instrument_engine(engine):
+    if event.contains(engine, "before_cursor_execute", start_statement_timer):
+        return
+    event.listen(engine, "before_cursor_execute", start_statement_timer)
+    event.listen(engine, "after_cursor_execute", record_statement)
+    # A failed statement never reaches after_cursor_execute
+    event.listen(engine, "handle_error", record_failed_statement)
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.wait_listeners.append(record_pool_wait)
+
+
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def finish_statement(conn):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if has_request_context():
+        sql = g.get("metrics_sql")
+        if sql is not None:
+            sql[0] += 1
+            sql[1] += elapsed
+
+
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    finish_statement(conn)
+
+
+def record_failed_statement(context):
+    if context.connection is not None and context.execution_context is not None:
+        finish_statement(context.connection)
+
+
+def record_pool_wait(seconds):
+    if has_request_context():
+        sql = g.get("metrics_sql")
+        if sql is not None:
+            sql[2] += seconds
+
+
+def render_metrics():
+    metrics = current_app.extensions["metrics"]
+    lines = []
+    for histogram in metrics.histograms():
+        lines.extend(histogram.render())
+
+    pools = {name: get_pool_stats(engine) for name, engine in metrics.engines.items()}
+    for key, name, metric_type in (
+        ("checked_out", "expenses_db_pool_checked_out", "gauge"),
+        ("overflow", "expenses_db_pool_overflow", "gauge"),
+        ("size", "expenses_db_pool_size", "gauge"),
+        ("checkouts", "expenses_db_pool_checkouts_total", "counter"),
+        ("timeouts", "expenses_db_pool_timeouts_total", "counter"),
+        ("wait_seconds_total", "expenses_db_pool_wait_seconds_total", "counter"),
+    ):
+        values = [
+            f'{name}{{engine="{escape_label(engine)}"}} {pool[key]}'
+            for engine, pool in pools.items()
+            if key in pool
+        ]
+        if values:
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(values)
+
+    cache = category_cache.stats()
+    for key in ("hits", "misses"):
+        name = f"expenses_category_cache_{key}_total"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {cache[key]}")
+
+    pages = page_cache_stats()["pages"]
+    for key in ("hits", "misses"):
+        name = f"expenses_page_cache_{key}_total"
+        lines.append(f"# TYPE {name} counter")
+        for page, stats in pages.items():
+            lines.append(f'{name}{{page="{escape_label(page)}"}} {stats[key]}')
+
+    last_logins = current_app.extensions.get("last_logins")
+    if last_logins is not None:
+        stats = last_logins.stats()
+        for key, name, metric_type in (
+            ("queue_depth", "expenses_last_login_queue_depth", "gauge"),
+            ("flushes", "expenses_last_login_flushes_total", "counter"),
+            ("flushed_rows", "expenses_last_login_flushed_rows_total", "counter"),
+            ("failures", "expenses_last_login_flush_failures_total", "counter"),
+            ("last_flush_seconds", "expenses_last_login_flush_seconds", "gauge"),
+        ):
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"{name} {stats[key]}")
+
+    return (
+        "\n".join(lines) + "\n",
+        200,
+        {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
@@ -0,0 +1,99 @@
+import os
+import threading
+from collections import Counter
+
+from sqlalchemy import update
+
+from database.models import Account
+from utils.cache import TTLCache
+
+accounts_table = Account.__table__
+
+# Rendered pages and query results, keyed by the page, the account, its data
+# version and the page's parameters. A write bumps the version, so entries
+# for older versions are never read again and fall out of the LRU
+page_cache = TTLCache(
+    ttl=int(os.getenv("PAGE_CACHE_TTL", "600")),
+    maxsize=int(os.getenv("PAGE_CACHE_SIZE", "512")),
+)
+
+_counts = Counter()  # (page, "hits" | "misses") -> lookups
+_counts_lock = threading.Lock()
+
+
+def bump_data_version(connection, account_ids=None):
+    """Bump the data version of these accounts, or of every account.
+
+    Runs on the caller's connection, so that the new version commits with
+    the change it stands for.
+    """
+    query = update(accounts_table).values(
+        DataVersion=accounts_table.c.DataVersion + 1
+    )
+    if account_ids is not None:
+        account_ids = list(account_ids)
+        if not account_ids:
+            return
+        query = query.where(accounts_table.c.AccountID.in_(account_ids))
+    connection.execute(query)
+
+
+def page_key(page, account, *params):
+    """Key a page by the account it shows, as of the account's data version."""
+    return (page, account.id, account.data_version, params)
+
+
+def lookup(page, key):
+    """Return the cached value for `key`, or None, counting the hit or miss."""
+    value = page_cache.peek(key)
+    with _counts_lock:
+        _counts[page, "misses" if value is None else "hits"] += 1
+    return value
+
+
+def get_page(page, key, loader):
+    """Return the cached value for `key`, storing what loader() returns on a miss."""
+    value = lookup(page, key)
+    if value is None:
+        value = loader()
+        page_cache.set(key, value)
+    return value
+
+
+def stream_page(key, chunks, store=True):
+    """Pass a streamed page through, and cache its body once it is complete.
+
+    A client that disconnects part way closes the stream, so an incomplete
+    body is never stored. Nothing is stored unless `store` is true.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    if store:
+        page_cache.set(key, "".join(parts))
+
+
+def hit_rate(hits, misses):
+    lookups = hits + misses
+    return hits / lookups if lookups else None
+
+
+def page_cache_stats():
+    with _counts_lock:
+        counts = dict(_counts)
+    pages = {}
+    for (page, outcome), count in sorted(counts.items()):
+        pages.setdefault(page, {"hits": 0, "misses": 0})[outcome] = count
+    for page_stats in pages.values():
+        page_stats["hit_rate"] = hit_rate(page_stats["hits"], page_stats["misses"])
+
+    hits = sum(page_stats["hits"] for page_stats in pages.values())
+    misses = sum(page_stats["misses"] for page_stats in pages.values())
+    return {
+        **page_cache.stats(),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hit_rate(hits, misses),
+        "pages": pages,
+    }
@@ -0,0 +1,93 @@
+import os
+from collections import namedtuple
+
+from sqlalchemy import select, update, bindparam
+
+from database.models import Person
+from utils.cache import TTLCache
+
+persons_table = Person.__table__
+
+# A read-only view of a person, shared between requests through the cache
+RosterPerson = namedtuple("RosterPerson", ["PersonID", "PersonName"])
+
+# Each account's persons, keyed by the account's data version, which profile
+# updates bump: every worker loads the new roster once it sees the new version
+roster_cache = TTLCache(
+    ttl=int(os.getenv("PERSON_CACHE_TTL", "600")),
+    maxsize=int(os.getenv("PERSON_CACHE_SIZE", "1024")),
+)
+
+
+def load_roster(connection, account_id):
+    query = (
+        select(persons_table.c.PersonID, persons_table.c.PersonName)
+        .where(persons_table.c.AccountID == account_id)
+        .order_by(persons_table.c.PersonID)
+    )
+    return tuple(RosterPerson(*row) for row in connection.execute(query))
+
+
+def get_roster(engine, account):
+    """Return the account's persons as a tuple of RosterPerson, cached."""
+
+    def loader():
+        with engine.connect() as connection:
+            return load_roster(connection, account.id)
+
+    return roster_cache.get((account.id, account.data_version), loader)
+
+
+def diff_roster(current, submitted):
+    """Compare submitted (person id, name) pairs against the current roster.
+
+    A person id of "new" adds a person. Returns (names to insert, (id, name)
+    pairs to rename); blank names, unchanged names and ids that aren't on
+    the account are ignored.
+    """
+    names = {person.PersonID: person.PersonName for person in current}
+    inserts = []
+    renames = {}
+    for person_id, name in submitted:
+        name = (name or "").strip()
+        if not name:
+            continue
+        if person_id == "new":
+            inserts.append(name)
+            continue
+        try:
+            person_id = int(person_id)
+        except (TypeError, ValueError):
+            continue
+        if person_id in names and names[person_id] != name:
+            renames[person_id] = name
+    return inserts, list(renames.items())
+
+
+def update_roster(connection, account_id, submitted):
+    """Apply a submitted roster with at most three statements.
+
+    Reads the current roster once, then inserts and renames in one
+    executemany statement each, on the caller's transaction. Returns the
+    number of persons added and renamed.
+    """
+    inserts, renames = diff_roster(load_roster(connection, account_id), submitted)
+    if inserts:
+        connection.execute(
+            persons_table.insert(),
+            [{"AccountID": account_id, "PersonName": name} for name in inserts],
+        )
+    if renames:
+        connection.execute(
+            update(persons_table)
+            .where(
+                persons_table.c.PersonID == bindparam("person_id"),
+                persons_table.c.AccountID == account_id,
+            )
+            .values(PersonName=bindparam("person_name")),
+            [
+                {"person_id": person_id, "person_name": name}
+                for person_id, name in renames
+            ],
+        )
+    return len(inserts), len(renames)
@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection.
+
+    The wait includes time spent blocked on a full pool and time spent opening
+    a new connection, which together are what a request sees as pool latency.
+    Callables in `wait_listeners` are called with each wait, in seconds.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_listeners = []
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            self._record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool, which keeps the listeners
+        pool = super().recreate()
+        pool.wait_listeners = self.wait_listeners
+        return pool
+
+    def _record_wait(self, seconds):
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        for listener in self.wait_listeners:
+            listener(seconds)
+
+
+def get_pool_options(database_url):
+    """Build connection pool settings for create_engine() from the environment."""
+    # In-memory SQLite databases live in a single connection, so they can't
+    # use a sized QueuePool
+    if database_url.startswith("sqlite") and (
+        ":memory:" in database_url or database_url.rstrip("/") == "sqlite:"
+    ):
+        return {}
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # Azure SQL closes idle connections after 30 minutes, so recycle sooner
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+
+def get_pool_stats(engine):
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        stats.update(
+            {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            }
+        )
+
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            checkouts = pool.checkouts
+            stats.update(
+                {
+                    "checkouts": checkouts,
+                    "timeouts": pool.timeouts,
+                    "wait_seconds_total": pool.wait_seconds_total,
+                    "wait_seconds_max": pool.wait_seconds_max,
+                    "wait_seconds_avg": (
+                        pool.wait_seconds_total / checkouts if checkouts else 0.0
+                    ),
+                }
+            )
+
+    return stats
@@ -0,0 +1,215 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, session, has_request_context
+from sqlalchemy import event, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+
+from database.models import Account
+from database.tables import replica_heartbeat_table
+
+logger = logging.getLogger(__name__)
+
+# Reads fall back to the primary while the replica is further behind than this
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+# How often each process stamps the heartbeat and checks the replica
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+# How long a read waits to connect to the replica, or for one of its pooled
+# connections, before the replica is taken as down
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT_SECONDS", "2"))
+# Heartbeats and write times are stamped with the clocks of whichever hosts
+# serve them, which are assumed to agree to within this many seconds
+REPLICA_CLOCK_SKEW = float(os.getenv("REPLICA_CLOCK_SKEW_SECONDS", "1"))
+
+# Session key holding when this browser session last wrote expenses. Its
+# reads stay on the primary until the replica has caught up past it.
+WRITTEN_AT_KEY = "written_at"
+
+
+class ReadRouter:
+    """Sends read-only queries to a replica engine when it is safe to.
+
+    Every `check_interval` seconds, the first read to come along reads the
+    replica's heartbeat, then stamps a new one on the primary. When the
+    replica has the previous stamp it is caught up to at least that time;
+    otherwise it is lagging by the age of the stamp it has. Reads go to the
+    primary instead while the replica is unreachable, lagging by more than
+    `max_lag`, or hasn't caught up with the reader's own last write.
+    Without a replica, everything goes to the primary.
+
+    Stamps and write times come from the wall clocks of different hosts, so
+    a reader's own write only counts as replicated once the replica's
+    position is `clock_skew` seconds past it.
+    """
+
+    def __init__(
+        self,
+        primary,
+        replica=None,
+        max_lag=REPLICA_MAX_LAG,
+        check_interval=REPLICA_CHECK_INTERVAL,
+        clock_skew=REPLICA_CLOCK_SKEW,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.clock_skew = clock_skew
+        self.healthy = False
+        self.lag = None
+        self.position = 0.0  # Replica holds every write committed before this
+        self.checked_at = None
+        self.checks = 0
+        self.routes = Counter()  # Reads by where they went, and why
+        self.statements = Counter()  # Statements executed by engine
+        self._last_beat = None
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+
+        # Without a replica every statement runs on the primary, so there is
+        # nothing to compare and no listener on the primary's hot path
+        if replica is not None:
+            self._count_statements(primary, "primary")
+            self._count_statements(replica, "replica")
+
+    def _count_statements(self, engine, name):
+        def count(conn, cursor, statement, parameters, context, executemany):
+            with self._lock:
+                self.statements[name] += 1
+
+        event.listen(engine, "before_cursor_execute", count)
+
+    def check(self):
+        """Measure the replica's lag and stamp a new heartbeat."""
+        started = time.time()
+        try:
+            with self.replica.connect() as connection:
+                replica_beat = connection.execute(
+                    select(replica_heartbeat_table.c.BeatAt)
+                ).scalar()
+        except SQLAlchemyError:
+            logger.warning("Replica is unreachable; reading from the primary")
+            healthy, lag, position = False, None, self.position
+        else:
+            replica_beat = replica_beat or 0.0
+            if self._last_beat is not None and replica_beat >= self._last_beat:
+                lag = 0.0  # Caught up with our last stamp
+            else:
+                lag = started - replica_beat
+            healthy, position = True, replica_beat
+
+        beat = time.time()
+        try:
+            with self.primary.begin() as connection:
+                connection.execute(
+                    update(replica_heartbeat_table).values(BeatAt=beat)
+                )
+        except SQLAlchemyError:
+            logger.exception("Failed to write the replica heartbeat")
+            beat = self._last_beat
+
+        with self._lock:
+            self.healthy, self.lag, self.position = healthy, lag, position
+            self._last_beat = beat
+            self.checked_at = time.monotonic()
+            self.checks += 1
+
+    def _check_if_due(self):
+        checked_at = self.checked_at
+        if checked_at is not None and (
+            time.monotonic() - checked_at < self.check_interval
+        ):
+            return
+        # One thread checks; the others route on the last known state
+        if self._check_lock.acquire(blocking=checked_at is None):
+            try:
+                if self.checked_at == checked_at:
+                    self.check()
+            finally:
+                self._check_lock.release()
+
+    def engine_for_read(self, written_at=None):
+        """Return the engine that a read-only query should run on.
+
+        `written_at` is when the reader last wrote, if it wants to read its
+        own writes.
+        """
+        if self.replica is None:
+            return self.primary
+
+        self._check_if_due()
+        with self._lock:
+            if not self.healthy:
+                reason = "primary_replica_down"
+            elif self.lag > self.max_lag:
+                reason = "primary_replica_lagging"
+            elif (
+                written_at is not None
+                and self.position < written_at + self.clock_skew
+            ):
+                reason = "primary_read_your_writes"
+            else:
+                reason = "replica"
+            self.routes[reason] += 1
+        return self.replica if reason == "replica" else self.primary
+
+    def stats(self):
+        with self._lock:
+            return {
+                "replica_configured": self.replica is not None,
+                "healthy": self.healthy,
+                "lag_seconds": self.lag,
+                "checks": self.checks,
+                "reads": dict(self.routes),
+                "statements": dict(self.statements),
+            }
+
+
+def get_replica_options(database_url):
+    """Engine options that keep an unreachable replica from stalling reads."""
+    options = {}
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite":
+        options["pool_timeout"] = REPLICA_CONNECT_TIMEOUT
+    if url.drivername == "mssql+pyodbc":
+        options["connect_args"] = {"timeout": REPLICA_CONNECT_TIMEOUT}
+    elif url.drivername in ("postgresql", "postgresql+psycopg2"):
+        options["connect_args"] = {"connect_timeout": REPLICA_CONNECT_TIMEOUT}
+    return options
+
+
+def read_engine():
+    """The engine for the current request's read-only queries.
+
+    Before caching what a read returns, check it with `can_cache()`.
+    """
+    written_at = session.get(WRITTEN_AT_KEY) if has_request_context() else None
+    return current_app.extensions["read_router"].engine_for_read(written_at)
+
+
+def can_cache(connection, account):
+    """Whether rows read on `connection` may be cached under `account`'s version.
+
+    Reads from the primary always may. A replica's may once it has the
+    account's data version, so a lagging replica's rows are never cached
+    under a key that claims they are current.
+    """
+    if connection.engine is current_app.extensions["read_router"].primary:
+        return True
+    version = connection.execute(
+        select(Account.data_version).where(Account.id == account.id)
+    ).scalar()
+    return version is not None and version >= account.data_version
+
+
+def note_write(written_at=None):
+    """Keep this session's reads on the primary until the replica has caught up.
+
+    `written_at` is when the write committed, if not just now.
+    """
+    if has_request_context():
+        session[WRITTEN_AT_KEY] = time.time() if written_at is None else written_at
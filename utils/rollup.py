@@ -0,0 +1,227 @@
+from sqlalchemy import select, update, delete, func, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from database.tables import (
+    expenses_table,
+    expense_monthly_totals_table,
+    JOINT_PERSON_ID,
+    MONTH_NAMES,
+)
+
+MONTH_NUMBERS = {name: number for number, name in enumerate(MONTH_NAMES, start=1)}
+
+KEY_COLUMNS = ("AccountID", "Year", "Month", "ExpenseCategory", "PersonID")
+
+# Dialects whose INSERT ... ON CONFLICT DO UPDATE applies the deltas in one
+# statement. Elsewhere, new keys are inserted in a savepoint and retried as
+# updates if a concurrent writer inserted them first
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+MAX_INSERT_ATTEMPTS = 3
+
+# Totals are in the base currency. Expenses without a rate yet count at
+# face value until the backfill converts them and the rollup is rebuilt
+ROLLUP_AMOUNT = func.coalesce(expenses_table.c.AdjustedAmount, expenses_table.c.Amount)
+
+
+def rollup_key(row):
+    return (
+        row["AccountID"],
+        row["Year"],
+        MONTH_NUMBERS[row["Month"].strip().capitalize()],
+        row["ExpenseCategory"],
+        row["PersonID"] if row["PersonID"] is not None else JOINT_PERSON_ID,
+    )
+
+
+def rollup_amount(row):
+    adjusted = row.get("AdjustedAmount")
+    return row["Amount"] if adjusted is None else adjusted
+
+
+def compute_deltas(rows, sign=1):
+    """Aggregate expense rows into {rollup key: [amount, count]} changes.
+
+    Use sign=-1 for rows that are being deleted (or the old side of an edit).
+    """
+    deltas = {}
+    for row in rows:
+        delta = deltas.setdefault(rollup_key(row), [0.0, 0])
+        delta[0] += sign * rollup_amount(row)
+        delta[1] += sign
+    return deltas
+
+
+def delta_rows(deltas):
+    return [
+        {**dict(zip(KEY_COLUMNS, key)), "TotalAmount": amount, "ExpenseCount": count}
+        for key, (amount, count) in deltas.items()
+    ]
+
+
+def existing_keys(connection, deltas):
+    table = expense_monthly_totals_table
+    query = select(*(table.c[name] for name in KEY_COLUMNS)).where(
+        table.c.AccountID.in_({key[0] for key in deltas}),
+        table.c.Year.in_({key[1] for key in deltas}),
+        table.c.Month.in_({key[2] for key in deltas}),
+    )
+    return {tuple(row) for row in connection.execute(query)}
+
+
+def apply_deltas(connection, deltas):
+    """Apply rollup changes on the caller's connection and transaction.
+
+    Safe against concurrent writers adding the same new key: on SQLite and
+    PostgreSQL it is one executemany upsert; elsewhere, existing keys are
+    incremented with one executemany UPDATE and the rest inserted with one
+    executemany INSERT, retrying keys that another writer inserted first.
+    """
+    if not deltas:
+        return
+
+    table = expense_monthly_totals_table
+    upsert_insert = UPSERT_INSERTS.get(connection.dialect.name)
+    if upsert_insert is not None:
+        query = upsert_insert(table)
+        query = query.on_conflict_do_update(
+            index_elements=[table.c[name] for name in KEY_COLUMNS],
+            set_={
+                "TotalAmount": table.c.TotalAmount + query.excluded.TotalAmount,
+                "ExpenseCount": table.c.ExpenseCount + query.excluded.ExpenseCount,
+            },
+        )
+        connection.execute(query, delta_rows(deltas))
+        return
+
+    update_query = (
+        update(table)
+        .where(*(table.c[name] == bindparam(f"key_{name}") for name in KEY_COLUMNS))
+        .values(
+            TotalAmount=table.c.TotalAmount + bindparam("amount"),
+            ExpenseCount=table.c.ExpenseCount + bindparam("count"),
+        )
+    )
+    for attempt in range(1, MAX_INSERT_ATTEMPTS + 1):
+        existing = existing_keys(connection, deltas)
+        updates = [
+            {
+                **{f"key_{name}": value for name, value in zip(KEY_COLUMNS, key)},
+                "amount": amount,
+                "count": count,
+            }
+            for key, (amount, count) in deltas.items()
+            if key in existing
+        ]
+        if updates:
+            connection.execute(update_query, updates)
+        deltas = {key: delta for key, delta in deltas.items() if key not in existing}
+        if not deltas:
+            return
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert(), delta_rows(deltas))
+            return
+        except IntegrityError:
+            # Another writer inserted one of the keys since they were read;
+            # the savepoint is rolled back, so update those keys instead
+            if attempt == MAX_INSERT_ATTEMPTS:
+                raise
+
+
+def rebuild_rollup(connection, account_id=None):
+    """Recompute the rollup from the expenses table, for one or all accounts.
+
+    Returns the number of rollup rows written.
+    """
+    table = expense_monthly_totals_table
+
+    clear_query = delete(table)
+    if account_id is not None:
+        clear_query = clear_query.where(table.c.AccountID == account_id)
+    connection.execute(clear_query)
+
+    totals_query = select(
+        expenses_table.c.AccountID,
+        expenses_table.c.Year,
+        expenses_table.c.Month,
+        expenses_table.c.ExpenseCategory,
+        expenses_table.c.PersonID,
+        func.sum(ROLLUP_AMOUNT).label("Amount"),
+        func.count().label("ExpenseCount"),
+    ).group_by(
+        expenses_table.c.AccountID,
+        expenses_table.c.Year,
+        expenses_table.c.Month,
+        expenses_table.c.ExpenseCategory,
+        expenses_table.c.PersonID,
+    )
+    if account_id is not None:
+        totals_query = totals_query.where(expenses_table.c.AccountID == account_id)
+
+    # Months are stored by name on expenses, so map them to numbers here
+    # rather than in dialect-specific SQL
+    deltas = {}
+    for row in connection.execute(totals_query):
+        row = row._asdict()
+        delta = deltas.setdefault(rollup_key(row), [0.0, 0])
+        delta[0] += row["Amount"]
+        delta[1] += row["ExpenseCount"]
+
+    rows = delta_rows(deltas)
+    if rows:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+
+def get_summary(connection, account_id, year, month=None, person=None):
+    """Read month/category totals for an account from the rollup.
+
+    `person` is either "Joint" or a PersonID; totals cover everyone otherwise.
+    """
+    table = expense_monthly_totals_table
+    query = select(
+        table.c.Month,
+        table.c.ExpenseCategory,
+        func.sum(table.c.TotalAmount).label("TotalAmount"),
+        func.sum(table.c.ExpenseCount).label("ExpenseCount"),
+    ).where(table.c.AccountID == account_id, table.c.Year == year)
+
+    if month is not None:
+        query = query.where(table.c.Month == month)
+    if person == "Joint":
+        query = query.where(table.c.PersonID == JOINT_PERSON_ID)
+    elif person is not None:
+        query = query.where(table.c.PersonID == person)
+
+    query = query.group_by(table.c.Month, table.c.ExpenseCategory).order_by(
+        table.c.Month, table.c.ExpenseCategory
+    )
+
+    cells = []
+    by_month = {}
+    by_category = {}
+    for row in connection.execute(query):
+        if not row.ExpenseCount:
+            continue  # Every expense in this cell was removed
+        cells.append(
+            {
+                "month": row.Month,
+                "category": row.ExpenseCategory,
+                "total": row.TotalAmount,
+                "count": row.ExpenseCount,
+            }
+        )
+        by_month[row.Month] = by_month.get(row.Month, 0.0) + row.TotalAmount
+        by_category[row.ExpenseCategory] = (
+            by_category.get(row.ExpenseCategory, 0.0) + row.TotalAmount
+        )
+
+    return {
+        "year": year,
+        "month": month,
+        "cells": cells,
+        "by_month": by_month,
+        "by_category": by_category,
+        "total": sum(by_month.values()),
+    }
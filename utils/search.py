@@ -0,0 +1,123 @@
+import re
+
+from sqlalchemy import and_, column, func, literal, literal_column, table
+
+from database.schema import NOTES_SEARCH_TABLE
+from utils.expenses import build_expenses_query
+
+SEARCH_LIMIT = 50
+MAX_SEARCH_TERMS = 8
+
+TERM_PATTERN = re.compile(r"\w+")
+
+notes_search = table(NOTES_SEARCH_TABLE, column("rowid"))
+
+NOTES_INDEX_QUERIES = {
+    "sqlite": f"SELECT 1 FROM sqlite_master WHERE name = '{NOTES_SEARCH_TABLE}'",
+    "mssql": (
+        "SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('expenses')"
+    ),
+}
+
+
+def parse_terms(text):
+    """Split a search into lowercase word terms; punctuation is ignored."""
+    return [term.lower() for term in TERM_PATTERN.findall(text or "")][
+        :MAX_SEARCH_TERMS
+    ]
+
+
+def has_notes_index(connection):
+    query = NOTES_INDEX_QUERIES.get(connection.dialect.name)
+    if query is None:
+        return True  # PostgreSQL searches as the index is spelled, either way
+    return connection.exec_driver_sql(query).first() is not None
+
+
+def escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search_query(dialect, expenses_table, account_id, terms, limit, **filters):
+    """Rank an account's expenses whose notes contain every term.
+
+    Each term also matches as a prefix ("plumb" finds "plumber"). Results
+    carry a Rank column, higher is better, and honour the same date,
+    category and person filters as the expenses list.
+    """
+    query = build_expenses_query(expenses_table, account_id, **filters).order_by(None)
+    notes = expenses_table.c.AdditionalNotes
+
+    if dialect == "sqlite":
+        # The account token narrows the match to the account's own postings
+        prefixes = " AND ".join(f'"{term}"*' for term in terms)
+        match = f'AccountKey : "a{int(account_id)}" AND AdditionalNotes : ({prefixes})'
+        bm25 = func.bm25(literal_column(NOTES_SEARCH_TABLE), 0.0, 1.0)
+        query = (
+            query.add_columns((-bm25).label("Rank"))
+            .join(notes_search, notes_search.c.rowid == expenses_table.c.ExpenseID)
+            .where(literal_column(NOTES_SEARCH_TABLE).op("MATCH")(match))
+            .order_by(bm25)
+        )
+    elif dialect == "mssql":
+        # The full-text index covers every account; the join keeps this one's
+        prefixes = " AND ".join(f'"{term}*"' for term in terms)
+        matches = (
+            func.CONTAINSTABLE(
+                literal_column("expenses"),
+                literal_column("AdditionalNotes"),
+                literal(prefixes),
+            )
+            .table_valued("KEY", "RANK")
+            .alias("notes_matches")
+        )
+        query = (
+            query.add_columns(matches.c.RANK.label("Rank"))
+            .join(matches, matches.c.KEY == expenses_table.c.ExpenseID)
+            .order_by(matches.c.RANK.desc())
+        )
+    elif dialect == "postgresql":
+        # Spelled exactly like the GIN index expression, with inline
+        # constants, so that the planner can use the index
+        simple = literal_column("'simple'")
+        vector = func.to_tsvector(simple, func.coalesce(notes, literal_column("''")))
+        tsquery = func.to_tsquery(simple, " & ".join(f"{term}:*" for term in terms))
+        rank = func.ts_rank(vector, tsquery)
+        query = (
+            query.add_columns(rank.label("Rank"))
+            .where(vector.op("@@")(tsquery))
+            .order_by(rank.desc())
+        )
+    else:
+        # No full-text index: every match is equally ranked, newest first
+        query = (
+            query.add_columns(literal(1.0).label("Rank"))
+            .where(
+                and_(
+                    *(
+                        func.lower(notes).like(f"%{escape_like(term)}%", escape="\\")
+                        for term in terms
+                    )
+                )
+            )
+            .order_by(expenses_table.c.ExpenseDate.desc())
+        )
+
+    return query.order_by(expenses_table.c.ExpenseID.desc()).limit(limit)
+
+
+def search_expenses(
+    connection, expenses_table, account_id, text, limit=SEARCH_LIMIT, **filters
+):
+    """Return ranked expenses matching a free-text search of their notes."""
+    terms = parse_terms(text)
+    if not terms:
+        return []
+
+    dialect = connection.dialect.name
+    if not has_notes_index(connection):
+        dialect = "default"  # Tables created without the migrations
+    query = build_search_query(
+        dialect, expenses_table, account_id, terms, limit, **filters
+    )
+    return connection.execute(query).fetchall()
@@ -1,21 +1,104 @@
+from flask import session, has_request_context
 from flask_login import login_user
-from sqlalchemy import update, exc
 from datetime import datetime
+from sqlalchemy import select
+import os
+import time
 
-from database.models import Account
+from database.models import db, Account
+from utils.cache import TTLCache
+from utils.replica import note_write
 
+# Detached Account snapshots for load_user(), keyed by account id. The TTL
+# bounds how long another worker can serve a stale snapshot to other sessions
+account_cache = TTLCache(
+    ttl=float(os.getenv("ACCOUNT_CACHE_TTL", "15")),
+    maxsize=int(os.getenv("ACCOUNT_CACHE_SIZE", "1024")),
+)
 
-def login_and_update_last_login(user, engine):
-    try:
-        # Log in the user
-        login_user(user)
+# Session key holding when this browser session last changed its account.
+# Every worker reloads a snapshot older than the stamp, so the user who made
+# a change never sees the old values, whichever worker serves them.
+ACCOUNT_STAMP_KEY = "account_stamp"
 
-        # Update the last login date using SQLAlchemy Core
-        with engine.begin() as connection:  # Automatically begins a transaction
-            stmt = update(Account).where(Account.id == user.id).values(last_login_date=datetime.utcnow())
-            connection.execute(stmt)
+# Session key set while an import may still be committing to the account:
+# the last DataVersion seen on the primary, and when it was first seen. The
+# import's response is streamed, so its cookie can't be updated as chunks
+# commit; instead, this session's requests check the DataVersion until it
+# has stopped changing for IMPORT_SETTLE_SECONDS.
+IMPORT_KEY = "import_progress"
+IMPORT_SETTLE_SECONDS = float(os.getenv("IMPORT_SETTLE_SECONDS", "60"))
 
-        return True
-    except exc.SQLAlchemyError as e:
-        print("Error occurred during login or update:", e)
-        return False
+
+def _load_snapshot(account_id):
+    with db.session.begin():
+        account = db.session.get(Account, account_id)
+        if account is not None:
+            # Detach before commit so the loaded attributes aren't expired
+            db.session.expunge(account)
+    return account
+
+
+def drop_if_older_than_session(cache, key):
+    """Drop a cached per-account entry loaded before this session's last change."""
+    stamp = session.get(ACCOUNT_STAMP_KEY) if has_request_context() else None
+    loaded_at = cache.loaded_at(key)
+    if stamp is not None and loaded_at is not None and loaded_at < stamp:
+        cache.invalidate(key)
+
+
+def note_import(account):
+    """Follow the account's DataVersion while an import commits its chunks."""
+    if has_request_context():
+        session[IMPORT_KEY] = [account.data_version, time.time()]
+        note_write()
+
+
+def follow_import(account_id):
+    """Drop a snapshot that an import in this session has since outdated."""
+    progress = session.get(IMPORT_KEY) if has_request_context() else None
+    if progress is None:
+        return
+    with db.engine.connect() as connection:
+        version = connection.execute(
+            select(Account.data_version).where(Account.id == account_id)
+        ).scalar()
+    snapshot = account_cache.peek(account_id)
+    if snapshot is not None and snapshot.data_version != version:
+        account_cache.invalidate(account_id)
+
+    seen_version, seen_at = progress
+    now = time.time()
+    if version != seen_version:
+        seen_at = now
+        session[IMPORT_KEY] = [version, seen_at]
+    elif now - seen_at > IMPORT_SETTLE_SECONDS:
+        session.pop(IMPORT_KEY)
+    # Everything up to this version committed before it was first seen
+    note_write(seen_at)
+
+
+def load_account(account_id):
+    """Return a detached Account snapshot, from the cache when it is fresh."""
+    follow_import(account_id)
+    drop_if_older_than_session(account_cache, account_id)
+    return account_cache.get(account_id, lambda: _load_snapshot(account_id))
+
+
+def invalidate_account(account_id):
+    """Drop the cached snapshot after the account row has changed."""
+    account_cache.invalidate(account_id)
+    if has_request_context():
+        session[ACCOUNT_STAMP_KEY] = time.time()
+
+
+def login_and_update_last_login(user, last_logins):
+    # Log in the user
+    login_user(user)
+
+    # The last login date is written behind by a LastLoginWriter, so the
+    # response doesn't wait on the UPDATE
+    last_logins.record(user.id, datetime.utcnow())
+    invalidate_account(user.id)
+
+    return True
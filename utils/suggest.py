@@ -0,0 +1,312 @@
+import math
+import os
+import re
+import sys
+import threading
+from itertools import groupby
+
+import numpy as np
+from sqlalchemy import select, or_
+
+from database.tables import expenses_table
+from utils.cache import TTLCache
+
+TOKEN_PATTERN = re.compile(r"\w\w+")
+
+AMOUNT_BUCKETS = 32  # Half-octaves of the amount, from 0 up to about 65,000
+MAX_VOCABULARY = 5000  # Notes tokens per account; rarer late arrivals are ignored
+SMOOTHING = 1.0  # Laplace smoothing for every count table
+TRAINING_ROWS = 5000  # Most recent confirmed expenses a model is trained on
+
+# One model per recently active account, least recently used evicted first.
+# Models are updated in place as expenses are recorded by this process, and
+# retrained from the database once they expire
+model_cache = TTLCache(
+    ttl=int(os.getenv("SUGGEST_MODEL_TTL", "3600")),
+    maxsize=int(os.getenv("SUGGEST_MODEL_CACHE_SIZE", "256")),
+)
+
+
+def tokenize(notes):
+    return TOKEN_PATTERN.findall((notes or "").lower())
+
+
+def amount_buckets(amounts):
+    """Bucket amounts on a log scale; unknown amounts (NaN) get bucket -1."""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        buckets = np.floor(np.log2(np.maximum(amounts, 0.0) + 1.0) * 2)
+    buckets = np.clip(np.nan_to_num(buckets, nan=-1), -1, AMOUNT_BUCKETS - 1)
+    return buckets.astype(np.intp)
+
+
+class CategoryModel:
+    """Multinomial Naive Bayes over an expense's notes tokens and amount.
+
+    Counts are kept per (category, token) and (category, amount bucket) in
+    int32 arrays that grow as new categories and tokens are seen, so that
+    learning is a handful of increments and scoring a batch is a few array
+    operations. Thread-safe.
+    """
+
+    def __init__(self):
+        self.names = []  # Category names, in row order of the count arrays
+        self.categories = {}  # name -> row
+        self.vocabulary = {}  # token -> column
+        self.trained = 0
+        self.class_counts = np.zeros(0, dtype=np.int32)
+        self.token_totals = np.zeros(0, dtype=np.int32)
+        self.token_counts = np.zeros((0, 64), dtype=np.int32)
+        self.bucket_counts = np.zeros((0, AMOUNT_BUCKETS), dtype=np.int32)
+        self._tables = None  # Log-probability tables, rebuilt after learning
+        self._lock = threading.Lock()
+
+    def _category_row(self, name):
+        row = self.categories.get(name)
+        if row is None:
+            row = self.categories[name] = len(self.names)
+            self.names.append(name)
+            self.class_counts = np.append(self.class_counts, 0).astype(np.int32)
+            self.token_totals = np.append(self.token_totals, 0).astype(np.int32)
+            self.token_counts = np.vstack(
+                [self.token_counts, np.zeros((1, self.token_counts.shape[1]), np.int32)]
+            )
+            self.bucket_counts = np.vstack(
+                [self.bucket_counts, np.zeros((1, AMOUNT_BUCKETS), np.int32)]
+            )
+        return row
+
+    def _token_column(self, token):
+        column = self.vocabulary.get(token)
+        if column is None and len(self.vocabulary) < MAX_VOCABULARY:
+            column = self.vocabulary[token] = len(self.vocabulary)
+            capacity = self.token_counts.shape[1]
+            if column >= capacity:
+                # Double the columns so that growth is amortized
+                grown = np.zeros((len(self.names), capacity * 2), dtype=np.int32)
+                grown[:, :capacity] = self.token_counts
+                self.token_counts = grown
+        return column
+
+    def learn(self, examples):
+        """Add (notes, amount, category) examples to the counts."""
+        examples = list(examples)
+        if not examples:
+            return
+        with self._lock:
+            rows = []
+            pair_rows = []
+            pair_columns = []
+            for notes, _, category in examples:
+                row = self._category_row(category)
+                rows.append(row)
+                for token in tokenize(notes):
+                    column = self._token_column(token)
+                    if column is not None:
+                        pair_rows.append(row)
+                        pair_columns.append(column)
+
+            rows = np.array(rows, dtype=np.intp)
+            pair_rows = np.array(pair_rows, dtype=np.intp)
+            pair_columns = np.array(pair_columns, dtype=np.intp)
+            buckets = amount_buckets([amount for _, amount, _ in examples])
+            known = buckets >= 0
+            np.add.at(self.class_counts, rows, 1)
+            np.add.at(self.bucket_counts, (rows[known], buckets[known]), 1)
+            np.add.at(self.token_counts, (pair_rows, pair_columns), 1)
+            np.add.at(self.token_totals, pair_rows, 1)
+            self.trained += len(examples)
+            self._tables = None
+
+    def _log_tables(self):
+        if self._tables is None:
+            vocabulary = max(len(self.vocabulary), 1)
+            used = self.token_counts[:, : len(self.vocabulary)]
+            log_prior = np.log(
+                (self.class_counts + SMOOTHING)
+                / (self.trained + SMOOTHING * len(self.names))
+            )
+            log_tokens = np.log(used + SMOOTHING) - np.log(
+                self.token_totals + SMOOTHING * vocabulary
+            )[:, None]
+            log_buckets = np.log(self.bucket_counts + SMOOTHING) - np.log(
+                self.class_counts + SMOOTHING * AMOUNT_BUCKETS
+            )[:, None]
+            # Transposed so that rows of a batch's features can be gathered
+            self._tables = (
+                log_prior,
+                np.ascontiguousarray(log_tokens.T),
+                np.ascontiguousarray(log_buckets.T),
+            )
+        return self._tables
+
+    def suggest(self, notes, amounts):
+        """Return the most likely category for each (notes, amount) pair.
+
+        Scores the whole batch at once; returns None for every row if the
+        model hasn't learned anything yet.
+        """
+        notes = list(notes)
+        if not notes:
+            return []
+        with self._lock:
+            if not self.trained:
+                return [None] * len(notes)
+            log_prior, log_tokens, log_buckets = self._log_tables()
+            names = list(self.names)
+
+            # Known tokens of every row, concatenated in row order
+            columns = []
+            lengths = []
+            for text in notes:
+                row_columns = [
+                    self.vocabulary[token]
+                    for token in tokenize(text)
+                    if token in self.vocabulary
+                ]
+                columns.extend(row_columns)
+                lengths.append(len(row_columns))
+
+        # Per-row sums of the gathered token scores, from one cumulative sum
+        contributions = log_tokens[np.array(columns, dtype=np.intp)]
+        cumulative = np.zeros((len(columns) + 1, len(names)))
+        np.cumsum(contributions, axis=0, out=cumulative[1:])
+        ends = np.cumsum(lengths)
+        starts = ends - np.array(lengths)
+        scores = cumulative[ends] - cumulative[starts] + log_prior
+
+        buckets = amount_buckets(amounts)
+        known = buckets >= 0
+        scores[known] += log_buckets[buckets[known]]
+        return [names[index] for index in scores.argmax(axis=1)]
+
+    def nbytes(self):
+        """Approximate memory held by the model."""
+        arrays = (
+            self.class_counts,
+            self.token_totals,
+            self.token_counts,
+            self.bucket_counts,
+        )
+        return (
+            sum(array.nbytes for array in arrays)
+            + sys.getsizeof(self.vocabulary)
+            + sum(sys.getsizeof(token) for token in self.vocabulary)
+            + sum(array.nbytes for array in self._tables or ())
+        )
+
+
+def is_confirmed():
+    """Expenses whose category was picked by the user, not suggested.
+
+    Rows from before suggestions existed have no CategoryConfirmed flag,
+    and were all categorized by hand.
+    """
+    return or_(
+        expenses_table.c.CategoryConfirmed.is_(None),
+        expenses_table.c.CategoryConfirmed == True,  # noqa: E712
+    )
+
+
+def load_model(connection, account_id):
+    query = (
+        select(
+            expenses_table.c.AdditionalNotes,
+            expenses_table.c.Amount,
+            expenses_table.c.ExpenseCategory,
+        )
+        .where(expenses_table.c.AccountID == account_id, is_confirmed())
+        .order_by(expenses_table.c.ExpenseID.desc())
+        .limit(TRAINING_ROWS)
+    )
+    model = CategoryModel()
+    model.learn(connection.execute(query))
+    return model
+
+
+def get_model(connection, account_id):
+    """Return the account's category model, training it on a cache miss."""
+    return model_cache.get(account_id, lambda: load_model(connection, account_id))
+
+
+def load_models(engine, rows):
+    """Return the models of the accounts in `rows`, training any not cached.
+
+    Call before opening the transaction that writes the rows, so that
+    training, which reads up to TRAINING_ROWS expenses, doesn't hold it open.
+    """
+    models = {}
+    for account_id in {row["AccountID"] for row in rows}:
+
+        def loader(account_id=account_id):
+            with engine.connect() as connection:
+                return load_model(connection, account_id)
+
+        models[account_id] = model_cache.get(account_id, loader)
+    return models
+
+
+def by_account(rows):
+    def account(row):
+        return row["AccountID"]
+
+    return groupby(sorted(rows, key=account), account)
+
+
+def apply_suggestions(connection, rows, models=None):
+    """Fill SuggestedCategory on expense rows about to be inserted.
+
+    Rows are scored one batch per account, with the models from
+    load_models() when given, or else trained on `connection`. Rows without
+    a CategoryConfirmed flag had their category picked by the user and are
+    marked confirmed.
+    """
+    for account_id, account_rows in by_account(rows):
+        account_rows = list(account_rows)
+        if models is not None and account_id in models:
+            model = models[account_id]
+        else:
+            model = get_model(connection, account_id)
+        suggestions = model.suggest(
+            [row["AdditionalNotes"] for row in account_rows],
+            [row["Amount"] for row in account_rows],
+        )
+        for row, suggestion in zip(account_rows, suggestions):
+            row["SuggestedCategory"] = suggestion
+            row.setdefault("CategoryConfirmed", True)
+
+
+def learn_expenses(rows):
+    """Teach cached models the confirmed categories of newly stored rows.
+
+    Call once the rows are committed. Accounts without a cached model are
+    skipped, since loading one reads the new rows from the database anyway.
+    A model that expired and was retrained by another request between the
+    commit and this call learns the rows twice; that only skews its counts
+    slightly, until it is next retrained, so it isn't worth preventing.
+    """
+    for account_id, account_rows in by_account(rows):
+        model = model_cache.peek(account_id)
+        if model is not None:
+            model.learn(
+                (row["AdditionalNotes"], row["Amount"], row["ExpenseCategory"])
+                for row in account_rows
+                if row.get("CategoryConfirmed", True)
+            )
+
+
+def parse_amount(amount):
+    try:
+        value = float(str(amount).replace(",", ""))
+    except ValueError:
+        return math.nan
+    return value if math.isfinite(value) else math.nan
+
+
+def suggestion_stats():
+    models = model_cache.values()
+    return {
+        **model_cache.stats(),
+        "model_bytes": sum(model.nbytes() for model in models),
+        "trained_rows": sum(model.trained for model in models),
+    }
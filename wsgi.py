@@ -0,0 +1,81 @@
+"""WSGI entry point for production servers.
+
+    gunicorn --config gunicorn.conf.py wsgi:app    # Linux, Azure App Service
+    python wsgi.py                                 # waitress, e.g. on Windows
+
+`python app.py` remains the development server.
+"""
+
+import os
+import signal
+import threading
+import time
+
+from app import create_app
+from utils.lifecycle import upgrade_schema, init_worker, shutdown_worker
+
+WARM_UP_ON_START = os.getenv("WARM_UP_ON_START", "true") == "true"
+# Deploys only push code, so the launcher applies pending migrations. Turn
+# this off to run `flask upgrade-schema` as a separate release step instead
+UPGRADE_SCHEMA_ON_START = os.getenv("UPGRADE_SCHEMA_ON_START", "true") == "true"
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+# Gunicorn preloads this in its master process, which never serves requests.
+# Workers warm themselves up once forked (see gunicorn.conf.py), so that no
+# connection or thread is created before the fork
+app = create_app({"WARM_UP_ON_START": False})
+if UPGRADE_SCHEMA_ON_START:
+    upgrade_schema(app)
+
+
+def serve_with_waitress(host, port, threads):
+    """Serve from one multi-threaded process, draining requests on SIGTERM.
+
+    On SIGTERM or Ctrl+C the server stops accepting connections, lets the
+    requests already running finish for up to GRACEFUL_TIMEOUT seconds and
+    sends their responses before exiting.
+    """
+    from waitress.channel import HTTPChannel
+    from waitress.server import create_server
+
+    server = create_server(app, host=host, port=port, threads=threads)
+
+    def close_all():
+        # Runs on the server loop; with nothing left to serve, run() returns
+        for channel in list(server._map.values()):
+            if isinstance(channel, HTTPChannel):
+                channel.close()
+        server.close()
+
+    def drain():
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        server.task_dispatcher.shutdown(cancel_pending=False, timeout=GRACEFUL_TIMEOUT)
+        # The loop is still running, writing out the finished responses
+        while time.monotonic() < deadline and any(
+            channel.total_outbufs_len
+            for channel in list(server._map.values())
+            if isinstance(channel, HTTPChannel)
+        ):
+            time.sleep(0.05)
+        server.trigger.pull_trigger(close_all)
+
+    def stop(signum, frame):
+        server.accepting = False  # No new connections from here on
+        threading.Thread(target=drain, name="drain", daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    init_worker(app, warm_up=WARM_UP_ON_START)
+    try:
+        server.run()
+    finally:
+        shutdown_worker(app)
+
+
+if __name__ == "__main__":
+    serve_with_waitress(
+        os.getenv("HOST", "0.0.0.0"),
+        int(os.getenv("PORT", "8000")),
+        int(os.getenv("WEB_THREADS", "8")),
+    )